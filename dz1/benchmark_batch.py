@@ -0,0 +1,63 @@
+"""
+Замер пропускной способности пакетного режима эмулятора.
+
+Скрипт генерирует синтетический скрипт из смеси команд, выполняет его
+через Emulator.run_script с буферизованным выводом в /dev/null и печатает
+число выполненных команд в секунду.
+
+Использование:
+    python benchmark_batch.py --lines 100000
+"""
+
+import argparse
+import os
+import time
+
+from core import Emulator, BATCH_OUTPUT_BUFFER
+
+# Команды синтетического скрипта (для virtual_fs.zip из generate_virtual_fs.py)
+SCRIPT_COMMANDS = [
+    'ls',
+    'cd folder1',
+    'ls',
+    'cat file1.txt',
+    'cd ..',
+    'wc startup.sh',
+    'head -n 2 startup.sh',
+    'grep ls startup.sh',
+    'uptime',
+    'stats',
+]
+
+
+def generate_script(lines):
+    """
+    Генерирует строки синтетического скрипта.
+
+    Параметры:
+        lines (int): Число строк.
+
+    Возвращает:
+        list: Команды скрипта.
+    """
+    return [SCRIPT_COMMANDS[i % len(SCRIPT_COMMANDS)] for i in range(lines)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch mode throughput benchmark')
+    parser.add_argument('--config', default='config.xml', help='Путь к конфигурационному файлу')
+    parser.add_argument('--lines', type=int, default=100000, help='Число строк скрипта')
+    args = parser.parse_args()
+
+    script = generate_script(args.lines)
+    emulator = Emulator(args.config)
+    with open(os.devnull, 'w', buffering=BATCH_OUTPUT_BUFFER) as output:
+        start = time.perf_counter()
+        emulator.run_script(script, output)
+        elapsed = time.perf_counter() - start
+    emulator.cleanup()
+    print(f"{args.lines} commands in {elapsed:.2f} s: {args.lines / elapsed:,.0f} commands/s")
+
+
+if __name__ == '__main__':
+    main()
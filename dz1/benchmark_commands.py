@@ -0,0 +1,266 @@
+"""
+Набор замеров команд эмулятора на архивах разного размера.
+
+Для каждого размера архива (по умолчанию 1 тыс., 100 тыс. и 1 млн записей)
+и каждого бэкенда скрипт в отдельном процессе замеряет время запуска
+эмулятора, задержки команд (p50/p99 по многим повторам), пропускную
+способность скрипта из смеси команд и пиковое потребление памяти процессом
+(ru_maxrss). Результаты печатаются таблицей и сохраняются в JSON, который
+удобно сравнивать между версиями.
+
+Архивы генерируются generate_virtual_fs.py один раз и переиспользуются
+из рабочей директории.
+
+Использование:
+    python benchmark_commands.py --sizes 1000 100000 1000000 --json results.json
+    python benchmark_commands.py --sizes 1000 --profile profiles
+"""
+
+import argparse
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import generate_virtual_fs
+from core import Emulator
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+
+# Форма синтетического дерева: глубина и ширина фиксированы, число файлов
+# в директории подбирается под нужное число записей
+TREE_DEPTH = 3
+TREE_FANOUT = 10
+
+# Команды, задержки которых замеряются (пути есть в дереве любой формы)
+BENCHMARK_COMMANDS = {
+    'ls /': ['ls /'],
+    'ls deep': ['ls /dir0/dir1/dir2'],
+    'cd': ['cd /dir0/dir1/dir2', 'cd ../../..'],
+    'cat': ['cat /dir0/file0.txt'],
+    'head': ['head -n 3 /dir0/file0.txt'],
+    'wc': ['wc /dir0/file0.txt'],
+    'find': ['find /dir0/dir1/dir2 -name file1*'],
+    'grep -r': ['grep -r alpha /dir0/dir1/dir2'],
+    'stats': ['stats'],
+}
+
+# Команды скрипта для замера пропускной способности
+SCRIPT_COMMANDS = [
+    'ls',
+    'cd dir0',
+    'ls',
+    'cat file0.txt',
+    'cd ..',
+    'wc /dir0/file0.txt',
+    'head -n 2 /dir0/file0.txt',
+    'grep alpha /dir0/file0.txt',
+    'uptime',
+    'stats',
+]
+
+
+def files_per_dir(entries):
+    """
+    Подбирает число файлов в директории, чтобы в дереве было не меньше entries файлов.
+
+    Параметры:
+        entries (int): Нужное число записей.
+
+    Возвращает:
+        int: Число файлов в каждой директории.
+    """
+    dirs = sum(TREE_FANOUT ** level for level in range(TREE_DEPTH + 1))
+    return max(1, math.ceil(entries / dirs))
+
+
+def archive_path(work_dir, entries):
+    """
+    Возвращает путь к архиву нужного размера, генерируя его при необходимости.
+
+    Параметры:
+        work_dir (str): Директория с архивами.
+        entries (int): Число записей.
+
+    Возвращает:
+        str: Путь к архиву.
+    """
+    path = os.path.join(work_dir, f'bench-{entries}.zip')
+    if not os.path.exists(path):
+        print(f"generating {path}...", file=sys.stderr)
+        tmp_path = path + '.tmp'
+        generate_virtual_fs.create_synthetic_archive(
+            tmp_path, depth=TREE_DEPTH, fanout=TREE_FANOUT,
+            files_per_dir=files_per_dir(entries), max_files=entries,
+            size='uniform:0:512', compression='deflated', seed=1)
+        os.replace(tmp_path, path)
+    return path
+
+
+def percentile(sorted_values, fraction):
+    """
+    Возвращает перцентиль отсортированной выборки (метод ближайшего ранга).
+
+    Параметры:
+        sorted_values (list): Отсортированные значения.
+        fraction (float): Доля от 0 до 1.
+
+    Возвращает:
+        float: Значение перцентиля.
+    """
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def time_command(emulator, commands, repeat):
+    """
+    Замеряет задержку команды, выполняя её repeat раз.
+
+    Параметры:
+        emulator (Emulator): Эмулятор.
+        commands (list): Команды, выполняемые по кругу (например, cd туда и обратно).
+        repeat (int): Число замеров.
+
+    Возвращает:
+        dict: p50, p99 и максимум в миллисекундах и число замеров.
+    """
+    timings = []
+    for i in range(repeat):
+        command = commands[i % len(commands)]
+        start = time.perf_counter()
+        for _ in emulator.iter_output(command):
+            pass
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'p50_ms': round(percentile(timings, 0.50), 4),
+        'p99_ms': round(percentile(timings, 0.99), 4),
+        'max_ms': round(timings[-1], 4),
+        'runs': repeat,
+    }
+
+
+def write_config(work_dir, vfs_path, backend):
+    """
+    Записывает конфигурационный файл эмулятора для замера.
+
+    Возвращает:
+        str: Путь к конфигурационному файлу.
+    """
+    path = os.path.join(work_dir, f'bench-{backend}.xml')
+    with open(path, 'w') as f:
+        f.write(f'<config><vfs_path>{vfs_path}</vfs_path>'
+                f'<startup_script>startup.sh</startup_script>'
+                f'<vfs_backend>{backend}</vfs_backend>'
+                f'<log_level>WARNING</log_level>'
+                f'<log_file>{os.path.join(work_dir, "bench.log")}</log_file></config>')
+    return path
+
+
+def run_case(config_path, repeat, script_lines, profile_dir):
+    """
+    Выполняет замеры для одного архива и бэкенда (в отдельном процессе).
+
+    Параметры:
+        config_path (str): Путь к конфигурационному файлу.
+        repeat (int): Число замеров каждой команды.
+        script_lines (int): Длина скрипта для замера пропускной способности.
+        profile_dir (str | None): Директория для статистики cProfile.
+
+    Возвращает:
+        dict: Результаты замеров.
+    """
+    start = time.perf_counter()
+    emulator = Emulator(config_path)
+    startup = time.perf_counter() - start
+    emulator.profile_dir = profile_dir
+
+    result = {
+        'startup_s': round(startup, 4),
+        'commands': {name: time_command(emulator, commands, repeat)
+                     for name, commands in BENCHMARK_COMMANDS.items()},
+    }
+
+    script = [SCRIPT_COMMANDS[i % len(SCRIPT_COMMANDS)] for i in range(script_lines)]
+    start = time.perf_counter()
+    emulator.run_script(script, io.StringIO())
+    elapsed = time.perf_counter() - start
+    result['script'] = {'lines': script_lines, 'seconds': round(elapsed, 4),
+                        'lines_per_s': round(script_lines / elapsed, 1)}
+    emulator.cleanup()
+
+    # ru_maxrss - в КиБ в Linux и в байтах в macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        peak *= 1024
+    result['peak_rss_mib'] = round(peak / 2**20, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Emulator command benchmark suite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Размеры архивов в записях')
+    parser.add_argument('--backends', nargs='+', default=['zipfile', 'mmap'],
+                        choices=['zipfile', 'mmap'], help='Бэкенды архива')
+    parser.add_argument('--repeat', type=int, default=200, help='Число замеров каждой команды')
+    parser.add_argument('--script-lines', type=int, default=10000,
+                        help='Длина скрипта для замера пропускной способности')
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'emulator-bench'),
+                        help='Директория для сгенерированных архивов')
+    parser.add_argument('--json', help='Файл для результатов в формате JSON (по умолчанию stdout)')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='Сохранять статистику cProfile каждой команды в DIR')
+    args = parser.parse_args()
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'repeat': args.repeat,
+        },
+        'results': [],
+    }
+
+    # Каждый замер - в новом процессе, чтобы пиковая память не копилась между ними
+    context = multiprocessing.get_context('spawn')
+    for entries in args.sizes:
+        vfs_path = archive_path(args.work_dir, entries)
+        for backend in args.backends:
+            profile_dir = None
+            if args.profile:
+                profile_dir = os.path.join(args.profile, f'{entries}-{backend}')
+                os.makedirs(profile_dir, exist_ok=True)
+            config_path = write_config(args.work_dir, vfs_path, backend)
+            with context.Pool(1) as pool:
+                result = pool.apply(run_case, (config_path, args.repeat,
+                                               args.script_lines, profile_dir))
+            result = {'entries': entries, 'backend': backend, **result}
+            report['results'].append(result)
+
+            print(f"{entries:>9} {backend:8} startup {result['startup_s']:8.3f} s  "
+                  f"peak {result['peak_rss_mib']:8.1f} MiB  "
+                  f"script {result['script']['lines_per_s']:10,.0f} lines/s", file=sys.stderr)
+            for name, timing in result['commands'].items():
+                print(f"{'':>9} {name:10} p50 {timing['p50_ms']:9.3f} ms  "
+                      f"p99 {timing['p99_ms']:9.3f} ms", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Сравнение бэкендов виртуальной файловой системы: zipfile и mmap.
+
+Скрипт генерирует архив с заданным числом записей и для каждого бэкенда
+замеряет время запуска (открытие архива и построение индекса директорий)
+и пиковое потребление памяти Python-объектами (tracemalloc).
+
+Использование:
+    python benchmark_vfs.py --entries 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from core import VFSIndex
+from mmap_zip import MmapZipFile
+
+
+def generate_archive(path, entries):
+    """
+    Генерирует архив с пустыми файлами, разложенными по директориям.
+
+    Параметры:
+        path (str): Путь к создаваемому архиву.
+        entries (int): Число записей.
+    """
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as zipf:
+        for i in range(entries):
+            zipf.writestr(f'dir{i % 100}/sub{i % 1000}/file{i}.txt', b'')
+
+
+BACKENDS = {
+    'zipfile': zipfile.ZipFile,
+    'mmap': MmapZipFile,
+}
+
+
+def measure(path, backend, with_index=True):
+    """
+    Замеряет время и пиковую память открытия архива одним бэкендом.
+
+    tracemalloc сильно замедляет выделение памяти, поэтому время и память
+    замеряются в разных прогонах.
+
+    Параметры:
+        path (str): Путь к архиву.
+        backend (type): Класс архива (zipfile.ZipFile или MmapZipFile).
+        with_index (bool): Строить ли индекс директорий после открытия.
+
+    Возвращает:
+        tuple: (время в секундах, пиковая память в байтах).
+    """
+    def startup():
+        zip_ref = backend(path, 'r')
+        if with_index:
+            VFSIndex(zip_ref.namelist())
+        zip_ref.close()
+
+    start = time.perf_counter()
+    startup()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    startup()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VFS backend startup benchmark')
+    parser.add_argument('--entries', type=int, default=100000, help='Число записей в архиве')
+    parser.add_argument('--archive', help='Готовый архив вместо сгенерированного')
+    args = parser.parse_args()
+
+    path = args.archive
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.zip')
+        os.close(fd)
+        generate_archive(path, args.entries)
+
+    try:
+        print(f"archive: {path} ({os.path.getsize(path) / 2**20:.1f} MiB)")
+        for name, backend in BACKENDS.items():
+            for with_index in (False, True):
+                elapsed, peak = measure(path, backend, with_index)
+                stage = 'open+index' if with_index else 'open'
+                print(f"{name:8} {stage:11} {elapsed:8.3f} s   peak memory: {peak / 2**20:8.1f} MiB")
+    finally:
+        if args.archive is None:
+            os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
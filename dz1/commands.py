@@ -0,0 +1,138 @@
+"""
+Реестр команд эмулятора.
+
+Команды регистрируются декоратором command() вместе со спецификацией
+аргументов, а Emulator находит обработчик по имени за O(1). Сторонние модули
+команд объявляются через entry points группы ENTRY_POINT_GROUP: имя entry
+point - имя команды, значение - обработчик ("module:function"). Метаданные
+читаются только при первой неизвестной команде, а модуль импортируется
+только при первом вызове одной из его команд.
+
+Пример стороннего модуля:
+
+    from commands import command
+
+    @command('hello', max_args=1, usage='hello [NAME]')
+    def hello(emulator, name='world'):
+        return f"Hello, {name}!"
+"""
+
+from importlib.metadata import entry_points
+
+ENTRY_POINT_GROUP = 'shell_emulator.commands'
+
+
+class CommandSpec:
+    """
+    Описание команды: обработчик и ограничения на число аргументов.
+
+    Атрибуты:
+        name (str): Имя команды.
+        handler (callable): Обработчик, вызываемый как handler(emulator, *args).
+        min_args (int): Минимальное число аргументов.
+        max_args (int | None): Максимальное число аргументов (None - без ограничения).
+        usage (str): Строка использования для сообщений об ошибках.
+    """
+
+    __slots__ = ('name', 'handler', 'min_args', 'max_args', 'usage')
+
+    def __init__(self, name, handler, min_args=0, max_args=None, usage=None):
+        self.name = name
+        self.handler = handler
+        self.min_args = min_args
+        self.max_args = max_args
+        self.usage = usage or name
+
+    def check_args(self, args):
+        """
+        Проверяет число аргументов.
+
+        Параметры:
+            args (list): Аргументы команды.
+
+        Возвращает:
+            str | None: Сообщение об ошибке или None, если аргументы подходят.
+        """
+        if len(args) < self.min_args:
+            return f"{self.name}: missing operand\nusage: {self.usage}"
+        if self.max_args is not None and len(args) > self.max_args:
+            return f"{self.name}: too many arguments\nusage: {self.usage}"
+        return None
+
+
+class CommandRegistry:
+    """
+    Таблица команд с ленивой загрузкой сторонних модулей через entry points.
+
+    Атрибуты:
+        group (str): Группа entry points со сторонними командами.
+    """
+
+    def __init__(self, group=ENTRY_POINT_GROUP):
+        self.group = group
+        self._commands = {}
+        self._lazy = None
+
+    def command(self, name, min_args=0, max_args=None, usage=None):
+        """
+        Декоратор, регистрирующий обработчик команды.
+
+        Параметры:
+            name (str): Имя команды.
+            min_args (int): Минимальное число аргументов.
+            max_args (int | None): Максимальное число аргументов.
+            usage (str, optional): Строка использования.
+
+        Возвращает:
+            callable: Декоратор, возвращающий обработчик без изменений.
+        """
+        def decorator(handler):
+            self._commands[name] = CommandSpec(name, handler, min_args, max_args, usage)
+            return handler
+        return decorator
+
+    def _discover(self):
+        """
+        Читает entry points сторонних команд, не импортируя их модули.
+        """
+        self._lazy = {ep.name: ep for ep in entry_points(group=self.group)}
+
+    def get(self, name):
+        """
+        Находит команду по имени, при необходимости загружая сторонний модуль.
+
+        Параметры:
+            name (str): Имя команды.
+
+        Возвращает:
+            CommandSpec | None: Описание команды или None, если команды нет.
+        """
+        spec = self._commands.get(name)
+        if spec is not None:
+            return spec
+        if self._lazy is None:
+            self._discover()
+        ep = self._lazy.pop(name, None)
+        if ep is None:
+            return None
+        handler = ep.load()
+        # Модуль мог зарегистрировать команду со спецификацией при импорте
+        if name not in self._commands:
+            self._commands[name] = CommandSpec(name, handler)
+        return self._commands[name]
+
+    def names(self):
+        """
+        Возвращает имена всех известных команд, включая ещё не загруженные.
+
+        Возвращает:
+            list: Отсортированные имена команд.
+        """
+        if self._lazy is None:
+            self._discover()
+        return sorted(set(self._commands) | set(self._lazy))
+
+
+# Общий реестр команд эмулятора
+registry = CommandRegistry()
+command = registry.command
@@ -1,27 +1,464 @@
 import os
+import io
+import re
+import codecs
+import struct
+import posixpath
 import time
-import zipfile
-import tkinter as tk
-from tkinter import scrolledtext
-import tempfile
+import threading
+import queue
+import shlex
+import stat
 import shutil
+import tempfile
+import itertools
+import contextlib
+import warnings
+from collections import deque, OrderedDict
+import zipfile
+import sys
+import getpass
+import argparse
 import xml.etree.ElementTree as ET
+import atexit
+import cProfile
 import logging
+import logging.handlers
+import fnmatch
+from concurrent.futures import ProcessPoolExecutor
+
+import search
+from commands import command, registry
+from mmap_zip import MmapZipFile
+from overlay import Overlay, OverlayFile, WHITEOUT_PREFIX, is_reserved
+from resolver import PathResolver, PathError
+
+# Настройка логгера: записи попадают в очередь, а в файл их пишет отдельный поток
+logger = logging.getLogger('emulator')
+logger.setLevel(logging.DEBUG)
+
+# Параметры логирования по умолчанию
+DEFAULT_LOG_FILE = 'app.log'
+DEFAULT_LOG_LEVEL = 'DEBUG'
+DEFAULT_LOG_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_LOG_BACKUP_COUNT = 3
+
+# Поток, переносящий записи из очереди в файл
+_log_listener = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который не форматирует запись в вызывающем потоке.
+
+    Очередь живет внутри процесса, поэтому запись можно передать как есть:
+    подстановка аргументов и форматирование выполняются в потоке QueueListener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(log_file=DEFAULT_LOG_FILE, level=DEFAULT_LOG_LEVEL,
+                  max_bytes=DEFAULT_LOG_MAX_BYTES, backup_count=DEFAULT_LOG_BACKUP_COUNT):
+    """
+    Настраивает асинхронное логирование с ротацией файла.
+
+    Повторный вызов заменяет ранее настроенный конвейер.
+
+    Параметры:
+        log_file (str): Путь к файлу логов.
+        level (str): Уровень логирования ('DEBUG', 'INFO', ...).
+        max_bytes (int): Размер файла, после которого он ротируется (0 - без ротации).
+        backup_count (int): Число хранимых старых файлов.
+    """
+    global _log_listener
+    stop_logging()
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    for handler in list(logger.handlers):
+        if isinstance(handler, _DeferredQueueHandler):
+            logger.removeHandler(handler)
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+    logger.setLevel(level)
+
+    _log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _log_listener.start()
+
+
+def stop_logging():
+    """
+    Останавливает поток логирования, дописав в файл все записи из очереди.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+
+
+atexit.register(stop_logging)
+
+# Размер блока при потоковом чтении файлов из архива
+CHUNK_SIZE = 64 * 1024
+
+# Бюджет кэша распакованных файлов по умолчанию (байт)
+DEFAULT_CACHE_SIZE = 16 * 1024 * 1024
+
+# Минимальный объем данных, начиная с которого grep -r распараллеливается
+PARALLEL_SEARCH_MIN_BYTES = 4 * 1024 * 1024
+
+# Размер буфера вывода в пакетном режиме (байт)
+BATCH_OUTPUT_BUFFER = 1024 * 1024
+
+# Размер истории вывода GUI по умолчанию (строк)
+DEFAULT_SCROLLBACK_LINES = 10000
+
+# Локальный заголовок записи ZIP: сигнатура, версии, флаги, ... длины имени и extra
+_ZIP_FILE_HEADER = struct.Struct('<4s2B4HL2L2H')
+
+class VFSIndex:
+    """
+    Иерархический индекс директорий виртуальной файловой системы.
+
+    Строится один раз по списку имен ZIP-архива и хранит для каждой директории
+    отображение "имя потомка -> является ли директорией". Директории, у которых
+    нет собственной записи в архиве (неявные), тоже попадают в индекс.
+
+    Пути хранятся без ведущего и завершающего '/', корень обозначается ''.
+    Записи вида "dir/.wh.name", которые дописывает команда sync, удаляют
+    из индекса ранее добавленный путь dir/name вместе с потомками.
+    Записи-ссылки (symlink) хранятся как файлы и дополнительно отмечаются
+    в links; их содержимое - путь цели.
+
+    Атрибуты:
+        dirs (dict): Отображение пути директории в словарь её потомков.
+        files (dict): Отображение пути файла в имя записи в архиве.
+        links (dict): Отображение пути ссылки в имя записи в архиве.
+    """
+
+    def __init__(self, names=(), symlinks=()):
+        """
+        Строит индекс по списку имен записей архива.
+
+        Параметры:
+            names (iterable): Имена записей ZIP-архива.
+            symlinks (container): Имена записей, последняя версия которых - ссылка.
+        """
+        self.dirs = {'': {}}
+        self.files = {}
+        self.links = {}
+        for name in names:
+            self.add(name)
+        for name in symlinks:
+            path = self.normalize(name)
+            if self.files.get(path) == name:
+                self.links[path] = name
+
+    @staticmethod
+    def normalize(path):
+        """
+        Приводит путь к виду, в котором он хранится в индексе.
+
+        Параметры:
+            path (str): Путь внутри виртуальной файловой системы.
+
+        Возвращает:
+            str: Путь без ведущего и завершающего '/'.
+        """
+        return path.strip('/')
+
+    def add(self, name):
+        """
+        Добавляет запись архива в индекс вместе со всеми родительскими директориями.
+
+        Параметры:
+            name (str): Имя записи в архиве (директории оканчиваются на '/').
+        """
+        path = self.normalize(name)
+        if not path:
+            return
+        parent, _, base = path.rpartition('/')
+        if base.startswith(WHITEOUT_PREFIX):
+            self.remove(f"{parent}/{base[len(WHITEOUT_PREFIX):]}" if parent else base[len(WHITEOUT_PREFIX):])
+        elif name.endswith('/'):
+            self._add_dir(path)
+        else:
+            self._add_dir(parent)
+            self.dirs[parent][base] = False
+            self.files[path] = name
+
+    def _add_dir(self, path):
+        """
+        Добавляет директорию и, при необходимости, её предков.
+
+        Параметры:
+            path (str): Нормализованный путь директории.
+        """
+        if path in self.dirs:
+            return
+        parent, _, base = path.rpartition('/')
+        self._add_dir(parent)
+        self.dirs[parent][base] = True
+        self.dirs[path] = {}
+
+    def remove(self, path):
+        """
+        Удаляет путь из индекса вместе с потомками.
+
+        Параметры:
+            path (str): Путь к файлу или директории.
+        """
+        path = self.normalize(path)
+        if path in self.dirs:
+            for child, is_dir in list(self.walk(path)):
+                if is_dir:
+                    del self.dirs[child]
+                else:
+                    del self.files[child]
+            del self.dirs[path]
+        else:
+            self.files.pop(path, None)
+        if self.links:
+            prefix = path + '/'
+            for link in [p for p in self.links if p == path or p.startswith(prefix)]:
+                del self.links[link]
+        parent, _, base = path.rpartition('/')
+        if parent in self.dirs:
+            self.dirs[parent].pop(base, None)
+
+    def lookup(self, path):
+        """
+        Определяет тип объекта по пути.
+
+        Параметры:
+            path (str): Путь внутри виртуальной файловой системы.
+
+        Возвращает:
+            str | None: 'dir', 'file' или None, если объекта нет.
+        """
+        path = self.normalize(path)
+        if path in self.dirs:
+            return 'dir'
+        if path in self.files:
+            return 'file'
+        return None
+
+    def is_dir(self, path):
+        """
+        Проверяет, является ли путь директорией.
+
+        Параметры:
+            path (str): Путь внутри виртуальной файловой системы.
+
+        Возвращает:
+            bool: True, если путь - директория.
+        """
+        return self.normalize(path) in self.dirs
+
+    def is_file(self, path):
+        """
+        Проверяет, является ли путь файлом.
+
+        Параметры:
+            path (str): Путь внутри виртуальной файловой системы.
+
+        Возвращает:
+            bool: True, если путь - файл.
+        """
+        return self.normalize(path) in self.files
+
+    def member_name(self, path):
+        """
+        Возвращает имя записи архива для файла.
+
+        Параметры:
+            path (str): Путь к файлу внутри виртуальной файловой системы.
+
+        Возвращает:
+            str | None: Имя записи в архиве или None, если файла нет.
+        """
+        return self.files.get(self.normalize(path))
+
+    def listdir(self, path):
+        """
+        Возвращает отсортированный список потомков директории.
+
+        Параметры:
+            path (str): Путь к директории.
+
+        Возвращает:
+            list | None: Имена потомков или None, если директории нет.
+        """
+        children = self.dirs.get(self.normalize(path))
+        if children is None:
+            return None
+        return sorted(children)
+
+    def walk(self, path):
+        """
+        Рекурсивно обходит директорию в порядке сортировки имен.
+
+        Параметры:
+            path (str): Путь к директории.
+
+        Возвращает:
+            iterator: Пары (путь потомка, является ли директорией) в прямом порядке.
+        """
+        path = self.normalize(path)
+        if path not in self.dirs:
+            return
+        stack = [(path, iter(sorted(self.dirs[path])))]
+        while stack:
+            parent, names = stack[-1]
+            for name in names:
+                child = f"{parent}/{name}" if parent else name
+                is_dir = self.dirs[parent][name]
+                yield child, is_dir
+                if is_dir:
+                    stack.append((child, iter(sorted(self.dirs[child]))))
+                    break
+            else:
+                stack.pop()
+
+
+class CommandCancelled(Exception):
+    """
+    Исключение, прерывающее выполнение команды (Ctrl+C в GUI).
+    """
+
+
+class MemberCache:
+    """
+    LRU-кэш распакованного содержимого записей архива с ограничением по байтам.
+
+    Кэшируются только записи не больше max_item_size, чтобы один большой файл
+    не вытеснял весь кэш. Доступ защищен блокировкой.
+
+    Атрибуты:
+        max_bytes (int): Бюджет кэша в байтах.
+        max_item_size (int): Максимальный размер кэшируемой записи.
+        size (int): Текущий суммарный размер содержимого в кэше.
+        hits (int): Число попаданий.
+        misses (int): Число промахов.
+        evictions (int): Число вытесненных записей.
+    """
 
-# Настройка логгера
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Установите уровень логирования
+    def __init__(self, max_bytes=DEFAULT_CACHE_SIZE, max_item_size=None):
+        """
+        Создает пустой кэш.
+
+        Параметры:
+            max_bytes (int): Бюджет кэша в байтах.
+            max_item_size (int, optional): Максимальный размер записи,
+                по умолчанию четверть бюджета.
+        """
+        self.max_bytes = max_bytes
+        self.max_item_size = max_bytes // 4 if max_item_size is None else max_item_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def fits(self, size):
+        """
+        Проверяет, может ли запись такого размера попасть в кэш.
+
+        Параметры:
+            size (int): Размер распакованной записи.
+
+        Возвращает:
+            bool: True, если запись кэшируема.
+        """
+        return size <= self.max_item_size
+
+    def get(self, key):
+        """
+        Возвращает содержимое записи и отмечает её как недавно использованную.
+
+        Параметры:
+            key (str): Имя записи в архиве.
+
+        Возвращает:
+            bytes | None: Содержимое или None при промахе.
+        """
+        with self._lock:
+            data = self._data.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        """
+        Кладет содержимое записи в кэш, вытесняя самые старые записи.
+
+        Параметры:
+            key (str): Имя записи в архиве.
+            data (bytes): Распакованное содержимое.
+        """
+        if not self.fits(len(data)):
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._data[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Удаляет из кэша все записи (счетчики сохраняются).
+        """
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def invalidate(self, key):
+        """
+        Удаляет запись из кэша, если она там есть.
+
+        Параметры:
+            key (str): Имя записи в архиве.
+        """
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
 
-# Создание обработчика для записи логов в файл
-file_handler = logging.FileHandler('app.log')
-file_handler.setLevel(logging.DEBUG)  # Установите уровень логирования для обработчика
+    def stats(self):
+        """
+        Возвращает счетчики кэша.
 
-# Создание форматера для логов
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
+        Возвращает:
+            dict: Попадания, промахи, вытеснения, число записей и размер.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._data),
+                'size': self.size,
+                'max_bytes': self.max_bytes,
+            }
 
-# Добавление обработчика к логгеру
-logger.addHandler(file_handler)
 
 class Emulator:
     """
@@ -35,6 +472,8 @@ class Emulator:
         root_dir (str): Корневая директория распакованной виртуальной файловой системы.
         temp_dir (str): Временная директория для распакованной виртуальной файловой системы.
         start_time (float): Время запуска эмулятора для расчета uptime.
+        profile_dir (str | None): Директория для статистики cProfile по командам
+            (None - профилирование выключено).
     """
 
     def __init__(self, config_path):
@@ -45,10 +484,19 @@ class Emulator:
             config_path (str): Путь к XML-конфигурационному файлу.
         """
         self.config = self.read_config(config_path)
+        setup_logging(self.config['log_file'], self.config['log_level'],
+                      self.config['log_max_bytes'], self.config['log_backup_count'])
+        logger.debug('Config read: %s', self.config)
         self.vfs_path = self.config['vfs_path']
         self.startup_script = self.config['startup_script']
 
         self.current_dir = ''
+        self.cache = MemberCache(self.config['cache_size'])
+        self.search_workers = self.config['search_workers'] or os.cpu_count() or 1
+        self._search_pool = None
+        self.cancel_event = threading.Event()
+        self.profile_dir = None
+        self._profile_counter = itertools.count(1)
         self.init_vfs()
 
         self.start_time = time.time()  # Время старта для расчета uptime
@@ -68,34 +516,122 @@ class Emulator:
         root = tree.getroot()
         vfs_path = root.find('vfs_path').text
         startup_script = root.find('startup_script').text
-        logger.debug('Config read: vfs_path=%s, startup_script=%s', vfs_path, startup_script)
-        return {'vfs_path': vfs_path, 'startup_script': startup_script}
+        # Необязательный параметр: 'zipfile' (по умолчанию) или 'mmap'
+        vfs_backend = root.findtext('vfs_backend', 'zipfile').strip()
+        # Необязательный параметр: бюджет кэша распакованных файлов в байтах
+        cache_size = int(root.findtext('cache_size', str(DEFAULT_CACHE_SIZE)))
+        # Необязательный параметр: число процессов для grep -r (0 - по числу ядер)
+        search_workers = int(root.findtext('search_workers', '0'))
+        # Необязательный параметр: сколько последних строк вывода хранит GUI (0 - без ограничения)
+        scrollback_lines = int(root.findtext('scrollback_lines', str(DEFAULT_SCROLLBACK_LINES)))
+        # Необязательные параметры логирования: файл, уровень и ротация
+        log_file = root.findtext('log_file', DEFAULT_LOG_FILE).strip()
+        log_level = root.findtext('log_level', DEFAULT_LOG_LEVEL).strip().upper()
+        log_max_bytes = int(root.findtext('log_max_bytes', str(DEFAULT_LOG_MAX_BYTES)))
+        log_backup_count = int(root.findtext('log_backup_count', str(DEFAULT_LOG_BACKUP_COUNT)))
+        # Необязательный параметр: размер файла верхнего слоя, после которого он хранится на диске
+        overlay_spill_bytes = int(root.findtext('overlay_spill_bytes', '0'))
+        return {'vfs_path': vfs_path, 'startup_script': startup_script,
+                'vfs_backend': vfs_backend, 'cache_size': cache_size,
+                'search_workers': search_workers, 'scrollback_lines': scrollback_lines,
+                'log_file': log_file, 'log_level': log_level,
+                'log_max_bytes': log_max_bytes, 'log_backup_count': log_backup_count,
+                'overlay_spill_bytes': overlay_spill_bytes}
 
-    def init_vfs(self):
+    def init_vfs(self, keep_overlay=False):
         """
-        Инициализирует виртуальную файловую систему: открывает ZIP-файл.
+        Инициализирует виртуальную файловую систему: открывает ZIP-файл,
+        строит индекс директорий и пустой записываемый слой поверх него.
+
+        Бэкенд 'mmap' отображает архив в память и разбирает центральный каталог
+        лениво, что заметно быстрее и экономнее для архивов с миллионами записей.
+
+        Параметры:
+            keep_overlay (bool): Сохранить текущий верхний слой, подставив ему
+                новый индекс (после неудачного sync).
         """
-        self.zip_ref = zipfile.ZipFile(self.vfs_path, 'r')
-        logger.debug('VFS initialized: vfs_path=%s', self.vfs_path)
+        backend = self.config.get('vfs_backend', 'zipfile')
+        if backend == 'mmap':
+            self.zip_ref = MmapZipFile(self.vfs_path, 'r')
+            self.index = VFSIndex(self.zip_ref.iter_names(), self.zip_ref.symlinks())
+        elif backend == 'zipfile':
+            self.zip_ref = zipfile.ZipFile(self.vfs_path, 'r')
+            symlinks = [name for name, info in self.zip_ref.NameToInfo.items()
+                        if stat.S_ISLNK(info.external_attr >> 16)]
+            self.index = VFSIndex(self.zip_ref.namelist(), symlinks)
+        else:
+            raise ValueError(f"Unknown vfs_backend: {backend}")
+        if keep_overlay:
+            self.fs.lower = self.index
+            self.fs.generation += 1
+        else:
+            self.fs = Overlay(self.index, self.config['overlay_spill_bytes'])
+        self.resolver = PathResolver(self.fs, self._read_link)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('VFS initialized: vfs_path=%s, dirs=%d, files=%d',
+                         self.vfs_path, len(self.index.dirs), len(self.index.files))
 
-    def run_startup_script(self):
+    def run_startup_script(self, output=None):
         """
         Выполняет команды, указанные в стартовом скрипте, при запуске эмулятора.
+
+        Параметры:
+            output (file, optional): Текстовый поток для вывода результатов команд.
+        """
+        self.run_script(self.read_startup_script(), output)
+
+    def read_startup_script(self):
+        """
+        Читает строки стартового скрипта.
+
+        Возвращает:
+            list: Строки скрипта (bytes); пустой список, если скрипта нет.
         """
-        script_path = os.path.join(self.current_dir, self.startup_script)
-        if script_path in self.zip_ref.namelist():
-            with self.zip_ref.open(script_path) as script_file:
-                commands = script_file.readlines()
-                for command in commands:
-                    self.run_command(command.strip().decode('utf-8'))
+        script_path = self._full_path(self.startup_script)
+        source = self.fs.source(script_path)
+        if source is None:
+            return []
+        with self._open_member(source) as script_file:
+            return list(script_file)
+
+    def run_script(self, lines, output=None):
+        """
+        Выполняет команды скрипта построчно, пропуская пустые строки и комментарии.
+
+        Параметры:
+            lines (iterable): Строки скрипта (str или bytes).
+            output (file, optional): Текстовый поток для вывода результатов команд.
+        """
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8', errors='replace')
+            command = line.strip()
+            if not command or command.startswith('#'):
+                continue
+            if output is None:
+                for _ in self.iter_output(command):
+                    pass
+            else:
+                for chunk in self.iter_output(command):
+                    output.write(chunk)
 
     def cleanup(self):
         """
         Очищает временную директорию после завершения работы эмулятора.
         """
         logger.debug('Cleaning up...')
+        self._shutdown_search_pool()
+        self.fs.clear()
         self.zip_ref.close()
 
+    def _shutdown_search_pool(self):
+        """
+        Останавливает пул процессов поиска, если он был запущен.
+        """
+        if self._search_pool is not None:
+            self._search_pool.shutdown(cancel_futures=True)
+            self._search_pool = None
+
     def run_command(self, command, output_widget=None):
         """
         Выполняет указанную команду и выводит результат.
@@ -104,95 +640,180 @@ class Emulator:
             command (str): Команда для выполнения.
             output_widget (tk.Text, optional): Виджет для вывода результата в GUI.
         """
-        parts = command.split()
+        for chunk in self.iter_output(command, echo=output_widget is not None):
+            if output_widget:
+                output_widget.insert('end', chunk)
+        if output_widget:
+            output_widget.see('end')  # Автопрокрутка вниз
+
+    def iter_output(self, command, echo=False, clear_cancel=True):
+        """
+        Выполняет команду и по мере готовности отдает фрагменты её вывода.
+
+        Выполнение можно прервать методом cancel() из другого потока. Флаг
+        прерывания сбрасывается сразу при вызове; если команда ставится в очередь,
+        его нужно сбросить при постановке и передать clear_cancel=False, иначе
+        прерывание, пришедшее до запуска команды, потеряется. Если задан
+        profile_dir, выполнение команды профилируется cProfile.
+
+        Параметры:
+            command (str): Команда для выполнения.
+            echo (bool): Выводить ли строку приглашения с командой.
+            clear_cancel (bool): Сбросить ли флаг прерывания перед выполнением.
+
+        Возвращает:
+            iterator: Фрагменты текста; вывод всегда завершается переводом строки.
+        """
+        if clear_cancel:
+            self.cancel_event.clear()
+        if self.profile_dir is not None:
+            return self._iter_profiled(command, echo)
+        return self._iter_output(command, echo)
+
+    def _iter_profiled(self, command, echo):
+        """
+        Выполняет команду под cProfile и сохраняет статистику в profile_dir.
+
+        Профилировщик включен только пока команда готовит очередной фрагмент,
+        поэтому время потребителя вывода (GUI, сокет) в статистику не попадает.
+        Файл называется "<номер>-<команда>.prof" и читается модулем pstats.
+        """
+        profiler = cProfile.Profile()
+        output = self._iter_output(command, echo)
+        try:
+            while True:
+                profiler.enable()
+                try:
+                    chunk = next(output)
+                except StopIteration:
+                    break
+                finally:
+                    profiler.disable()
+                yield chunk
+        finally:
+            output.close()
+            name = re.sub(r'[^\w.-]', '_', command.split(maxsplit=1)[0] if command.strip() else 'empty')
+            path = os.path.join(self.profile_dir, f"{next(self._profile_counter):06d}-{name}.prof")
+            profiler.dump_stats(path)
+            logger.debug('Profile for %r written to %s', command, path)
+
+    def _iter_output(self, command, echo):
+        """
+        Выполняет команду и отдает фрагменты её вывода (см. iter_output).
+        """
+        try:
+            parts = shlex.split(command)
+        except ValueError:
+            # Незакрытая кавычка: разбиваем строку по пробелам
+            parts = command.split()
         if not parts:
             return
 
-        cmd = parts[0]
-        args = parts[1:]
-
-        if output_widget:
+        if echo:
             # Вывод текущей директории перед командой, как в реальном терминале
-            output_widget.insert(tk.END, f"{self.whoami()}$ {command}\n")
-
-        # Выполнение команды
-        if cmd == 'ls':
-            result = self.ls()
-        elif cmd == 'cd':
-            if args:
-                result = self.cd(args[0])
-            else:
-                result = "cd: missing path"
-        elif cmd == 'exit':
-            result = self.exit()
-        elif cmd == 'date':
-            result = self.date()
-        elif cmd == 'whoami':
-            result = self.whoami()
-        elif cmd == 'uptime':
-            result = self.uptime()
-        else:
-            result = f"{cmd}: command not found"
+            yield f"{self.whoami()}$ {command}\n"
 
-        # Вывод результата команды
-        if output_widget:
-            output_widget.insert(tk.END, result + "\n")
-            output_widget.see(tk.END)  # Автопрокрутка вниз
+        result = None
+        try:
+            result = self._dispatch(parts[0], parts[1:])
+            if isinstance(result, str):
+                if result:
+                    yield result + "\n"
+            else:
+                # Потоковые команды возвращают итератор фрагментов вывода
+                last = "\n"
+                for chunk in result:
+                    if self.cancel_event.is_set():
+                        raise CommandCancelled()
+                    if chunk:
+                        yield chunk
+                        last = chunk
+                if not last.endswith("\n"):
+                    yield "\n"
+        except CommandCancelled:
+            logger.debug('Command cancelled: %s', command)
+            yield "^C\n"
+        except PathError as e:
+            yield f"{parts[0]}: {e}\n"
+        finally:
+            if result is not None and not isinstance(result, str):
+                result.close()
 
         logger.debug('Command executed: %s', command)
 
-    def ls(self):
+    def cancel(self):
         """
-        Выполняет команду 'ls': выводит список файлов и директорий в текущей директории.
+        Просит прервать выполняющуюся команду.
+        """
+        self.cancel_event.set()
+
+    def _check_cancelled(self):
+        """
+        Прерывает команду, если было запрошено её прерывание.
+        """
+        if self.cancel_event.is_set():
+            raise CommandCancelled()
+
+    def _dispatch(self, cmd, args):
+        """
+        Находит обработчик команды в реестре и вызывает его.
+
+        Параметры:
+            cmd (str): Имя команды.
+            args (list): Аргументы команды.
 
         Возвращает:
-            str: Список файлов и директорий.
+            str | iterator: Результат команды.
         """
-        logger.debug('Listing files in current directory: %s', self.current_dir)
-        files = [f for f in self.zip_ref.namelist() if f.startswith(self.current_dir)]
-        current_dir_files = set()
+        spec = registry.get(cmd)
+        if spec is None:
+            return f"{cmd}: command not found"
+        error = spec.check_args(args)
+        if error:
+            return error
+        return spec.handler(self, *args)
 
-        for f in files:
-            relative_path = f.replace(self.current_dir, '', 1).lstrip('/')
-            if '/' not in relative_path:
-                current_dir_files.add(relative_path)
-            else:
-                dir_name = relative_path.split('/')[0]
-                current_dir_files.add(dir_name)
+    @command('ls', max_args=1, usage='ls [DIR]')
+    def ls(self, path=''):
+        """
+        Выполняет команду 'ls': выводит список файлов и директорий.
+
+        Параметры:
+            path (str, optional): Директория, по умолчанию текущая.
 
-        return "\n".join(sorted(current_dir_files))
+        Возвращает:
+            str: Список файлов и директорий.
+        """
+        logger.debug('Listing files in directory: %s', path or self.current_dir)
+        full_path = self._full_path(path)
+        kind = self.fs.lookup(full_path)
+        if kind == 'file':
+            return path
+        if kind is None:
+            return f"ls: cannot access '{path}': No such file or directory"
+        return "\n".join(self.fs.listdir(full_path))
 
 
+    @command('cd', min_args=1, max_args=1, usage='cd DIR')
     def cd(self, path):
         """
         Выполняет команду 'cd': изменяет текущую рабочую директорию.
 
         Параметры:
-            path (str): Путь к новой директории.
+            path (str): Путь к новой директории (абсолютный, относительный или от '~').
 
         Возвращает:
             str: Сообщение о результате операции.
         """
         logger.debug('Changing directory: %s', path)
-
-        if path == '..':
-            if self.current_dir:
-                self.current_dir = os.path.normpath(os.path.join(self.current_dir, '..'))
-                if self.current_dir == '.':
-                    self.current_dir = ''
+        new_path = self._full_path(path)
+        if self.fs.is_dir(new_path):
+            self.current_dir = new_path
             return f"Changed directory to {self.current_dir}"
-        else:
-            new_path = os.path.join(self.current_dir, path)
-            if not new_path.endswith('/'):
-                new_path += '/'
-
-            if any(name.startswith(new_path) for name in self.zip_ref.namelist()):
-                self.current_dir = new_path
-                return f"Changed directory to {self.current_dir}"
-            else:
-                return f"cd: {path}: No such file or directory"
+        return f"cd: {path}: No such file or directory"
 
 
+    @command('exit', max_args=0)
     def exit(self):
         """
         Выполняет команду 'exit': завершает работу эмулятора.
@@ -205,6 +826,7 @@ class Emulator:
         exit()
         return "Exiting emulator..."
 
+    @command('date', max_args=0)
     def date(self):
         """
         Выполняет команду 'date': выводит текущую дату и время.
@@ -216,6 +838,7 @@ class Emulator:
         import datetime
         return str(datetime.datetime.now())
 
+    @command('whoami', max_args=0)
     def whoami(self):
         """
         Выполняет команду 'whoami': выводит имя текущего пользователя.
@@ -224,8 +847,13 @@ class Emulator:
             str: Имя пользователя.
         """
         logger.debug('Getting current user...')
-        return os.getlogin()
+        try:
+            return os.getlogin()
+        except OSError:
+            # Нет управляющего терминала (пакетный режим, сервисы)
+            return getpass.getuser()
 
+    @command('uptime', max_args=0)
     def uptime(self):
         """
         Выполняет команду 'uptime': выводит время работы эмулятора.
@@ -238,63 +866,1067 @@ class Emulator:
         return f"Uptime: {uptime_seconds:.2f} seconds"
 
 
-class ShellGUI:
-    """
-    Класс для создания GUI оболочки, которая позволяет вводить команды и видеть результат их выполнения.
+    @command('help', max_args=0)
+    def help(self):
+        """
+        Выполняет команду 'help': выводит список доступных команд.
 
-    Атрибуты:
-        emulator (Emulator): Объект эмулятора, управляющий командной оболочкой.
-        root (tk.Tk): Корневое окно приложения.
-        output (tk.scrolledtext.ScrolledText): Текстовое поле для вывода результатов команд.
-        entry (tk.Entry): Поле ввода для команд.
-    """
-    
-    def __init__(self, emulator):
+        Возвращает:
+            str: Имена команд.
+        """
+        logger.debug('Listing commands...')
+        return "\n".join(registry.names())
+
+    @command('stats', max_args=0)
+    def stats(self):
+        """
+        Выполняет команду 'stats': выводит счетчики кэша распакованных файлов и путей.
+
+        Возвращает:
+            str: Статистика кэша.
+        """
+        logger.debug('Getting cache stats...')
+        stats = self.cache.stats()
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / lookups * 100 if lookups else 0.0
+        return (f"cache: hits={stats['hits']} misses={stats['misses']} "
+                f"evictions={stats['evictions']} hit_rate={hit_rate:.1f}%\n"
+                f"cache: entries={stats['entries']} size={stats['size']}/{stats['max_bytes']} bytes\n"
+                f"paths: hits={self.resolver.hits} misses={self.resolver.misses}")
+
+    def _full_path(self, path, follow=True):
         """
-        Инициализация GUI для эмулятора.
+        Строит путь от корня с учетом текущей директории через общий PathResolver.
 
         Параметры:
-            emulator (Emulator): Объект эмулятора, управляющий командной оболочкой.
+            path (str): Относительный или абсолютный путь, '~' - корень образа.
+            follow (bool): Переходить ли по ссылке в последнем компоненте пути.
+
+        Возвращает:
+            str: Путь в формате индекса директорий.
         """
-        logger.debug('Initializing GUI...')
-        self.emulator = emulator
-        self.root = tk.Tk()
-        self.root.title("Shell Emulator")
+        return self.resolver.resolve(self.current_dir, path, follow)
 
-        # Текстовое поле для вывода
-        self.output = scrolledtext.ScrolledText(self.root, height=20, width=80, state=tk.NORMAL)
-        self.output.pack()
+    def _read_link(self, member):
+        """
+        Читает цель ссылки из записи архива.
 
-        # Поле ввода для команд
-        self.entry = tk.Entry(self.root, width=80)
-        self.entry.pack()
-        self.entry.bind('<Return>', self.execute_command)
+        Параметры:
+            member (str): Имя записи-ссылки.
 
-        # Выполняем стартовый скрипт
-        self.emulator.run_startup_script()
+        Возвращает:
+            str: Путь цели.
+        """
+        with self._open_member(member) as link_file:
+            return link_file.read().decode('utf-8', errors='replace').strip()
 
-    def execute_command(self, event):
+    def complete(self, line):
         """
-        Обработчик ввода команды: выполняет команду и выводит результат.
+        Подбирает дополнения для последнего слова командной строки.
+
+        Первое слово дополняется именами команд, остальные - путями.
 
         Параметры:
-            event (tk.Event): Событие нажатия клавиши <Return>.
+            line (str): Введенная часть командной строки.
+
+        Возвращает:
+            list: Варианты последнего слова.
         """
-        logger.debug('Executing command: %s', self.entry.get())
-        command = self.entry.get()
-        self.emulator.run_command(command, output_widget=self.output)
-        self.entry.delete(0, tk.END)
+        head, space, word = line.rpartition(' ')
+        if not space:
+            return [name for name in registry.names() if name.startswith(word)]
+        return self.resolver.complete(self.current_dir, word)
 
-    def run(self):
+    def _resolve_file(self, cmd, path):
         """
-        Запуск главного цикла GUI.
+        Находит источник содержимого файла относительно текущей директории.
+
+        Параметры:
+            cmd (str): Имя команды для сообщения об ошибке.
+            path (str): Путь к файлу.
+
+        Возвращает:
+            tuple: (имя записи в архиве или OverlayFile, None)
+                или (None, сообщение об ошибке).
         """
-        logger.debug('Starting GUI main loop...')
-        self.root.mainloop()
+        full_path = self._full_path(path)
+        kind = self.fs.lookup(full_path)
+        if kind == 'file':
+            return self.fs.source(full_path), None
+        if kind == 'dir':
+            return None, f"{cmd}: {path}: Is a directory"
+        return None, f"{cmd}: {path}: No such file or directory"
 
+    @staticmethod
+    def _parse_count(cmd, args, default=10):
+        """
+        Разбирает аргументы вида [-n N] FILE для команд head и tail.
 
-if __name__ == '__main__':
-    config_path = 'config.xml'  # Путь к конфигурационному файлу
-    emulator = Emulator(config_path)
-    gui = ShellGUI(emulator)
+        Возвращает:
+            tuple: (число строк, путь к файлу, сообщение об ошибке или None).
+        """
+        count = default
+        args = list(args)
+        if args and args[0] == '-n':
+            if len(args) < 2 or not args[1].isdigit():
+                return None, None, f"{cmd}: invalid number of lines"
+            count = int(args[1])
+            args = args[2:]
+        elif args and args[0].startswith('-') and args[0][1:].isdigit():
+            count = int(args[0][1:])
+            args = args[1:]
+        if len(args) != 1:
+            return None, None, f"{cmd}: usage: {cmd} [-n N] FILE"
+        return count, args[0], None
+
+    def _source_size(self, source):
+        """
+        Возвращает размер содержимого файла.
+
+        Параметры:
+            source (str | OverlayFile): Имя записи в архиве или файл верхнего слоя.
+
+        Возвращает:
+            int: Размер в байтах.
+        """
+        if isinstance(source, OverlayFile):
+            return source.size
+        return self.zip_ref.getinfo(source).file_size
+
+    def _open_member(self, member):
+        """
+        Открывает файл для чтения.
+
+        Файлы верхнего слоя читаются из памяти (или временного файла). Небольшие
+        записи архива распаковываются целиком и кэшируются, большие читаются
+        потоково напрямую из архива.
+
+        Параметры:
+            member (str | OverlayFile): Имя записи в архиве или файл верхнего слоя.
+
+        Возвращает:
+            file: Файловый объект с содержимым файла.
+        """
+        if isinstance(member, OverlayFile):
+            return member.open()
+        data = self.cache.get(member)
+        if data is not None:
+            return io.BytesIO(data)
+        if self.cache.fits(self.zip_ref.getinfo(member).file_size):
+            data = self.zip_ref.read(member)
+            self.cache.put(member, data)
+            return io.BytesIO(data)
+        return self.zip_ref.open(member)
+
+    def _read_chunks(self, member):
+        """
+        Потоково читает запись архива блоками фиксированного размера.
+
+        Параметры:
+            member (str | OverlayFile): Имя записи в архиве или файл верхнего слоя.
+
+        Возвращает:
+            iterator: Блоки распакованных данных (bytes).
+        """
+        with self._open_member(member) as member_file:
+            while True:
+                self._check_cancelled()
+                chunk = member_file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _read_lines(self, member):
+        """
+        Потоково читает запись архива построчно.
+
+        Параметры:
+            member (str | OverlayFile): Имя записи в архиве или файл верхнего слоя.
+
+        Возвращает:
+            iterator: Строки файла (bytes) вместе с символом перевода строки.
+        """
+        with self._open_member(member) as member_file:
+            for number, line in enumerate(member_file):
+                # Проверка прерывания раз в 4096 строк, чтобы не замедлять чтение
+                if not number & 0xFFF:
+                    self._check_cancelled()
+                yield line
+
+    @staticmethod
+    def _decode(chunks):
+        """
+        Инкрементально декодирует поток байтов в текст UTF-8.
+
+        Параметры:
+            chunks (iterable): Блоки данных (bytes).
+
+        Возвращает:
+            iterator: Фрагменты текста.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for chunk in chunks:
+            yield decoder.decode(chunk)
+        yield decoder.decode(b'', final=True)
+
+    @command('cat', min_args=1, usage='cat FILE...')
+    def cat(self, *paths):
+        """
+        Выполняет команду 'cat': выводит содержимое файлов.
+
+        Параметры:
+            paths (str): Пути к файлам.
+
+        Возвращает:
+            iterator: Фрагменты содержимого файлов.
+        """
+        logger.debug('Reading files: %s', paths)
+        for path in paths:
+            member, error = self._resolve_file('cat', path)
+            if error:
+                yield error + "\n"
+                continue
+            yield from self._decode(self._read_chunks(member))
+
+    @command('head', min_args=1, max_args=3, usage='head [-n N] FILE')
+    def head(self, *args):
+        """
+        Выполняет команду 'head': выводит первые строки файла.
+
+        Параметры:
+            args (str): Аргументы команды: [-n N] FILE.
+
+        Возвращает:
+            iterator: Первые N строк файла.
+        """
+        logger.debug('Reading head of file: %s', args)
+        count, path, error = self._parse_count('head', args)
+        if error:
+            yield error
+            return
+        member, error = self._resolve_file('head', path)
+        if error:
+            yield error
+            return
+        if count == 0:
+            return
+        lines = self._read_lines(member)
+        try:
+            yield from self._decode(line for _, line in zip(range(count), lines))
+        finally:
+            lines.close()
+
+    def _stored_tail(self, info, count):
+        """
+        Читает последние строки несжатой записи, не читая её целиком.
+
+        Данные записи ZIP_STORED лежат в архиве как есть, поэтому достаточно
+        найти их начало по локальному заголовку и читать блоки с конца.
+
+        Параметры:
+            info (zipfile.ZipInfo): Описание записи.
+            count (int): Число строк.
+
+        Возвращает:
+            bytes: Последние строки файла.
+        """
+        with open(self.vfs_path, 'rb') as archive:
+            archive.seek(info.header_offset)
+            header = _ZIP_FILE_HEADER.unpack(archive.read(_ZIP_FILE_HEADER.size))
+            data_start = info.header_offset + _ZIP_FILE_HEADER.size + header[10] + header[11]
+            end = info.file_size
+            # Завершающий перевод строки не отделяет ещё одну строку
+            if end:
+                archive.seek(data_start + end - 1)
+                if archive.read(1) == b"\n":
+                    end -= 1
+            pos = end
+            newlines = 0
+            while pos > 0 and newlines < count:
+                size = min(CHUNK_SIZE, pos)
+                pos -= size
+                archive.seek(data_start + pos)
+                newlines += archive.read(size).count(b"\n")
+            archive.seek(data_start + pos)
+            data = archive.read(info.file_size - pos)
+        lines = data.splitlines(keepends=True)
+        return b"".join(lines[-count:])
+
+    @command('tail', min_args=1, max_args=3, usage='tail [-n N] FILE')
+    def tail(self, *args):
+        """
+        Выполняет команду 'tail': выводит последние строки файла.
+
+        Для больших несжатых записей данные читаются с конца, для остальных -
+        потоково с хранением только последних N строк.
+
+        Параметры:
+            args (str): Аргументы команды: [-n N] FILE.
+
+        Возвращает:
+            iterator: Последние N строк файла.
+        """
+        logger.debug('Reading tail of file: %s', args)
+        count, path, error = self._parse_count('tail', args)
+        if error:
+            yield error
+            return
+        member, error = self._resolve_file('tail', path)
+        if error:
+            yield error
+            return
+        if count == 0:
+            return
+        info = None if isinstance(member, OverlayFile) else self.zip_ref.getinfo(member)
+        if (info is not None and info.compress_type == zipfile.ZIP_STORED
+                and not info.flag_bits & 0x1 and not self.cache.fits(info.file_size)):
+            yield from self._decode([self._stored_tail(info, count)])
+        else:
+            yield from self._decode(deque(self._read_lines(member), maxlen=count))
+
+    @command('wc', min_args=1, usage='wc FILE...')
+    def wc(self, *paths):
+        """
+        Выполняет команду 'wc': считает строки, слова и байты в файлах.
+
+        Параметры:
+            paths (str): Пути к файлам.
+
+        Возвращает:
+            str: Строки вида "строки слова байты имя".
+        """
+        logger.debug('Counting words in files: %s', paths)
+        results = []
+        for path in paths:
+            member, error = self._resolve_file('wc', path)
+            if error:
+                results.append(error)
+                continue
+            lines = words = size = 0
+            in_word = False
+            for chunk in self._read_chunks(member):
+                lines += chunk.count(b"\n")
+                size += len(chunk)
+                words += len(chunk.split())
+                # Слово, разрезанное границей блоков, не считаем дважды
+                if in_word and not chunk[:1].isspace():
+                    words -= 1
+                in_word = not chunk[-1:].isspace()
+            results.append(f"{lines:7} {words:7} {size:7} {path}")
+        return "\n".join(results)
+
+    @command('find', usage='find [DIR] [-name GLOB] [-type f|d]')
+    def find(self, *args):
+        """
+        Выполняет команду 'find': рекурсивно ищет файлы и директории по имени.
+
+        Поиск идет по индексу директорий, содержимое архива не читается.
+
+        Параметры:
+            args (str): Аргументы команды: [DIR] [-name GLOB] [-type f|d].
+
+        Возвращает:
+            iterator: Найденные пути в порядке обхода.
+        """
+        logger.debug('Finding files: %s', args)
+        args = list(args)
+        start = '.'
+        if args and not args[0].startswith('-'):
+            start = args.pop(0)
+        name_glob = None
+        kind = None
+        while args:
+            option = args.pop(0)
+            if option in ('-name', '-type') and not args:
+                yield f"find: missing argument to '{option}'"
+                return
+            if option == '-name':
+                name_glob = args.pop(0)
+            elif option == '-type':
+                kind = args.pop(0)
+                if kind not in ('f', 'd'):
+                    yield f"find: Unknown argument to -type: {kind}"
+                    return
+            else:
+                yield f"find: unknown predicate '{option}'"
+                return
+
+        root = self._full_path(start)
+        if not self.fs.is_dir(root):
+            yield f"find: '{start}': No such file or directory"
+            return
+
+        def matches(path, is_dir):
+            if kind is not None and (kind == 'd') != is_dir:
+                return False
+            return name_glob is None or fnmatch.fnmatchcase(posixpath.basename(path), name_glob)
+
+        if matches(start.rstrip('/') or '/', True):
+            yield start + "\n"
+        offset = len(root) + 1 if root else 0
+        for path, is_dir in self.fs.walk(root):
+            if matches(path, is_dir):
+                yield posixpath.join(start, path[offset:]) + "\n"
+
+    def _search_targets(self, cmd, paths, recursive):
+        """
+        Собирает список файлов для поиска по аргументам команды.
+
+        Параметры:
+            cmd (str): Имя команды для сообщений об ошибках.
+            paths (list): Пути к файлам (и директориям при рекурсивном поиске).
+            recursive (bool): Раскрывать ли директории.
+
+        Возвращает:
+            tuple: (список троек (отображаемый путь, имя записи, размер), список ошибок).
+        """
+        targets = []
+        errors = []
+        for path in paths:
+            full_path = self._full_path(path)
+            if recursive and self.fs.is_dir(full_path):
+                offset = len(full_path) + 1 if full_path else 0
+                for child, is_dir in self.fs.walk(full_path):
+                    if not is_dir:
+                        source = self.fs.source(child)
+                        targets.append((posixpath.join(path, child[offset:]), source,
+                                        self._source_size(source)))
+                continue
+            source, error = self._resolve_file(cmd, path)
+            if error:
+                errors.append(error)
+            else:
+                targets.append((path, source, self._source_size(source)))
+        return targets, errors
+
+    def _get_search_pool(self):
+        """
+        Возвращает пул процессов для поиска, создавая его при первом обращении.
+
+        Возвращает:
+            ProcessPoolExecutor: Пул, каждый воркер которого держит свой дескриптор архива.
+        """
+        if self._search_pool is None:
+            self._search_pool = ProcessPoolExecutor(
+                max_workers=self.search_workers,
+                initializer=search.init_worker,
+                initargs=(self.vfs_path, self.config['vfs_backend']),
+            )
+        return self._search_pool
+
+    def _grep_parallel(self, targets, pattern, flags):
+        """
+        Ищет шаблон в файлах пулом процессов, сохраняя порядок файлов.
+
+        Параметры:
+            targets (list): Тройки (отображаемый путь, имя записи, размер).
+            pattern (bytes): Регулярное выражение.
+            flags (int): Флаги модуля re.
+
+        Возвращает:
+            iterator: Тройки (отображаемый путь, номер строки, строка).
+        """
+        batches = search.make_batches(targets)
+        members = [[member for _, member, _ in batch] for batch in batches]
+        # map отдает результаты в порядке пакетов по мере их готовности
+        results = self._get_search_pool().map(
+            search.grep_batch, members, [pattern] * len(batches), [flags] * len(batches))
+        for batch, batch_results in zip(batches, results):
+            for (display, _, _), matches in zip(batch, batch_results):
+                for number, line in matches:
+                    yield display, number, line
+
+    def _grep_serial(self, targets, regex):
+        """
+        Ищет шаблон в файлах в текущем процессе через кэш распакованных файлов.
+
+        Параметры:
+            targets (list): Тройки (отображаемый путь, имя записи, размер).
+            regex (re.Pattern): Скомпилированный шаблон над bytes.
+
+        Возвращает:
+            iterator: Тройки (отображаемый путь, номер строки, строка).
+        """
+        for display, member, _ in targets:
+            for number, line in enumerate(self._read_lines(member), 1):
+                if regex.search(line):
+                    yield display, number, line.rstrip(b"\n")
+
+    @command('grep', min_args=1, usage='grep [-i] [-n] [-r] PATTERN FILE...')
+    def grep(self, *args):
+        """
+        Выполняет команду 'grep': выводит строки файлов, совпадающие с шаблоном.
+
+        С опцией -r директории обходятся рекурсивно, а при большом объеме данных
+        распаковка и сопоставление распределяются по пулу процессов.
+
+        Параметры:
+            args (str): Аргументы команды: [-i] [-n] [-r] PATTERN FILE...
+
+        Возвращает:
+            iterator: Совпавшие строки.
+        """
+        logger.debug('Searching in files: %s', args)
+        args = list(args)
+        flags = 0
+        show_numbers = False
+        recursive = False
+        while args and args[0].startswith('-') and len(args[0]) > 1:
+            option = args.pop(0)
+            if option == '-i':
+                flags |= re.IGNORECASE
+            elif option == '-n':
+                show_numbers = True
+            elif option == '-r':
+                recursive = True
+            else:
+                yield f"grep: invalid option -- '{option}'"
+                return
+        if recursive and len(args) == 1:
+            args.append('.')
+        if len(args) < 2:
+            yield "grep: usage: grep [-i] [-n] [-r] PATTERN FILE..."
+            return
+        pattern = args[0].encode('utf-8')
+        try:
+            regex = re.compile(pattern, flags)
+        except re.error as e:
+            yield f"grep: invalid pattern: {e}"
+            return
+        paths = args[1:]
+        targets, errors = self._search_targets('grep', paths, recursive)
+        for error in errors:
+            yield error + "\n"
+
+        total_size = sum(size for _, _, size in targets)
+        # Воркеры читают только архив, поэтому файлы верхнего слоя ищутся в этом процессе
+        in_archive = all(isinstance(source, str) for _, source, _ in targets)
+        if (recursive and in_archive and self.search_workers > 1
+                and total_size >= PARALLEL_SEARCH_MIN_BYTES):
+            matches = self._grep_parallel(targets, pattern, flags)
+        else:
+            matches = self._grep_serial(targets, regex)
+
+        show_names = recursive or len(paths) > 1
+        for display, number, line in matches:
+            prefix = f"{display}:" if show_names else ""
+            if show_numbers:
+                prefix += f"{number}:"
+            yield prefix + line.decode('utf-8', errors='replace') + "\n"
+
+    def _parent_dir_exists(self, full_path):
+        """
+        Проверяет, что родительская директория пути существует.
+
+        Параметры:
+            full_path (str): Нормализованный путь.
+
+        Возвращает:
+            bool: True, если путь не корень и его родитель - директория.
+        """
+        return bool(full_path) and self.fs.is_dir(full_path.rpartition('/')[0])
+
+    @command('touch', min_args=1, usage='touch FILE...')
+    def touch(self, *paths):
+        """
+        Выполняет команду 'touch': создает пустые файлы.
+
+        Параметры:
+            paths (str): Пути к файлам.
+
+        Возвращает:
+            str: Сообщения об ошибках.
+        """
+        logger.debug('Touching files: %s', paths)
+        errors = []
+        for path in paths:
+            full_path = self._full_path(path)
+            if self.fs.lookup(full_path) is not None:
+                continue
+            if not self._parent_dir_exists(full_path):
+                errors.append(f"touch: cannot touch '{path}': No such file or directory")
+                continue
+            if is_reserved(full_path):
+                errors.append(f"touch: cannot touch '{path}': Invalid argument")
+                continue
+            self.fs.write(full_path, b'')
+        return "\n".join(errors)
+
+    @command('mkdir', min_args=1, usage='mkdir [-p] DIR...')
+    def mkdir(self, *args):
+        """
+        Выполняет команду 'mkdir': создает директории.
+
+        Параметры:
+            args (str): Аргументы команды: [-p] DIR...
+
+        Возвращает:
+            str: Сообщения об ошибках.
+        """
+        logger.debug('Creating directories: %s', args)
+        parents = False
+        paths = []
+        args = list(args)
+        # Как в GNU mkdir, опции можно указывать и после путей, до '--'
+        while args:
+            arg = args.pop(0)
+            if arg == '--':
+                paths.extend(args)
+                break
+            if arg.startswith('-') and len(arg) > 1:
+                for flag in arg[1:]:
+                    if flag != 'p':
+                        return f"mkdir: invalid option -- '{flag}'\nusage: mkdir [-p] DIR..."
+                parents = True
+            else:
+                paths.append(arg)
+        if not paths:
+            return "mkdir: missing operand\nusage: mkdir [-p] DIR..."
+        errors = []
+        for path in paths:
+            full_path = self._full_path(path)
+            kind = self.fs.lookup(full_path)
+            if kind == 'dir' and parents:
+                continue
+            if kind is not None:
+                errors.append(f"mkdir: cannot create directory '{path}': File exists")
+                continue
+            if is_reserved(full_path):
+                # Имена ".wh.*" в архиве означают удаление
+                errors.append(f"mkdir: cannot create directory '{path}': Invalid argument")
+                continue
+            if parents:
+                # Каждый предок должен быть директорией или отсутствовать
+                prefix = ''
+                for part in full_path.split('/'):
+                    prefix = f"{prefix}/{part}" if prefix else part
+                    if self.fs.lookup(prefix) == 'file':
+                        break
+                else:
+                    self.fs.mkdir(full_path)
+                    continue
+                errors.append(f"mkdir: cannot create directory '{path}': Not a directory")
+                continue
+            if not self._parent_dir_exists(full_path):
+                errors.append(f"mkdir: cannot create directory '{path}': No such file or directory")
+                continue
+            self.fs.mkdir(full_path)
+        return "\n".join(errors)
+
+    @command('rm', min_args=1, usage='rm [-r] [-f] PATH...')
+    def rm(self, *args):
+        """
+        Выполняет команду 'rm': удаляет файлы и (с -r) директории.
+
+        Параметры:
+            args (str): Аргументы команды: [-r] [-f] PATH...
+
+        Возвращает:
+            str: Сообщения об ошибках.
+        """
+        logger.debug('Removing: %s', args)
+        args = list(args)
+        recursive = force = False
+        while args and args[0].startswith('-') and len(args[0]) > 1:
+            option = args.pop(0)
+            for flag in option[1:]:
+                if flag in 'rR':
+                    recursive = True
+                elif flag == 'f':
+                    force = True
+                else:
+                    return f"rm: invalid option -- '{flag}'"
+        errors = []
+        for path in args:
+            full_path = self._full_path(path, follow=False)
+            kind = self.fs.lookup(full_path)
+            if kind is None:
+                if not force:
+                    errors.append(f"rm: cannot remove '{path}': No such file or directory")
+                continue
+            if not full_path:
+                errors.append("rm: refusing to remove '/'")
+                continue
+            if kind == 'dir' and not recursive:
+                errors.append(f"rm: cannot remove '{path}': Is a directory")
+                continue
+            self.fs.remove(full_path)
+        return "\n".join(errors)
+
+    def _copy_target(self, cmd, src, dst):
+        """
+        Определяет пути источника и назначения для cp и mv.
+
+        Если назначение - существующая директория, объект копируется внутрь неё.
+
+        Возвращает:
+            tuple: (путь источника, путь назначения, None) или (None, None, ошибка).
+        """
+        # mv перемещает саму ссылку, cp копирует содержимое её цели
+        src_path = self._full_path(src, follow=cmd != 'mv')
+        if self.fs.lookup(src_path) is None:
+            return None, None, f"{cmd}: cannot stat '{src}': No such file or directory"
+        if cmd == 'mv' and self.fs.link_member(src_path) is not None:
+            return None, None, f"{cmd}: cannot move '{src}': moving symbolic links is not supported"
+        dst_path = self._full_path(dst)
+        if self.fs.is_dir(dst_path):
+            name = posixpath.basename(src.rstrip('/')) or posixpath.basename(src_path)
+            if name in ('.', '..', '~'):
+                name = posixpath.basename(src_path)
+            dst_path = posixpath.join(dst_path, name).strip('/')
+        if not self._parent_dir_exists(dst_path):
+            return None, None, f"{cmd}: cannot create '{dst}': No such file or directory"
+        if is_reserved(dst_path):
+            return None, None, f"{cmd}: cannot create '{dst}': Invalid argument"
+        if dst_path == src_path or dst_path.startswith(src_path + '/'):
+            return None, None, f"{cmd}: cannot copy '{src}' into itself"
+        if self.fs.is_dir(dst_path):
+            return None, None, f"{cmd}: cannot overwrite directory '{dst}'"
+        return src_path, dst_path, None
+
+    def _copy_tree(self, src_path, dst_path):
+        """
+        Копирует файл или директорию в верхний слой.
+
+        Файлы верхнего слоя копируются блоками, а для файлов архива верхний
+        слой только запоминает имя записи: перемещение большой директории
+        архива не распаковывает её.
+        """
+        if self.fs.is_file(src_path):
+            self._copy_file(src_path, dst_path)
+            return
+        self.fs.mkdir(dst_path)
+        offset = len(src_path) + 1 if src_path else 0
+        # Список составляется заранее, так как копирование меняет дерево
+        for child, is_dir in list(self.fs.walk(src_path)):
+            target = f"{dst_path}/{child[offset:]}"
+            if is_dir:
+                self.fs.mkdir(target)
+            else:
+                self._copy_file(child, target)
+
+    def _copy_file(self, src_path, dst_path):
+        """
+        Копирует файл в верхний слой (файл архива - ссылкой на его запись).
+        """
+        source = self.fs.source(src_path)
+        if isinstance(source, OverlayFile):
+            self.fs.write(dst_path, self._read_chunks(source))
+        else:
+            self.fs.redirect(dst_path, source)
+
+    @command('cp', min_args=2, max_args=3, usage='cp [-r] SOURCE DEST')
+    def cp(self, *args):
+        """
+        Выполняет команду 'cp': копирует файл (с -r - директорию).
+
+        Параметры:
+            args (str): Аргументы команды: [-r] SOURCE DEST.
+
+        Возвращает:
+            str: Сообщение об ошибке.
+        """
+        logger.debug('Copying: %s', args)
+        recursive = args[0] in ('-r', '-R')
+        if recursive:
+            args = args[1:]
+        if len(args) != 2:
+            return "cp: usage: cp [-r] SOURCE DEST"
+        src, dst = args
+        src_path, dst_path, error = self._copy_target('cp', src, dst)
+        if error:
+            return error
+        if self.fs.is_dir(src_path) and not recursive:
+            return f"cp: -r not specified; omitting directory '{src}'"
+        self._copy_tree(src_path, dst_path)
+        return ""
+
+    @command('mv', min_args=2, max_args=2, usage='mv SOURCE DEST')
+    def mv(self, src, dst):
+        """
+        Выполняет команду 'mv': перемещает файл или директорию.
+
+        Параметры:
+            src (str): Исходный путь.
+            dst (str): Путь назначения.
+
+        Возвращает:
+            str: Сообщение об ошибке.
+        """
+        logger.debug('Moving %s to %s', src, dst)
+        src_path, dst_path, error = self._copy_target('mv', src, dst)
+        if error:
+            return error
+        if not src_path:
+            return "mv: cannot move '/'"
+        self._copy_tree(src_path, dst_path)
+        self.fs.remove(src_path)
+        return ""
+
+    @command('echo', usage='echo [TEXT]... [> FILE | >> FILE]')
+    def echo(self, *args):
+        """
+        Выполняет команду 'echo': выводит текст или записывает его в файл.
+
+        Параметры:
+            args (str): Слова текста и необязательное перенаправление '>' или '>>'.
+
+        Возвращает:
+            str: Текст или сообщение об ошибке.
+        """
+        logger.debug('Echo: %s', args)
+        words = list(args)
+        redirect = None
+        for operator in ('>', '>>'):
+            if operator in words:
+                position = words.index(operator)
+                if position != len(words) - 2:
+                    return f"echo: usage: echo [TEXT]... [{operator} FILE]"
+                redirect = operator, words[-1]
+                words = words[:position]
+                break
+        text = " ".join(words)
+        if redirect is None:
+            return text
+
+        operator, path = redirect
+        full_path = self._full_path(path)
+        kind = self.fs.lookup(full_path)
+        if kind == 'dir':
+            return f"echo: {path}: Is a directory"
+        if kind is None and not self._parent_dir_exists(full_path):
+            return f"echo: {path}: No such file or directory"
+        if is_reserved(full_path):
+            return f"echo: {path}: Invalid argument"
+        data = (text + "\n").encode('utf-8')
+        if operator == '>>' and kind == 'file':
+            # Копирование при записи: старое содержимое переносится в верхний слой
+            old = self._read_chunks(self.fs.source(full_path))
+            self.fs.write(full_path, itertools.chain(old, (data,)))
+        else:
+            self.fs.write(full_path, data)
+        return ""
+
+    @command('sync', max_args=0)
+    def sync(self):
+        """
+        Выполняет команду 'sync': дописывает изменения верхнего слоя в архив.
+
+        Изменения добавляются в конец архива одним проходом, без его перезаписи:
+        удаления - пустыми записями ".wh.<имя>", новые директории и файлы -
+        обычными записями. После этого архив открывается заново. Если запись
+        не удалась, архив возвращается к прежнему виду, а верхний слой
+        сохраняется до следующей попытки.
+
+        Возвращает:
+            str: Число записанных записей или сообщение об ошибке.
+        """
+        logger.debug('Syncing overlay to %s', self.vfs_path)
+        if not self.fs.is_dirty():
+            return "sync: nothing to do"
+        self._shutdown_search_pool()
+        self.zip_ref.close()
+        try:
+            count = self._append_changes()
+        except (OSError, zipfile.BadZipFile) as e:
+            logger.exception('Sync to %s failed', self.vfs_path)
+            self.init_vfs(keep_overlay=True)
+            return f"sync: {e}"
+        self.fs.clear()
+        self.cache.clear()
+        self.init_vfs()
+        return f"sync: {count} entries written to {self.vfs_path}"
+
+    def _append_changes(self):
+        """
+        Дописывает изменения верхнего слоя в архив.
+
+        Дозапись начинается с места центрального каталога, поэтому он заранее
+        копируется во временный файл: при ошибке архив обрезается и каталог
+        записывается обратно.
+
+        Возвращает:
+            int: Число записанных записей.
+        """
+        count = 0
+        start = None
+        # Файлы, перенесенные из архива без копирования, читаются из его
+        # прежней версии: дозапись не трогает данные уже записанных записей
+        redirects = any(isinstance(upper, str) for upper in self.fs.files.values())
+        with tempfile.TemporaryFile() as saved, \
+                (zipfile.ZipFile(self.vfs_path) if redirects else contextlib.nullcontext()) as lower:
+            try:
+                with warnings.catch_warnings():
+                    # Повторное имя записи - ожидаемый способ заменить файл
+                    warnings.simplefilter('ignore', UserWarning)
+                    with zipfile.ZipFile(self.vfs_path, 'a', zipfile.ZIP_DEFLATED) as archive:
+                        with open(self.vfs_path, 'rb') as f:
+                            f.seek(archive.start_dir)
+                            shutil.copyfileobj(f, saved, CHUNK_SIZE)
+                        start = archive.start_dir
+                        for name, upper in self.fs.changes():
+                            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                            if upper is None:
+                                archive.writestr(info, b'')
+                            else:
+                                info.compress_type = zipfile.ZIP_DEFLATED
+                                if isinstance(upper, str):
+                                    info.file_size = lower.getinfo(upper).file_size
+                                    src = lower.open(upper)
+                                else:
+                                    info.file_size = upper.size
+                                    src = upper.open()
+                                with src, archive.open(info, 'w') as dst:
+                                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                            count += 1
+            except BaseException:
+                if start is not None:
+                    with open(self.vfs_path, 'r+b') as f:
+                        f.truncate(start)
+                        f.seek(start)
+                        saved.seek(0)
+                        shutil.copyfileobj(saved, f, CHUNK_SIZE)
+                raise
+        return count
+
+class Session(Emulator):
+    """
+    Сеанс работы с общим эмулятором (например, одно подключение к серверу).
+
+    Архив, индекс директорий, записываемый слой, кэш и пул поиска берутся
+    у общего эмулятора, а текущая директория, время запуска и прерывание
+    команд у каждого сеанса свои. Создание сеанса не перечитывает архив.
+
+    Атрибуты:
+        shared (Emulator): Общий эмулятор.
+    """
+
+    def __init__(self, shared):
+        """
+        Создает сеанс над уже инициализированным эмулятором.
+
+        Параметры:
+            shared (Emulator): Общий эмулятор.
+        """
+        self.shared = shared
+        self.config = shared.config
+        self.vfs_path = shared.vfs_path
+        self.startup_script = shared.startup_script
+        self.search_workers = shared.search_workers
+        self.current_dir = ''
+        self.cancel_event = threading.Event()
+        self.start_time = time.time()
+        self.profile_dir = shared.profile_dir
+        self._profile_counter = shared._profile_counter
+
+    @property
+    def zip_ref(self):
+        return self.shared.zip_ref
+
+    @property
+    def index(self):
+        return self.shared.index
+
+    @property
+    def fs(self):
+        return self.shared.fs
+
+    @property
+    def cache(self):
+        return self.shared.cache
+
+    @property
+    def resolver(self):
+        return self.shared.resolver
+
+    def init_vfs(self, keep_overlay=False):
+        # Переоткрытие архива (после sync) видно всем сеансам
+        self.shared.init_vfs(keep_overlay)
+
+    def _get_search_pool(self):
+        return self.shared._get_search_pool()
+
+    def _shutdown_search_pool(self):
+        self.shared._shutdown_search_pool()
+
+    def cleanup(self):
+        """
+        Завершает сеанс, не закрывая общий архив.
+        """
+        logger.debug('Closing session')
+        self.cancel()
+
+def run_batch(emulator, script_path):
+    """
+    Выполняет скрипт в пакетном режиме, выводя результаты в stdout.
+
+    Вывод пишется через большой буфер и сбрасывается в конце работы,
+    tkinter при этом не импортируется.
+
+    Параметры:
+        emulator (Emulator): Объект эмулятора.
+        script_path (str): Путь к скрипту на хост-системе или '-' для stdin.
+    """
+    output = open(sys.stdout.fileno(), 'w', encoding='utf-8',
+                  buffering=BATCH_OUTPUT_BUFFER, closefd=False)
+    script = sys.stdin if script_path == '-' else open(script_path, encoding='utf-8')
+    try:
+        emulator.run_startup_script(output)
+        emulator.run_script(script, output)
+    except SystemExit:
+        # Команда exit завершает скрипт досрочно
+        pass
+    finally:
+        output.flush()
+        if script is not sys.stdin:
+            script.close()
+        emulator.cleanup()
+
+
+def main(argv=None):
+    """
+    Точка входа: запускает GUI, пакетный режим, сервер сеансов или клиент к нему.
+
+    Параметры:
+        argv (list, optional): Аргументы командной строки.
+    """
+    parser = argparse.ArgumentParser(description='Shell emulator over a zip virtual file system')
+    parser.add_argument('--config', default='config.xml', help='Путь к конфигурационному файлу')
+    parser.add_argument('--batch', nargs='?', const='-', metavar='SCRIPT',
+                        help='Выполнить скрипт без GUI (без аргумента или "-" - читать stdin)')
+    parser.add_argument('--profile', nargs='?', const='profiles', metavar='DIR',
+                        help='Сохранять статистику cProfile каждой команды в DIR (по умолчанию profiles)')
+    parser.add_argument('--serve', metavar='ADDRESS',
+                        help='Запустить сервер сеансов ("host:port" или "unix:/путь")')
+    parser.add_argument('--server-workers', type=int, default=None, metavar='N',
+                        help='Число потоков сервера для выполнения команд')
+    parser.add_argument('--connect', metavar='ADDRESS',
+                        help='Подключиться к серверу сеансов и передавать ему команды из stdin')
+    args = parser.parse_args(argv)
+
+    if args.connect is not None:
+        from server import run_client
+        run_client(args.connect)
+        return
+
+    emulator = Emulator(args.config)
+    if args.profile is not None:
+        os.makedirs(args.profile, exist_ok=True)
+        emulator.profile_dir = args.profile
+    if args.batch is not None:
+        run_batch(emulator, args.batch)
+        return
+    if args.serve is not None:
+        # Сервер импортируется только здесь, как и GUI
+        from server import serve, DEFAULT_SERVER_WORKERS
+        serve(emulator, args.serve, args.server_workers or DEFAULT_SERVER_WORKERS)
+        return
+
+    # GUI импортируется только здесь, чтобы пакетный режим не загружал tkinter
+    from gui import ShellGUI
+    gui = ShellGUI(emulator)
     gui.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,50 +1,398 @@
-import os
+"""
+Генератор образов виртуальной файловой системы.
+
+Без аргументов создает небольшой демонстрационный архив virtual_fs.zip.
+С параметрами строит синтетическое дерево заданной глубины и ширины с
+файлами случайного размера - для замеров на архивах с миллионами записей.
+Записи пишутся прямо в ZIP без временных файлов на диске. Для методов
+stored и deflated содержимое готовится и сжимается заранее (при желании -
+в нескольких процессах), а в архив дописываются уже сжатые данные.
+
+Использование:
+    python generate_virtual_fs.py
+    python generate_virtual_fs.py big.zip --depth 3 --fanout 10 --files-per-dir 1000 \\
+        --size lognormal:8:1.5 --compression deflated --seed 1 --workers 4
+"""
+
+import argparse
+import itertools
+import random
 import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Содержимое демонстрационного архива
+SAMPLE_FILES = {
+    'folder1/file1.txt': 'This is file1 in folder1.',
+    'folder1/file2.txt': 'This is file2 in folder1.',
+    'folder2/file3.txt': 'This is file3 in folder2.',
+    'folder2/file4.txt': 'This is file4 in folder2.',
+    'startup.sh': ('# startup.sh\n'
+                   'echo "Running startup script..."\n'
+                   'ls\n'
+                   'cd folder1\n'
+                   'ls\n'
+                   'date\n'),
+}
+
+COMPRESSION_METHODS = {
+    'stored': zipfile.ZIP_STORED,
+    'deflated': zipfile.ZIP_DEFLATED,
+    'bzip2': zipfile.ZIP_BZIP2,
+    'lzma': zipfile.ZIP_LZMA,
+}
+
+# Методы, для которых данные сжимаются до записи в архив (в том числе в воркерах)
+PRECOMPRESSED_METHODS = frozenset({zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED})
+
+# Фиксированное время записей, чтобы архив с тем же seed совпадал побайтно
+DATE_TIME = (2024, 1, 1, 0, 0, 0)
+
+# Слова, из которых составляется содержимое файлов
+WORDS = ('alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu nu xi '
+         'omicron pi rho sigma tau upsilon phi chi psi omega error warning info '
+         'debug request response user session config').split()
 
-# Создание структуры файловой системы
-def create_virtual_fs_structure(base_dir):
-    os.makedirs(os.path.join(base_dir, 'folder1'), exist_ok=True)
-    os.makedirs(os.path.join(base_dir, 'folder2'), exist_ok=True)
-
-    # Создание файлов в folder1
-    with open(os.path.join(base_dir, 'folder1', 'file1.txt'), 'w') as f:
-        f.write('This is file1 in folder1.')
-    with open(os.path.join(base_dir, 'folder1', 'file2.txt'), 'w') as f:
-        f.write('This is file2 in folder1.')
-
-    # Создание файлов в folder2
-    with open(os.path.join(base_dir, 'folder2', 'file3.txt'), 'w') as f:
-        f.write('This is file3 in folder2.')
-    with open(os.path.join(base_dir, 'folder2', 'file4.txt'), 'w') as f:
-        f.write('This is file4 in folder2.')
-
-    # Создание startup.sh
-    with open(os.path.join(base_dir, 'startup.sh'), 'w') as f:
-        f.write('# startup.sh\n')
-        f.write('echo "Running startup script..."\n')
-        f.write('ls\n')
-        f.write('cd folder1\n')
-        f.write('ls\n')
-        f.write('date\n')
-
-# Создание ZIP-архива
-def create_zip_archive(base_dir, output_zip):
+# Размер общего блока текста, из которого вырезается содержимое файлов
+CORPUS_SIZE = 1 << 20
+
+# Число файлов в одном задании процесса-воркера
+WORKER_BATCH = 2048
+
+
+def create_sample_archive(output_zip):
+    """
+    Создает демонстрационный архив с несколькими файлами и стартовым скриптом.
+
+    Параметры:
+        output_zip (str): Путь к создаваемому архиву.
+    """
     with zipfile.ZipFile(output_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(base_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                zipf.write(file_path, os.path.relpath(file_path, base_dir))
+        for name, text in SAMPLE_FILES.items():
+            zipf.writestr(name, text)
+
+
+def parse_size_distribution(spec):
+    """
+    Разбирает описание распределения размеров файлов.
+
+    Параметры:
+        spec (str): "fixed:N", "uniform:MIN:MAX" или "lognormal:MU:SIGMA"
+            (размер - exp(N(MU, SIGMA)) байт).
+
+    Возвращает:
+        tuple: (вид распределения, параметры).
+    """
+    kind, _, params = spec.partition(':')
+    try:
+        values = tuple(float(p) for p in params.split(':')) if params else ()
+    except ValueError:
+        raise ValueError(f"Invalid size distribution: {spec!r}")
+    expected = {'fixed': 1, 'uniform': 2, 'lognormal': 2}
+    if kind not in expected or len(values) != expected[kind]:
+        raise ValueError(f"Invalid size distribution: {spec!r}")
+    return kind, values
+
+
+def sample_size(rng, distribution, max_size):
+    """
+    Выбирает размер файла из распределения.
+
+    Параметры:
+        rng (random.Random): Генератор случайных чисел.
+        distribution (tuple): Результат parse_size_distribution().
+        max_size (int): Верхняя граница размера в байтах.
+
+    Возвращает:
+        int: Размер файла в байтах.
+    """
+    kind, values = distribution
+    if kind == 'fixed':
+        size = values[0]
+    elif kind == 'uniform':
+        size = rng.uniform(*values)
+    else:
+        size = rng.lognormvariate(*values)
+    return max(0, min(int(size), max_size))
+
+
+def make_corpus(seed):
+    """
+    Генерирует блок текста, из которого вырезается содержимое файлов.
+
+    Параметры:
+        seed (int): Начальное значение генератора.
+
+    Возвращает:
+        bytes: Текст из строк случайных слов длиной CORPUS_SIZE байт.
+    """
+    rng = random.Random(seed)
+    lines = []
+    size = 0
+    while size < CORPUS_SIZE:
+        line = ' '.join(rng.choices(WORDS, k=rng.randint(3, 12))) + '\n'
+        lines.append(line)
+        size += len(line)
+    return ''.join(lines).encode('ascii')[:CORPUS_SIZE]
+
+
+def iter_paths(depth, fanout, files_per_dir, max_files=None):
+    """
+    Перечисляет пути файлов синтетического дерева в прямом порядке обхода.
+
+    Параметры:
+        depth (int): Число уровней директорий под корнем.
+        fanout (int): Число поддиректорий в каждой директории.
+        files_per_dir (int): Число файлов в каждой директории (включая корень).
+        max_files (int, optional): Ограничение на общее число файлов.
+
+    Возвращает:
+        iterator: Пути файлов.
+    """
+    def walk(prefix, level):
+        for j in range(files_per_dir):
+            yield f"{prefix}file{j}.txt"
+        if level < depth:
+            for i in range(fanout):
+                yield from walk(f"{prefix}dir{i}/", level + 1)
+
+    return itertools.islice(walk('', 0), max_files)
+
+
+def count_files(depth, fanout, files_per_dir, max_files=None):
+    """
+    Считает файлы синтетического дерева, не перечисляя их.
+
+    Возвращает:
+        int: Число путей, которые выдаст iter_paths() с теми же параметрами.
+    """
+    count = files_per_dir * sum(fanout ** level for level in range(depth + 1))
+    return count if max_files is None else min(count, max_files)
+
+
+class ContentBuilder:
+    """
+    Готовит содержимое файлов по их номерам.
+
+    Содержимое i-го файла зависит только от seed и i, поэтому архив получается
+    одинаковым при любом числе процессов.
+
+    Атрибуты:
+        seed (int): Начальное значение генератора.
+        distribution (tuple): Распределение размеров файлов.
+        max_size (int): Верхняя граница размера файла.
+        compress_type (int): Метод сжатия записей.
+        level (int | None): Уровень сжатия.
+    """
+
+    def __init__(self, seed, distribution, max_size,
+                 compress_type=zipfile.ZIP_STORED, level=None):
+        self.seed = seed
+        self.distribution = distribution
+        self.max_size = max_size
+        self.compress_type = compress_type
+        self.level = level
+        self._corpus = None
+
+    def __getstate__(self):
+        # Блок текста не передается воркерам: каждый строит его сам
+        state = self.__dict__.copy()
+        state['_corpus'] = None
+        return state
+
+    def build(self, number):
+        """
+        Возвращает содержимое файла с заданным номером.
+
+        Параметры:
+            number (int): Порядковый номер файла в архиве.
+
+        Возвращает:
+            bytes: Содержимое файла.
+        """
+        if self._corpus is None:
+            self._corpus = make_corpus(self.seed)
+        rng = random.Random(self.seed * 1_000_003 + number)
+        size = sample_size(rng, self.distribution, self.max_size)
+        corpus = self._corpus
+        offset = rng.randrange(len(corpus))
+        if offset + size <= len(corpus):
+            return corpus[offset:offset + size]
+        # Большой файл: склеиваем блок текста по кругу
+        parts = [corpus[offset:]]
+        remaining = size - len(parts[0])
+        while remaining > 0:
+            parts.append(corpus[:remaining])
+            remaining -= len(parts[-1])
+        return b''.join(parts)
+
+    def pack(self, number):
+        """
+        Готовит запись архива: содержимое, по возможности уже сжатое.
+
+        Параметры:
+            number (int): Порядковый номер файла в архиве.
+
+        Возвращает:
+            tuple: (данные, CRC-32 или None, размер содержимого). CRC равен None,
+                если данные не сжаты и их сожмет zipfile при записи.
+        """
+        data = self.build(number)
+        if self.compress_type not in PRECOMPRESSED_METHODS:
+            return data, None, len(data)
+        crc = zlib.crc32(data)
+        if self.compress_type == zipfile.ZIP_DEFLATED:
+            level = zlib.Z_DEFAULT_COMPRESSION if self.level is None else self.level
+            # Сырой поток deflate без заголовка zlib, как в записях ZIP
+            return zlib.compress(data, level, wbits=-zlib.MAX_WBITS), crc, len(data)
+        return data, crc, len(data)
+
+    def pack_batch(self, numbers):
+        """
+        Готовит несколько записей (задание процесса-воркера).
+
+        Параметры:
+            numbers (range): Номера файлов.
+
+        Возвращает:
+            list: Результаты pack() в порядке номеров.
+        """
+        return [self.pack(number) for number in numbers]
+
+
+def iter_packed(builder, count, workers):
+    """
+    Перечисляет подготовленные записи файлов с номерами 0..count-1.
+
+    При workers > 1 содержимое готовится в процессах-воркерах; в работе
+    одновременно не больше 2 * workers заданий, так что память не растет
+    с числом файлов.
+
+    Параметры:
+        builder (ContentBuilder): Построитель содержимого.
+        count (int): Число файлов.
+        workers (int): Число процессов-воркеров.
+
+    Возвращает:
+        iterator: Результаты ContentBuilder.pack().
+    """
+    if workers <= 1:
+        for number in range(count):
+            yield builder.pack(number)
+        return
+
+    batches = (range(start, min(start + WORKER_BATCH, count))
+               for start in range(0, count, WORKER_BATCH))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = [pool.submit(builder.pack_batch, batch)
+                   for batch in itertools.islice(batches, 2 * workers)]
+        while pending:
+            contents = pending.pop(0).result()
+            batch = next(batches, None)
+            if batch is not None:
+                pending.append(pool.submit(builder.pack_batch, batch))
+            yield from contents
+
+
+def write_precompressed(zipf, info, payload, crc, file_size):
+    """
+    Дописывает в архив запись с заранее сжатыми данными.
+
+    zipfile умеет только сжимать данные сам, поэтому локальный заголовок и
+    каталог записей обновляются так же, как это делает ZipFile.open(..., 'w').
+
+    Параметры:
+        zipf (zipfile.ZipFile): Архив, открытый на запись.
+        info (zipfile.ZipInfo): Описание записи с заполненным compress_type.
+        payload (bytes): Сжатые данные.
+        crc (int): CRC-32 несжатого содержимого.
+        file_size (int): Размер несжатого содержимого.
+    """
+    info.file_size = file_size
+    info.compress_size = len(payload)
+    info.CRC = crc
+    zipf.fp.seek(zipf.start_dir)
+    info.header_offset = zipf.fp.tell()
+    zipf._writecheck(info)
+    zipf._didModify = True
+    zipf.fp.write(info.FileHeader())
+    zipf.fp.write(payload)
+    zipf.start_dir = zipf.fp.tell()
+    zipf.filelist.append(info)
+    zipf.NameToInfo[info.filename] = info
+
+
+def create_synthetic_archive(output_zip, depth=2, fanout=10, files_per_dir=10,
+                             max_files=None, size='lognormal:7:1.5', max_size=16 << 20,
+                             compression='deflated', level=None, seed=0, workers=1):
+    """
+    Создает синтетический архив, записывая файлы прямо в ZIP.
+
+    Параметры:
+        output_zip (str): Путь к создаваемому архиву.
+        depth (int): Число уровней директорий под корнем.
+        fanout (int): Число поддиректорий в каждой директории.
+        files_per_dir (int): Число файлов в каждой директории.
+        max_files (int, optional): Ограничение на общее число файлов.
+        size (str): Распределение размеров файлов (см. parse_size_distribution).
+        max_size (int): Верхняя граница размера файла в байтах.
+        compression (str): Метод сжатия: stored, deflated, bzip2 или lzma.
+        level (int, optional): Уровень сжатия.
+        seed (int): Начальное значение генератора.
+        workers (int): Число процессов для подготовки содержимого.
+
+    Возвращает:
+        tuple: (число файлов, суммарный размер содержимого в байтах).
+    """
+    compress_type = COMPRESSION_METHODS[compression]
+    builder = ContentBuilder(seed, parse_size_distribution(size), max_size, compress_type, level)
+    paths = iter_paths(depth, fanout, files_per_dir, max_files)
+    count = count_files(depth, fanout, files_per_dir, max_files)
+    total = 0
+    with zipfile.ZipFile(output_zip, 'w', compress_type, allowZip64=True,
+                         compresslevel=level) as zipf:
+        # Генератор записей идет первым, чтобы zip() довел его до конца и пул процессов закрылся
+        for (payload, crc, file_size), path in zip(iter_packed(builder, count, workers), paths):
+            info = zipfile.ZipInfo(path, DATE_TIME)
+            info.external_attr = 0o644 << 16
+            info.compress_type = compress_type
+            if crc is None:
+                zipf.writestr(info, payload, compress_type, level)
+            else:
+                write_precompressed(zipf, info, payload, crc, file_size)
+            total += file_size
+    return count, total
+
 
-# Генерация виртуальной файловой системы
-virtual_fs_dir = 'virtual_fs'
-zip_file = 'virtual_fs.zip'
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a virtual file system image')
+    parser.add_argument('output', nargs='?', default='virtual_fs.zip', help='Путь к архиву')
+    parser.add_argument('--depth', type=int, help='Число уровней директорий (включает синтетический режим)')
+    parser.add_argument('--fanout', type=int, default=10, help='Поддиректорий в директории')
+    parser.add_argument('--files-per-dir', type=int, default=10, help='Файлов в директории')
+    parser.add_argument('--max-files', type=int, help='Ограничение на общее число файлов')
+    parser.add_argument('--size', default='lognormal:7:1.5',
+                        help='Распределение размеров: fixed:N, uniform:MIN:MAX или lognormal:MU:SIGMA')
+    parser.add_argument('--max-size', type=int, default=16 << 20, help='Наибольший размер файла в байтах')
+    parser.add_argument('--compression', choices=COMPRESSION_METHODS, default='deflated')
+    parser.add_argument('--level', type=int, help='Уровень сжатия')
+    parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+    parser.add_argument('--workers', type=int, default=1, help='Процессов для подготовки содержимого')
+    args = parser.parse_args(argv)
 
-create_virtual_fs_structure(virtual_fs_dir)
-create_zip_archive(virtual_fs_dir, zip_file)
+    if args.depth is None:
+        create_sample_archive(args.output)
+        print(f"ZIP archive {args.output} generated successfully.")
+        return
 
-# Удаление временной директории (для чистоты)
-import shutil
-shutil.rmtree(virtual_fs_dir)
+    try:
+        count, total = create_synthetic_archive(
+            args.output, args.depth, args.fanout, args.files_per_dir, args.max_files,
+            args.size, args.max_size, args.compression, args.level, args.seed, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"ZIP archive {args.output} generated: {count} files, {total / 2**20:.1f} MiB of content.")
 
-print(f"ZIP archive {zip_file} generated successfully.")
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+Графическая оболочка эмулятора на tkinter.
+
+Живет отдельно от core.py, чтобы пакетный режим эмулятора не импортировал tkinter.
+"""
+
+import logging
+import os
+import queue
+import threading
+import tkinter as tk
+from tkinter import scrolledtext
+
+logger = logging.getLogger('emulator.gui')
+
+# Период обновления виджета вывода (один кадр, мс) и максимальный объем одной вставки
+OUTPUT_POLL_MS = 16
+OUTPUT_BATCH_CHARS = 64 * 1024
+
+
+class ShellGUI:
+    """
+    Класс для создания GUI оболочки, которая позволяет вводить команды и видеть результат их выполнения.
+
+    Команды выполняются в фоновом потоке, а их вывод передается в главный поток
+    через очередь и вставляется в виджет не чаще одного раза за кадр. Виджет
+    хранит не больше scrollback_lines строк: старые строки удаляются пачками.
+
+    Атрибуты:
+        emulator (Emulator): Объект эмулятора, управляющий командной оболочкой.
+        root (tk.Tk): Корневое окно приложения.
+        output (tk.scrolledtext.ScrolledText): Текстовое поле для вывода результатов команд.
+        entry (tk.Entry): Поле ввода для команд.
+        commands (queue.Queue): Очередь команд для фонового потока.
+        chunks (queue.Queue): Очередь фрагментов вывода для главного потока.
+        busy (bool): Выполняется ли сейчас команда.
+        scrollback_lines (int): Предел истории вывода в строках (0 - без ограничения).
+    """
+
+    # Метка в очереди вывода: команда exit завершила работу эмулятора
+    _EXIT = object()
+
+    def __init__(self, emulator):
+        """
+        Инициализация GUI для эмулятора.
+
+        Параметры:
+            emulator (Emulator): Объект эмулятора, управляющий командной оболочкой.
+        """
+        logger.debug('Initializing GUI...')
+        self.emulator = emulator
+        self.scrollback_lines = emulator.config['scrollback_lines']
+        self.root = tk.Tk()
+        self.root.title("Shell Emulator")
+
+        # Текстовое поле для вывода
+        self.output = scrolledtext.ScrolledText(self.root, height=20, width=80, state=tk.NORMAL)
+        self.output.pack()
+
+        # Поле ввода для команд
+        self.entry = tk.Entry(self.root, width=80)
+        self.entry.pack()
+        self.entry.bind('<Return>', self.execute_command)
+        self.entry.bind('<Tab>', self.complete_command)
+        self.root.bind('<Control-c>', self.cancel_command)
+
+        # Выполняем стартовый скрипт
+        self.emulator.run_startup_script()
+
+        # Ограниченная очередь вывода притормаживает команду, если виджет не успевает
+        self.commands = queue.Queue()
+        self.chunks = queue.Queue(maxsize=256)
+        self.busy = False
+        self.worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self.worker.start()
+        self.root.after(OUTPUT_POLL_MS, self._poll_output)
+
+    def execute_command(self, event):
+        """
+        Обработчик ввода команды: передает команду фоновому потоку.
+
+        Параметры:
+            event (tk.Event): Событие нажатия клавиши <Return>.
+        """
+        logger.debug('Executing command: %s', self.entry.get())
+        command = self.entry.get()
+        # Флаг сбрасывается при постановке в очередь: Ctrl+C до запуска команды не теряется
+        self.emulator.cancel_event.clear()
+        self.commands.put(command)
+        self.entry.delete(0, tk.END)
+
+    def complete_command(self, event):
+        """
+        Обработчик Tab: дополняет слово перед курсором именем команды или путем.
+
+        При нескольких вариантах дописывается их общее начало, а если дописать
+        нечего - варианты выводятся в окно.
+
+        Параметры:
+            event (tk.Event): Событие нажатия клавиши <Tab>.
+        """
+        line = self.entry.get()[:self.entry.index(tk.INSERT)]
+        word = line.rpartition(' ')[2]
+        candidates = self.emulator.complete(line)
+        if candidates:
+            common = os.path.commonprefix(candidates)
+            if len(candidates) == 1 and not common.endswith('/'):
+                common += ' '
+            if len(common) > len(word):
+                self.entry.insert(tk.INSERT, common[len(word):])
+            else:
+                # Варианты показываются без общей директории, как в bash
+                offset = len(word) - len(word.rpartition('/')[2])
+                self.output.insert(tk.END, "  ".join(c[offset:] for c in candidates) + "\n")
+                self.output.see(tk.END)
+        # Tab не должен переводить фокус на следующий виджет
+        return "break"
+
+    def cancel_command(self, event):
+        """
+        Обработчик Ctrl+C: прерывает выполняющуюся команду.
+
+        Параметры:
+            event (tk.Event): Событие нажатия Ctrl+C.
+        """
+        if not self.busy:
+            return None
+        logger.debug('Cancelling command...')
+        self.emulator.cancel()
+        return "break"
+
+    def _emit(self, chunk):
+        """
+        Передает фрагмент вывода в главный поток, разбивая слишком длинные фрагменты.
+
+        Параметры:
+            chunk (str | object): Фрагмент вывода или служебная метка.
+        """
+        if isinstance(chunk, str) and len(chunk) > OUTPUT_BATCH_CHARS:
+            for start in range(0, len(chunk), OUTPUT_BATCH_CHARS):
+                self._emit(chunk[start:start + OUTPUT_BATCH_CHARS])
+            return
+        while True:
+            try:
+                self.chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                # Вывод прерванной команды можно отбросить
+                if self.emulator.cancel_event.is_set():
+                    return
+
+    def _worker_loop(self):
+        """
+        Цикл фонового потока: выполняет команды по очереди.
+        """
+        while True:
+            command = self.commands.get()
+            self.busy = True
+            try:
+                for chunk in self.emulator.iter_output(command, echo=True, clear_cancel=False):
+                    self._emit(chunk)
+            except SystemExit:
+                self._emit(self._EXIT)
+                return
+            except Exception as e:
+                logger.exception('Command failed: %s', command)
+                self._emit(f"{command.split()[0]}: {e}\n")
+            finally:
+                self.busy = False
+
+    @staticmethod
+    def lines_to_trim(line_count, limit):
+        """
+        Считает, сколько старых строк удалить из виджета вывода.
+
+        Строки удаляются не при каждом превышении предела, а когда накопится
+        запас в десятую часть предела: так удаление амортизируется.
+
+        Параметры:
+            line_count (int): Текущее число строк в виджете.
+            limit (int): Предел истории (0 - без ограничения).
+
+        Возвращает:
+            int: Число строк для удаления.
+        """
+        if limit <= 0 or line_count <= limit + max(limit // 10, 1):
+            return 0
+        return line_count - limit
+
+    def _trim_scrollback(self):
+        """
+        Удаляет из виджета вывода самые старые строки сверх предела истории.
+        """
+        line_count = int(self.output.index('end-1c').split('.')[0])
+        excess = self.lines_to_trim(line_count, self.scrollback_lines)
+        if excess:
+            self.output.delete('1.0', f'{excess + 1}.0')
+
+    def _poll_output(self):
+        """
+        Переносит накопленный вывод в виджет одной вставкой за кадр.
+        """
+        pending = []
+        size = 0
+        while size < OUTPUT_BATCH_CHARS:
+            try:
+                chunk = self.chunks.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is self._EXIT:
+                self.root.destroy()
+                return
+            pending.append(chunk)
+            size += len(chunk)
+        if pending:
+            self.output.insert(tk.END, "".join(pending))
+            self._trim_scrollback()
+            self.output.see(tk.END)  # Автопрокрутка вниз
+        self.root.after(OUTPUT_POLL_MS, self._poll_output)
+
+    def run(self):
+        """
+        Запуск главного цикла GUI.
+        """
+        logger.debug('Starting GUI main loop...')
+        self.root.mainloop()
@@ -0,0 +1,356 @@
+"""
+Ленивое чтение ZIP-архива через mmap.
+
+Модуль предоставляет класс MmapZipFile - альтернативу zipfile.ZipFile для
+больших образов виртуальной файловой системы. Архив отображается в память,
+центральный каталог разбирается по первому требованию в компактную таблицу
+на массивах (смещения, размеры, срезы имен), а объекты ZipInfo создаются
+только тогда, когда запись действительно открывается.
+"""
+
+import io
+import mmap
+import stat
+import struct
+import zipfile
+from array import array
+
+# Форматы записей ZIP (см. APPNOTE.TXT)
+_END_ARCHIVE = struct.Struct('<4s4H2LH')
+_END_ARCHIVE64 = struct.Struct('<4sQ2H2L4Q')
+_END_ARCHIVE64_LOCATOR = struct.Struct('<4sLQL')
+_CENTRAL_DIR = struct.Struct('<4s4B4HL2L5H2L')
+_FILE_HEADER = struct.Struct('<4s2B4HL2L2H')
+
+_END_ARCHIVE_SIG = b'PK\x05\x06'
+_END_ARCHIVE64_SIG = b'PK\x06\x06'
+_END_ARCHIVE64_LOCATOR_SIG = b'PK\x06\x07'
+_CENTRAL_DIR_SIG = b'PK\x01\x02'
+_FILE_HEADER_SIG = b'PK\x03\x04'
+
+_MAX_COMMENT = 0xFFFF
+_ZIP64_EXTRA = 0x0001
+_UTF8_FLAG = 0x800
+
+
+class _MmapMemberFile(io.RawIOBase):
+    """
+    Файловый объект над участком отображенного архива с собственной позицией.
+
+    Несколько открытых записей не мешают друг другу, так как позиция
+    хранится в объекте, а не в общем mmap.
+    """
+
+    def __init__(self, mm, start):
+        super().__init__()
+        self._mm = mm
+        self._pos = start
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._mm) + offset
+        return self._pos
+
+    def read(self, n=-1):
+        end = len(self._mm) if n is None or n < 0 else min(self._pos + n, len(self._mm))
+        data = self._mm[self._pos:end]
+        self._pos = end
+        return data
+
+
+class MmapZipFile:
+    """
+    Доступный только для чтения ZIP-архив поверх mmap с ленивым центральным каталогом.
+
+    Повторяет ту часть интерфейса zipfile.ZipFile, которой пользуется эмулятор:
+    namelist(), getinfo(), open(), read() и close().
+
+    Атрибуты:
+        filename (str): Путь к архиву.
+    """
+
+    def __init__(self, filename, mode='r'):
+        """
+        Открывает архив и находит центральный каталог, не разбирая его записи.
+
+        Параметры:
+            filename (str): Путь к ZIP-архиву.
+            mode (str): Режим открытия, поддерживается только 'r'.
+        """
+        if mode != 'r':
+            raise ValueError("MmapZipFile supports only mode 'r'")
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Пустой файл нельзя отобразить в память
+            self._file.close()
+            raise zipfile.BadZipFile('File is not a zip file')
+        self._cd_offset, self._concat, self._count = self._find_central_dir()
+        self._table = None
+        self._positions = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _find_central_dir(self):
+        """
+        Находит запись конца архива и возвращает параметры центрального каталога.
+
+        Возвращает:
+            tuple: (смещение центрального каталога, сдвиг данных перед архивом,
+                число записей).
+        """
+        mm = self._mm
+        search_start = max(0, len(mm) - _END_ARCHIVE.size - _MAX_COMMENT)
+        pos = mm.rfind(_END_ARCHIVE_SIG, search_start)
+        if pos < 0 or pos + _END_ARCHIVE.size > len(mm):
+            raise zipfile.BadZipFile('File is not a zip file')
+        (_, _, _, _, count, cd_size, cd_offset, _) = _END_ARCHIVE.unpack_from(mm, pos)
+
+        locator = pos - _END_ARCHIVE64_LOCATOR.size
+        if locator >= 0 and mm[locator:locator + 4] == _END_ARCHIVE64_LOCATOR_SIG:
+            _, _, end64, _ = _END_ARCHIVE64_LOCATOR.unpack_from(mm, locator)
+            if mm[end64:end64 + 4] != _END_ARCHIVE64_SIG:
+                raise zipfile.BadZipFile('Corrupt ZIP64 end of central directory')
+            (_, _, _, _, _, _, _, count, cd_size, cd_offset) = _END_ARCHIVE64.unpack_from(mm, end64)
+            pos = end64
+
+        # Учет данных, дописанных перед архивом (например, самораспаковывающиеся образы)
+        concat = pos - cd_size - cd_offset
+        return cd_offset + concat, concat, count
+
+    def _load_table(self):
+        """
+        Однократно разбирает центральный каталог в компактную таблицу на массивах.
+        """
+        records = array('Q')
+        name_starts = array('Q')
+        name_lens = array('H')
+        header_offsets = array('Q')
+        compress_sizes = array('Q')
+        file_sizes = array('Q')
+        flags = array('H')
+        modes = array('H')
+
+        mm = self._mm
+        pos = self._cd_offset
+        concat = self._concat
+        for _ in range(self._count):
+            record = _CENTRAL_DIR.unpack_from(mm, pos)
+            if record[0] != _CENTRAL_DIR_SIG:
+                raise zipfile.BadZipFile('Bad magic number for central directory')
+            flag_bits = record[5]
+            compress_size, file_size = record[10], record[11]
+            name_len, extra_len, comment_len = record[12], record[13], record[14]
+            header_offset = record[18]
+            name_start = pos + _CENTRAL_DIR.size
+
+            if 0xFFFFFFFF in (compress_size, file_size, header_offset):
+                extra_start = name_start + name_len
+                file_size, compress_size, header_offset = self._parse_zip64_extra(
+                    mm[extra_start:extra_start + extra_len],
+                    file_size, compress_size, header_offset)
+
+            records.append(pos)
+            name_starts.append(name_start)
+            name_lens.append(name_len)
+            header_offsets.append(header_offset + concat)
+            compress_sizes.append(compress_size)
+            file_sizes.append(file_size)
+            flags.append(flag_bits)
+            modes.append(record[17] >> 16)
+            pos = name_start + name_len + extra_len + comment_len
+
+        self._table = {
+            'records': records,
+            'name_starts': name_starts,
+            'name_lens': name_lens,
+            'header_offsets': header_offsets,
+            'compress_sizes': compress_sizes,
+            'file_sizes': file_sizes,
+            'flags': flags,
+            'modes': modes,
+        }
+
+    @staticmethod
+    def _parse_zip64_extra(extra, file_size, compress_size, header_offset):
+        """
+        Достает 64-битные размеры и смещение из дополнительного поля ZIP64.
+
+        Возвращает:
+            tuple: (размер файла, сжатый размер, смещение локального заголовка).
+        """
+        pos = 0
+        while pos + 4 <= len(extra):
+            header_id, size = struct.unpack_from('<HH', extra, pos)
+            if header_id == _ZIP64_EXTRA:
+                data_pos = pos + 4
+                if file_size == 0xFFFFFFFF:
+                    file_size, = struct.unpack_from('<Q', extra, data_pos)
+                    data_pos += 8
+                if compress_size == 0xFFFFFFFF:
+                    compress_size, = struct.unpack_from('<Q', extra, data_pos)
+                    data_pos += 8
+                if header_offset == 0xFFFFFFFF:
+                    header_offset, = struct.unpack_from('<Q', extra, data_pos)
+                break
+            pos += 4 + size
+        return file_size, compress_size, header_offset
+
+    @property
+    def table(self):
+        """
+        Таблица записей центрального каталога (разбирается при первом обращении).
+        """
+        if self._table is None:
+            self._load_table()
+        return self._table
+
+    def _name(self, i):
+        """
+        Декодирует имя i-й записи из среза отображенного архива.
+        """
+        table = self.table
+        start = table['name_starts'][i]
+        raw = self._mm[start:start + table['name_lens'][i]]
+        encoding = 'utf-8' if table['flags'][i] & _UTF8_FLAG else 'cp437'
+        return raw.decode(encoding)
+
+    def iter_names(self):
+        """
+        Лениво перечисляет имена записей архива в порядке центрального каталога.
+
+        Возвращает:
+            iterator: Имена записей.
+        """
+        for i in range(self._count):
+            yield self._name(i)
+
+    def namelist(self):
+        """
+        Возвращает список имен записей архива.
+
+        Возвращает:
+            list: Имена записей.
+        """
+        return list(self.iter_names())
+
+    def symlinks(self):
+        """
+        Возвращает имена записей-ссылок (symlink, по атрибутам Unix).
+
+        Если имя встречается в архиве несколько раз, учитывается последняя запись.
+
+        Возвращает:
+            set: Имена записей, последняя версия которых - ссылка.
+        """
+        modes = self.table['modes']
+        links = [i for i, mode in enumerate(modes) if stat.S_ISLNK(mode)]
+        if not links:
+            return set()
+        return {self._name(i) for i in links if self._position(self._name(i)) == i}
+
+    def _position(self, name):
+        """
+        Возвращает номер записи по имени, при первом вызове строит словарь имен.
+        """
+        if self._positions is None:
+            self._positions = {n: i for i, n in enumerate(self.iter_names())}
+        try:
+            return self._positions[name]
+        except KeyError:
+            raise KeyError(f"There is no item named {name!r} in the archive")
+
+    def getinfo(self, name):
+        """
+        Создает объект ZipInfo для записи архива.
+
+        Параметры:
+            name (str): Имя записи.
+
+        Возвращает:
+            zipfile.ZipInfo: Описание записи.
+        """
+        i = self._position(name)
+        table = self.table
+        record = _CENTRAL_DIR.unpack_from(self._mm, table['records'][i])
+        info = zipfile.ZipInfo(name)
+        (_, info.create_version, info.create_system, info.extract_version,
+         info.reserved, info.flag_bits, info.compress_type, t, d, info.CRC,
+         _, _, _, _, _, _, info.internal_attr, info.external_attr, _) = record
+        info._raw_time = t
+        info.date_time = ((d >> 9) + 1980, (d >> 5) & 0xF, d & 0x1F,
+                          t >> 11, (t >> 5) & 0x3F, (t & 0x1F) * 2)
+        info.compress_size = table['compress_sizes'][i]
+        info.file_size = table['file_sizes'][i]
+        info.header_offset = table['header_offsets'][i]
+        return info
+
+    def open(self, name, mode='r'):
+        """
+        Открывает запись архива для потокового чтения.
+
+        Параметры:
+            name (str | zipfile.ZipInfo): Имя записи или её описание.
+            mode (str): Режим открытия, поддерживается только 'r'.
+
+        Возвращает:
+            zipfile.ZipExtFile: Файловый объект с распаковкой на лету.
+        """
+        if mode != 'r':
+            raise ValueError("MmapZipFile supports only mode 'r'")
+        info = name if isinstance(name, zipfile.ZipInfo) else self.getinfo(name)
+        if info.flag_bits & 0x1:
+            raise NotImplementedError('Encrypted members are not supported')
+
+        header = _FILE_HEADER.unpack_from(self._mm, info.header_offset)
+        if header[0] != _FILE_HEADER_SIG:
+            raise zipfile.BadZipFile('Bad magic number for file header')
+        data_start = info.header_offset + _FILE_HEADER.size + header[10] + header[11]
+        fileobj = _MmapMemberFile(self._mm, data_start)
+        return zipfile.ZipExtFile(fileobj, 'r', info, close_fileobj=True)
+
+    def read(self, name):
+        """
+        Возвращает распакованное содержимое записи целиком.
+
+        Параметры:
+            name (str | zipfile.ZipInfo): Имя записи или её описание.
+
+        Возвращает:
+            bytes: Содержимое записи.
+        """
+        with self.open(name) as member_file:
+            return member_file.read()
+
+    def close(self):
+        """
+        Закрывает отображение и файл архива.
+        """
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,421 @@
+"""
+Записываемый слой (copy-on-write) поверх доступного только для чтения ZIP-архива.
+
+Изменения попадают в верхний слой в памяти (большие файлы при желании
+сбрасываются во временные файлы на диске), чтения объединяют верхний слой
+с индексом архива, а удаления из архива отмечаются whiteout-записями.
+Команда sync дописывает изменения в архив одним проходом: удаления
+записываются как пустые записи ".wh.<имя>" (как в слоях OCI-образов),
+которые VFSIndex учитывает при построении индекса.
+"""
+
+import io
+import os
+import tempfile
+
+# Префикс имени записи, отмечающей удаление файла или директории
+WHITEOUT_PREFIX = '.wh.'
+
+
+def is_reserved(path):
+    """
+    Проверяет, что в пути есть имя, зарезервированное под отметки удаления.
+
+    Такой файл после sync был бы прочитан из архива как whiteout-запись.
+
+    Параметры:
+        path (str): Нормализованный путь.
+
+    Возвращает:
+        bool: True, если какой-либо компонент пути начинается с WHITEOUT_PREFIX.
+    """
+    return any(part.startswith(WHITEOUT_PREFIX) for part in path.split('/'))
+
+
+def _discard(upper):
+    """
+    Освобождает содержимое файла верхнего слоя (у ссылок на архив его нет).
+    """
+    if isinstance(upper, OverlayFile):
+        upper.discard()
+
+
+class OverlayFile:
+    """
+    Содержимое файла верхнего слоя: в памяти или во временном файле на диске.
+
+    Атрибуты:
+        size (int): Размер содержимого в байтах.
+    """
+
+    __slots__ = ('_data', '_spill_path', 'size')
+
+    def __init__(self, chunks, spill_bytes=0, spill_dir=None):
+        """
+        Сохраняет содержимое, сбрасывая его на диск при превышении порога.
+
+        Параметры:
+            chunks (bytes | iterable): Содержимое файла целиком или блоками.
+            spill_bytes (int): Порог сброса на диск (0 - всегда в памяти).
+            spill_dir (str, optional): Директория для временных файлов.
+        """
+        if isinstance(chunks, bytes):
+            chunks = (chunks,)
+        self.size = 0
+        self._spill_path = None
+        buffered = []
+        spill_file = None
+        try:
+            for chunk in chunks:
+                self.size += len(chunk)
+                if spill_file is not None:
+                    spill_file.write(chunk)
+                    continue
+                buffered.append(chunk)
+                if spill_bytes and self.size > spill_bytes:
+                    fd, self._spill_path = tempfile.mkstemp(prefix='overlay-', dir=spill_dir)
+                    spill_file = os.fdopen(fd, 'wb')
+                    spill_file.writelines(buffered)
+                    buffered = []
+        finally:
+            if spill_file is not None:
+                spill_file.close()
+        self._data = b''.join(buffered) if spill_file is None else None
+
+    def open(self):
+        """
+        Открывает содержимое для чтения.
+
+        Возвращает:
+            file: Двоичный файловый объект.
+        """
+        if self._spill_path is None:
+            return io.BytesIO(self._data)
+        return open(self._spill_path, 'rb')
+
+    def read(self):
+        """
+        Возвращает содержимое целиком.
+
+        Возвращает:
+            bytes: Содержимое файла.
+        """
+        with self.open() as f:
+            return f.read()
+
+    def discard(self):
+        """
+        Удаляет временный файл на диске, если содержимое было сброшено.
+        """
+        if self._spill_path is not None:
+            os.unlink(self._spill_path)
+            self._spill_path = None
+
+
+class Overlay:
+    """
+    Объединенное представление верхнего слоя и индекса архива.
+
+    Повторяет интерфейс чтения VFSIndex (lookup, is_dir, is_file, listdir, walk)
+    и добавляет операции записи. Пути нормализованы так же, как в VFSIndex.
+
+    Атрибуты:
+        lower (VFSIndex): Индекс архива (нижний слой, только чтение).
+        dirs (dict): Директории верхнего слоя: путь -> {имя потомка: директория ли}.
+        files (dict): Файлы верхнего слоя: путь -> OverlayFile или имя записи
+            архива (str), если файл скопирован или перемещен из архива без
+            копирования содержимого (см. redirect).
+        whiteouts (set): Пути, удаленные из нижнего слоя (вместе с потомками).
+        generation (int): Счетчик изменений, растет при каждой записи.
+    """
+
+    def __init__(self, lower, spill_bytes=0, spill_dir=None):
+        """
+        Создает пустой верхний слой.
+
+        Параметры:
+            lower (VFSIndex): Индекс архива.
+            spill_bytes (int): Порог сброса файлов на диск (0 - всегда в памяти).
+            spill_dir (str, optional): Директория для временных файлов.
+        """
+        self.lower = lower
+        self.spill_bytes = spill_bytes
+        self.spill_dir = spill_dir
+        self.dirs = {'': {}}
+        self.files = {}
+        self.whiteouts = set()
+        self.generation = 0
+
+    @staticmethod
+    def normalize(path):
+        return path.strip('/')
+
+    def is_dirty(self):
+        """
+        Проверяет, есть ли несохраненные изменения.
+
+        Возвращает:
+            bool: True, если верхний слой не пуст.
+        """
+        return bool(self.files or self.whiteouts or len(self.dirs) > 1)
+
+    def _hidden(self, path):
+        """
+        Проверяет, скрыт ли путь нижнего слоя удалением его самого или предка.
+        """
+        if not self.whiteouts:
+            return False
+        while path:
+            if path in self.whiteouts:
+                return True
+            path = path.rpartition('/')[0]
+        return False
+
+    def lookup(self, path):
+        """
+        Определяет тип объекта по пути с учетом обоих слоев.
+
+        Параметры:
+            path (str): Путь внутри виртуальной файловой системы.
+
+        Возвращает:
+            str | None: 'dir', 'file' или None, если объекта нет.
+        """
+        path = self.normalize(path)
+        if path in self.dirs:
+            return 'dir'
+        if path in self.files:
+            return 'file'
+        if self._hidden(path):
+            return None
+        return self.lower.lookup(path)
+
+    def is_dir(self, path):
+        return self.lookup(path) == 'dir'
+
+    def is_file(self, path):
+        return self.lookup(path) == 'file'
+
+    def source(self, path):
+        """
+        Возвращает источник содержимого файла.
+
+        Параметры:
+            path (str): Путь к файлу.
+
+        Возвращает:
+            OverlayFile | str | None: Файл верхнего слоя, имя записи архива
+                или None, если файла нет.
+        """
+        path = self.normalize(path)
+        upper = self.files.get(path)
+        if upper is not None:
+            return upper
+        if path in self.dirs or self._hidden(path):
+            return None
+        return self.lower.member_name(path)
+
+    def link_member(self, path):
+        """
+        Возвращает запись архива, если путь - ссылка (symlink) нижнего слоя.
+
+        Параметры:
+            path (str): Нормализованный путь.
+
+        Возвращает:
+            str | None: Имя записи-ссылки или None.
+        """
+        links = self.lower.links
+        if not links or path in self.files or path in self.dirs or self._hidden(path):
+            return None
+        return links.get(path)
+
+    def children(self, path):
+        """
+        Возвращает объединенных потомков директории.
+
+        Параметры:
+            path (str): Нормализованный путь к существующей директории.
+
+        Возвращает:
+            dict: Имя потомка -> является ли директорией (не изменять).
+        """
+        lower_children = self.lower.dirs.get(path)
+        if not self.whiteouts and path not in self.dirs:
+            # Директория есть только в архиве: возвращаем словарь индекса без копирования
+            return lower_children if lower_children is not None else {}
+        children = {}
+        if lower_children is not None and not self._hidden(path):
+            if self.whiteouts:
+                prefix = f"{path}/" if path else ''
+                for name, is_dir in lower_children.items():
+                    if prefix + name not in self.whiteouts:
+                        children[name] = is_dir
+            else:
+                children.update(lower_children)
+        children.update(self.dirs.get(path, {}))
+        return children
+
+    def listdir(self, path):
+        """
+        Возвращает отсортированный список потомков директории.
+
+        Параметры:
+            path (str): Путь к директории.
+
+        Возвращает:
+            list | None: Имена потомков или None, если директории нет.
+        """
+        path = self.normalize(path)
+        if not self.is_dir(path):
+            return None
+        return sorted(self.children(path))
+
+    def walk(self, path):
+        """
+        Рекурсивно обходит директорию в порядке сортировки имен.
+
+        Параметры:
+            path (str): Путь к директории.
+
+        Возвращает:
+            iterator: Пары (путь потомка, является ли директорией) в прямом порядке.
+        """
+        path = self.normalize(path)
+        if not self.is_dir(path):
+            return
+        stack = [(path, iter(sorted(self.children(path).items())))]
+        while stack:
+            parent, items = stack[-1]
+            for name, is_dir in items:
+                child = f"{parent}/{name}" if parent else name
+                yield child, is_dir
+                if is_dir:
+                    stack.append((child, iter(sorted(self.children(child).items()))))
+                    break
+            else:
+                stack.pop()
+
+    def _add_upper_dir(self, path):
+        """
+        Добавляет директорию в верхний слой вместе с предками.
+        """
+        if path in self.dirs:
+            return
+        parent, _, base = path.rpartition('/')
+        self._add_upper_dir(parent)
+        self.dirs[parent][base] = True
+        self.dirs[path] = {}
+
+    def write(self, path, data):
+        """
+        Записывает файл в верхний слой. Родительская директория должна существовать.
+
+        Параметры:
+            path (str): Путь к файлу.
+            data (bytes | iterable): Новое содержимое целиком или блоками.
+        """
+        path = self.normalize(path)
+        parent, _, base = path.rpartition('/')
+        upper = OverlayFile(data, self.spill_bytes, self.spill_dir)
+        self._add_upper_dir(parent)
+        old = self.files.get(path)
+        if old is not None:
+            _discard(old)
+        self.files[path] = upper
+        self.dirs[parent][base] = False
+        self.generation += 1
+
+    def redirect(self, path, member):
+        """
+        Добавляет в верхний слой файл с содержимым записи архива, не копируя его.
+
+        Так cp и mv файлов архива не распаковывают их: чтения по новому пути
+        идут в ту же запись, а содержимое переписывается только при sync.
+
+        Параметры:
+            path (str): Путь к файлу. Родительская директория должна существовать.
+            member (str): Имя записи архива.
+        """
+        path = self.normalize(path)
+        parent, _, base = path.rpartition('/')
+        self._add_upper_dir(parent)
+        old = self.files.get(path)
+        if old is not None:
+            _discard(old)
+        self.files[path] = member
+        self.dirs[parent][base] = False
+        self.generation += 1
+
+    def mkdir(self, path):
+        """
+        Создает директорию в верхнем слое. Родительская директория должна существовать.
+
+        Параметры:
+            path (str): Путь к директории.
+        """
+        self._add_upper_dir(self.normalize(path))
+        self.generation += 1
+
+    def remove(self, path):
+        """
+        Удаляет файл или директорию (рекурсивно) из объединенного представления.
+
+        Параметры:
+            path (str): Путь к удаляемому объекту.
+        """
+        path = self.normalize(path)
+        if path in self.dirs:
+            prefix = path + '/'
+            for child in [p for p in self.files if p.startswith(prefix)]:
+                _discard(self.files.pop(child))
+            for child in [p for p in self.dirs if p.startswith(prefix)]:
+                del self.dirs[child]
+            del self.dirs[path]
+            # Удаления потомков покрываются удалением самой директории
+            self.whiteouts = {w for w in self.whiteouts if not w.startswith(prefix)}
+        elif path in self.files:
+            _discard(self.files.pop(path))
+        parent, _, base = path.rpartition('/')
+        if parent in self.dirs:
+            self.dirs[parent].pop(base, None)
+        if not self._hidden(path) and self.lower.lookup(path) is not None:
+            self.whiteouts.add(path)
+        self.generation += 1
+
+    def changes(self):
+        """
+        Перечисляет изменения для дозаписи в архив в порядке применения.
+
+        Сначала идут отметки удаления, затем новые директории, затем файлы,
+        поэтому удаленный и заново созданный путь восстанавливается корректно.
+
+        Возвращает:
+            iterator: Пары (имя записи архива, OverlayFile, имя исходной записи
+                архива или None для пустой записи).
+        """
+        for path in sorted(self.whiteouts):
+            parent, _, base = path.rpartition('/')
+            name = f"{parent}/{WHITEOUT_PREFIX}{base}" if parent else WHITEOUT_PREFIX + base
+            yield name, None
+        for path in sorted(self.dirs):
+            if path and (self._hidden(path) or not self.lower.is_dir(path)):
+                yield path + '/', None
+        for path in sorted(self.files):
+            yield path, self.files[path]
+
+    def clear(self, lower=None):
+        """
+        Очищает верхний слой после сохранения изменений.
+
+        Параметры:
+            lower (VFSIndex, optional): Новый индекс архива.
+        """
+        for upper in self.files.values():
+            _discard(upper)
+        if lower is not None:
+            self.lower = lower
+        self.dirs = {'': {}}
+        self.files = {}
+        self.whiteouts = set()
+        self.generation += 1
@@ -0,0 +1,146 @@
+"""
+Разрешение путей виртуальной файловой системы.
+
+PathResolver превращает путь, введенный пользователем, в путь индекса
+директорий: учитывает текущую директорию, абсолютные пути, '~' (корень
+образа), '.', '..' и записи-ссылки архива (symlink). Результаты
+запоминаются по ключу (текущая директория, путь) и сбрасываются при любом
+изменении записываемого слоя. Тот же индекс отвечает на запросы
+автодополнения, просматривая только одну директорию.
+"""
+
+from collections import deque
+
+# Наибольшее число переходов по ссылкам при разрешении одного пути (как ELOOP в Linux)
+MAX_LINK_HOPS = 40
+
+# Наибольшее число запомненных путей; при переполнении память очищается целиком
+DEFAULT_MEMO_SIZE = 65536
+
+
+class PathError(Exception):
+    """
+    Путь не удается разрешить (например, ссылки образуют цикл).
+    """
+
+
+class PathResolver:
+    """
+    Разрешение путей с памятью результатов поверх записываемого слоя.
+
+    Атрибуты:
+        fs (Overlay): Объединенное представление файловой системы.
+        read_link (callable): Функция, возвращающая цель ссылки по имени записи архива.
+        memo_size (int): Наибольшее число запомненных путей.
+        hits (int): Число ответов из памяти.
+        misses (int): Число разрешений без памяти.
+    """
+
+    def __init__(self, fs, read_link, memo_size=DEFAULT_MEMO_SIZE):
+        """
+        Параметры:
+            fs (Overlay): Объединенное представление файловой системы.
+            read_link (callable): read_link(member) -> str, цель ссылки.
+            memo_size (int): Наибольшее число запомненных путей.
+        """
+        self.fs = fs
+        self.read_link = read_link
+        self.memo_size = memo_size
+        self.hits = 0
+        self.misses = 0
+        self._memo = {}
+        self._generation = fs.generation
+
+    def resolve(self, cwd, path, follow=True):
+        """
+        Разрешает путь относительно текущей директории.
+
+        Существование итогового пути не проверяется: команды создания файлов
+        разрешают путь, которого ещё нет.
+
+        Параметры:
+            cwd (str): Текущая директория в формате индекса ('' - корень).
+            path (str): Путь, введенный пользователем.
+            follow (bool): Переходить ли по ссылке в последнем компоненте пути.
+
+        Возвращает:
+            str: Путь в формате индекса.
+        """
+        if self._generation != self.fs.generation:
+            # Слой изменился: ссылки могли появиться или исчезнуть
+            self._memo.clear()
+            self._generation = self.fs.generation
+        key = (cwd, path, follow)
+        result = self._memo.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = self._resolve(cwd, path, follow)
+        if len(self._memo) >= self.memo_size:
+            self._memo.clear()
+        self._memo[key] = result
+        return result
+
+    def _resolve(self, cwd, path, follow):
+        """
+        Разрешает путь без памяти, раскрывая ссылки по мере обхода компонентов.
+        """
+        if path == '~' or path.startswith('~/'):
+            # Домашняя директория пользователя образа - его корень
+            path = '/' + path[1:]
+        stack = [] if path.startswith('/') or not cwd else cwd.split('/')
+        pending = deque(path.split('/'))
+        hops = 0
+        while pending:
+            part = pending.popleft()
+            if part in ('', '.'):
+                continue
+            if part == '..':
+                if stack:
+                    stack.pop()
+                continue
+            stack.append(part)
+            if not follow and not any(p not in ('', '.') for p in pending):
+                break
+            member = self.fs.link_member('/'.join(stack))
+            if member is None:
+                continue
+            hops += 1
+            if hops > MAX_LINK_HOPS:
+                raise PathError(f"{path}: Too many levels of symbolic links")
+            target = self.read_link(member)
+            stack.pop()
+            if target.startswith('/'):
+                stack = []
+            pending.extendleft(reversed(target.split('/')))
+        return '/'.join(stack)
+
+    def complete(self, cwd, prefix):
+        """
+        Подбирает дополнения для начала пути.
+
+        Просматривается только директория, в которой лежит последний
+        компонент, без перебора всех имен архива.
+
+        Параметры:
+            cwd (str): Текущая директория в формате индекса.
+            prefix (str): Введенное начало пути.
+
+        Возвращает:
+            list: Отсортированные полные варианты в том же виде, что и prefix;
+                директории оканчиваются на '/'.
+        """
+        head, _, partial = prefix.rpartition('/')
+        if '/' in prefix:
+            head += '/'
+        try:
+            directory = self.resolve(cwd, head or '.')
+        except PathError:
+            return []
+        if not self.fs.is_dir(directory):
+            return []
+        children = self.fs.children(directory)
+        return sorted(head + name + ('/' if is_dir else '')
+                      for name, is_dir in children.items()
+                      if name.startswith(partial))
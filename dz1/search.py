@@ -0,0 +1,101 @@
+"""
+Параллельный поиск по содержимому файлов виртуальной файловой системы.
+
+Функции модуля выполняются в процессах-воркерах ProcessPoolExecutor: каждый
+воркер один раз открывает собственный дескриптор архива и затем обрабатывает
+пакеты записей, распаковывая и сопоставляя их независимо от остальных.
+Модуль намеренно не импортирует core, чтобы запуск воркеров был дешевым.
+"""
+
+import re
+import zipfile
+
+from mmap_zip import MmapZipFile
+
+# Примерный объем распакованных данных в одном пакете задач воркера
+SEARCH_BATCH_BYTES = 8 * 1024 * 1024
+
+# Максимальное число записей в одном пакете
+SEARCH_BATCH_FILES = 256
+
+ARCHIVE_BACKENDS = {
+    'zipfile': zipfile.ZipFile,
+    'mmap': MmapZipFile,
+}
+
+# Архив, открытый в текущем процессе-воркере
+_archive = None
+
+
+def init_worker(vfs_path, backend):
+    """
+    Инициализирует процесс-воркер: открывает собственный дескриптор архива.
+
+    Параметры:
+        vfs_path (str): Путь к архиву.
+        backend (str): Бэкенд чтения архива ('zipfile' или 'mmap').
+    """
+    global _archive
+    _archive = ARCHIVE_BACKENDS[backend](vfs_path, 'r')
+
+
+def grep_lines(lines, regex):
+    """
+    Отбирает строки, совпадающие с регулярным выражением.
+
+    Параметры:
+        lines (iterable): Строки файла (bytes).
+        regex (re.Pattern): Скомпилированный шаблон над bytes.
+
+    Возвращает:
+        list: Пары (номер строки, строка без перевода строки).
+    """
+    search = regex.search
+    return [(number, line.rstrip(b"\n")) for number, line in enumerate(lines, 1) if search(line)]
+
+
+def grep_batch(members, pattern, flags):
+    """
+    Ищет шаблон в пакете записей архива (выполняется в воркере).
+
+    Параметры:
+        members (list): Имена записей в архиве.
+        pattern (bytes): Регулярное выражение.
+        flags (int): Флаги модуля re.
+
+    Возвращает:
+        list: Для каждой записи пакета - список совпадений (номер строки, строка).
+    """
+    regex = re.compile(pattern, flags)
+    results = []
+    for member in members:
+        with _archive.open(member) as member_file:
+            results.append(grep_lines(member_file, regex))
+    return results
+
+
+def make_batches(files, batch_bytes=SEARCH_BATCH_BYTES, batch_files=SEARCH_BATCH_FILES):
+    """
+    Разбивает список файлов на пакеты примерно одинакового объема.
+
+    Параметры:
+        files (list): Тройки (отображаемый путь, имя записи, размер).
+        batch_bytes (int): Целевой объем пакета в байтах.
+        batch_files (int): Максимальное число файлов в пакете.
+
+    Возвращает:
+        list: Списки троек, сохраняющие исходный порядок файлов.
+    """
+    batches = []
+    batch = []
+    size = 0
+    for item in files:
+        batch.append(item)
+        size += item[2]
+        if size >= batch_bytes or len(batch) >= batch_files:
+            batches.append(batch)
+            batch = []
+            size = 0
+    if batch:
+        batches.append(batch)
+    return batches
@@ -0,0 +1,421 @@
+"""
+Многосеансовый сервер эмулятора на asyncio и простой клиент к нему.
+
+Сервер один раз открывает архив и строит индекс директорий, а каждое
+подключение получает собственный сеанс (Session) со своей текущей
+директорией. Команды выполняются в пуле потоков, их вывод передается
+клиенту по мере готовности.
+
+Протокол построчный (UTF-8): клиент отправляет команду строкой, сервер
+отвечает выводом команды и байтом RESPONSE_END. Строка из одного символа
+CANCEL прерывает выполняющуюся команду, как Ctrl+C в GUI.
+
+Адрес задается как "host:port", ":port" или "unix:/путь/к/сокету".
+"""
+
+import asyncio
+import codecs
+import logging
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from core import Session
+
+logger = logging.getLogger('emulator.server')
+
+# Признак конца ответа на команду
+RESPONSE_END = b'\0'
+
+# Строка, прерывающая выполняющуюся команду сеанса
+CANCEL = '\x03'
+
+# Команды, меняющие общий записываемый слой или архив: выполняются монопольно
+EXCLUSIVE_COMMANDS = frozenset({'touch', 'mkdir', 'rm', 'cp', 'mv', 'echo', 'sync'})
+
+# Число потоков, выполняющих команды всех сеансов
+DEFAULT_SERVER_WORKERS = 32
+
+# Длина очереди входящих подключений (по умолчанию asyncio - 100)
+SERVER_BACKLOG = 1024
+
+# Сколько фрагментов вывода может ждать отправки, прежде чем команда приостановится
+OUTPUT_QUEUE_SIZE = 64
+
+# Сколько секунд команда ждет медленного клиента, прежде чем будет прервана:
+# ожидающая команда держит общую блокировку и задерживает команды записи
+OUTPUT_STALL_TIMEOUT = 30
+
+
+def parse_address(address):
+    """
+    Разбирает адрес сервера.
+
+    Параметры:
+        address (str): "host:port", ":port" или "unix:/путь".
+
+    Возвращает:
+        tuple: ('unix', путь) или ('tcp', (хост, порт)).
+    """
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    host, sep, port = address.rpartition(':')
+    if not sep or not port.isdigit():
+        raise ValueError(f"Invalid address: {address!r}")
+    return 'tcp', (host or '127.0.0.1', int(port))
+
+
+class _ReadWriteLock:
+    """
+    Асинхронная блокировка: обычные команды выполняются параллельно,
+    команды записи - монопольно.
+
+    Ожидающие команды записи имеют приоритет: пока они есть, новые обычные
+    команды ждут, иначе непрерывный поток чтений не дал бы записи выполниться.
+    """
+
+    def __init__(self):
+        self._condition = asyncio.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    async def acquire(self, exclusive):
+        async with self._condition:
+            if exclusive:
+                self._waiting_writers += 1
+                try:
+                    await self._condition.wait_for(lambda: not self._writing and not self._readers)
+                except asyncio.CancelledError:
+                    # Ожидавшие чтения снова могут выполняться
+                    self._waiting_writers -= 1
+                    self._condition.notify_all()
+                    raise
+                self._waiting_writers -= 1
+                self._writing = True
+            else:
+                await self._condition.wait_for(lambda: not self._writing and not self._waiting_writers)
+                self._readers += 1
+
+    async def release(self, exclusive):
+        async with self._condition:
+            if exclusive:
+                self._writing = False
+            else:
+                self._readers -= 1
+            self._condition.notify_all()
+
+
+class EmulatorServer:
+    """
+    Сервер, обслуживающий множество сеансов над одним эмулятором.
+
+    Атрибуты:
+        emulator (Emulator): Общий эмулятор с открытым архивом.
+        executor (ThreadPoolExecutor): Потоки, выполняющие команды.
+        sessions (int): Число открытых сеансов.
+    """
+
+    def __init__(self, emulator, max_workers=DEFAULT_SERVER_WORKERS):
+        """
+        Параметры:
+            emulator (Emulator): Общий эмулятор.
+            max_workers (int): Число потоков для выполнения команд.
+        """
+        self.emulator = emulator
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='emulator-session')
+        self.sessions = 0
+        self._lock = None
+        self._server = None
+
+    async def start(self, address):
+        """
+        Начинает принимать подключения.
+
+        Параметры:
+            address (str): Адрес сервера.
+
+        Возвращает:
+            asyncio.AbstractServer: Запущенный сервер.
+        """
+        self._lock = _ReadWriteLock()
+        kind, target = parse_address(address)
+        if kind == 'unix':
+            self._server = await asyncio.start_unix_server(self._handle, path=target,
+                                                             backlog=SERVER_BACKLOG)
+        else:
+            host, port = target
+            self._server = await asyncio.start_server(self._handle, host, port,
+                                                        backlog=SERVER_BACKLOG)
+        logger.info('Server listening on %s', address)
+        return self._server
+
+    async def close(self):
+        """
+        Останавливает прием подключений и пул потоков.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_locked(self, exclusive, func, *args):
+        """
+        Выполняет функцию в пуле потоков под общей блокировкой.
+        """
+        await self._lock.acquire(exclusive)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            await self._lock.release(exclusive)
+
+    async def _handle(self, reader, writer):
+        """
+        Обслуживает одно подключение: читает команды и выполняет их по очереди.
+        """
+        session = Session(self.emulator)
+        self.sessions += 1
+        logger.debug('Session opened, %d active', self.sessions)
+        running = None
+        try:
+            await self._run_startup_script(session)
+            while not writer.is_closing():
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('utf-8', errors='replace').strip()
+                if command == CANCEL:
+                    session.cancel()
+                    continue
+                if running is not None:
+                    # Команды сеанса выполняются строго по очереди
+                    await running
+                # Флаг сбрасывается до постановки команды: CANCEL до её запуска не теряется
+                session.cancel_event.clear()
+                running = asyncio.create_task(self._execute(session, command, writer))
+        except ConnectionError:
+            pass
+        finally:
+            session.cleanup()
+            if running is not None:
+                await running
+            self.sessions -= 1
+            logger.debug('Session closed, %d active', self.sessions)
+            writer.close()
+
+    async def _run_startup_script(self, session):
+        """
+        Выполняет стартовый скрипт сеанса.
+
+        Монопольная блокировка берется, только если в скрипте есть команды
+        записи: иначе массовые подключения выполнялись бы строго по одному.
+        """
+        lines = await self._run_locked(False, session.read_startup_script)
+        commands = [line.decode('utf-8', errors='replace').strip() for line in lines]
+        exclusive = any(command.split(maxsplit=1)[0] in EXCLUSIVE_COMMANDS
+                        for command in commands if command and not command.startswith('#'))
+        await self._run_locked(exclusive, session.run_script, commands)
+
+    async def _execute(self, session, command, writer):
+        """
+        Выполняет команду сеанса и передает клиенту её вывод по мере готовности.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(OUTPUT_QUEUE_SIZE)
+        exit_requested = False
+        stalled = False
+
+        def emit(chunk):
+            # Ожидание места в очереди приостанавливает команду, пока клиент не прочитает вывод
+            nonlocal stalled
+            if stalled:
+                return
+            put = asyncio.run_coroutine_threadsafe(chunks.put(chunk), loop)
+            try:
+                put.result(OUTPUT_STALL_TIMEOUT)
+            except FutureTimeoutError:
+                # Клиент не читает вывод: прерываем команду, чтобы освободить блокировку
+                put.cancel()
+                stalled = True
+                session.cancel()
+                logger.warning('Client stalled, command cancelled: %s', command)
+
+        def produce():
+            nonlocal exit_requested
+            try:
+                for chunk in session.iter_output(command, clear_cancel=False):
+                    emit(chunk)
+            except SystemExit:
+                exit_requested = True
+            except Exception:
+                logger.exception('Command failed: %s', command)
+                emit(f"{command}: internal error\n")
+
+        def finished(future):
+            # Конец ответа ставится уже после освобождения блокировки
+            loop.create_task(chunks.put(None))
+
+        name = command.split(maxsplit=1)[0] if command else ''
+        job = asyncio.ensure_future(self._run_locked(name in EXCLUSIVE_COMMANDS, produce))
+        job.add_done_callback(finished)
+        alive = True
+        while (chunk := await chunks.get()) is not None:
+            if alive:
+                try:
+                    writer.write(chunk.encode('utf-8'))
+                    await writer.drain()
+                except ConnectionError:
+                    # Клиент отключился: прерываем команду и дочитываем очередь
+                    alive = False
+                    session.cancel()
+        try:
+            await job
+        except Exception:
+            logger.exception('Command was not executed: %s', command)
+        if alive:
+            try:
+                writer.write(RESPONSE_END)
+                await writer.drain()
+            except ConnectionError:
+                pass
+        if exit_requested:
+            writer.close()
+
+
+def serve(emulator, address, max_workers=DEFAULT_SERVER_WORKERS):
+    """
+    Запускает сервер и обслуживает подключения до прерывания (Ctrl+C).
+
+    Параметры:
+        emulator (Emulator): Общий эмулятор.
+        address (str): Адрес сервера.
+        max_workers (int): Число потоков для выполнения команд.
+    """
+    async def run():
+        server = EmulatorServer(emulator, max_workers)
+        await server.start(address)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.cleanup()
+
+
+class ShellClient:
+    """
+    Синхронный клиент сервера эмулятора.
+    """
+
+    def __init__(self, address, timeout=None):
+        """
+        Подключается к серверу.
+
+        Параметры:
+            address (str): Адрес сервера.
+            timeout (float, optional): Таймаут операций сокета в секундах.
+        """
+        kind, target = parse_address(address)
+        if kind == 'unix':
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # Подключение к unix-сокету выполняется в блокирующем режиме:
+            # с таймаутом при заполненной очереди сервера оно сразу падает с EAGAIN
+            self.sock.connect(target)
+            self.sock.settimeout(timeout)
+        else:
+            self.sock = socket.create_connection(target, timeout)
+        self._buffer = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def iter_response(self, command):
+        """
+        Отправляет команду и по мере получения отдает фрагменты ответа.
+
+        Параметры:
+            command (str): Команда.
+
+        Возвращает:
+            iterator: Фрагменты вывода (str); заканчивается с концом ответа
+                или закрытием соединения.
+        """
+        self.sock.sendall(command.encode('utf-8') + b'\n')
+        return self.read_response()
+
+    def read_response(self):
+        """
+        Читает ответ сервера на ранее отправленную команду.
+
+        Возвращает:
+            iterator: Фрагменты вывода (str).
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            data, sep, rest = self._buffer.partition(RESPONSE_END)
+            if sep:
+                self._buffer = rest
+                yield decoder.decode(data, final=True)
+                return
+            if data:
+                yield decoder.decode(data)
+            self._buffer = self.sock.recv(65536)
+            if not self._buffer:
+                yield decoder.decode(b'', final=True)
+                return
+
+    def execute(self, command):
+        """
+        Выполняет команду и возвращает её вывод целиком.
+
+        Параметры:
+            command (str): Команда.
+
+        Возвращает:
+            str: Вывод команды.
+        """
+        return ''.join(self.iter_response(command))
+
+    def cancel(self):
+        """
+        Прерывает выполняющуюся команду.
+        """
+        self.sock.sendall(CANCEL.encode('utf-8') + b'\n')
+
+    def close(self):
+        self.sock.close()
+
+
+def run_client(address):
+    """
+    Интерактивный клиент: читает команды из stdin и печатает ответы сервера.
+
+    Параметры:
+        address (str): Адрес сервера.
+    """
+    with ShellClient(address) as client:
+        for line in sys.stdin:
+            command = line.strip()
+            if not command:
+                continue
+            try:
+                for chunk in client.iter_response(command):
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
+            except KeyboardInterrupt:
+                # Дочитываем ответ прерванной команды, чтобы не смешать его со следующим
+                client.cancel()
+                for chunk in client.read_response():
+                    sys.stdout.write(chunk)
+            except ConnectionError:
+                # Сервер закрыл сеанс (например, командой exit)
+                break
@@ -1,8 +1,28 @@
 import unittest
-from core import Emulator
+from core import Emulator, Session, VFSIndex, MemberCache
+from gui import ShellGUI
+from mmap_zip import MmapZipFile
+import zipfile
+import tempfile
+from unittest.mock import patch
+import core
+import commands
+from importlib.metadata import EntryPoint
+import io
+import sys
+import subprocess
 import shutil
 import os
 import time
+import asyncio
+import threading
+from server import EmulatorServer, ShellClient, parse_address
+import server
+import generate_virtual_fs
+import stat
+import errno
+import pstats
+from resolver import PathError
 
 class TestEmulator(unittest.TestCase):
     def setUp(self):
@@ -69,6 +89,733 @@ class TestEmulator(unittest.TestCase):
         self.assertIn("Uptime", result)
         self.assertAlmostEqual(float(result.split()[1]), uptime_seconds, delta=1)
 
+    def test_run_cd_parent_command(self):
+        """
+        Тест команды cd ..: возврат в корневую директорию.
+        """
+        self.emulator.run_command('cd folder1')
+        self.emulator.run_command('cd ..')
+        self.assertEqual(self.emulator.current_dir, '')
+
+    def test_cd_missing_directory(self):
+        """
+        Тест команды cd для несуществующей директории и для файла.
+        """
+        self.assertIn('No such file or directory', self.emulator.cd('missing'))
+        self.assertIn('No such file or directory', self.emulator.cd('startup.sh'))
+        self.assertEqual(self.emulator.current_dir, '')
+
+    def test_cat_command(self):
+        """
+        Тест команды cat: вывод содержимого файла и ошибка для директории.
+        """
+        self.assertEqual(''.join(self.emulator.cat('folder1/file1.txt')), 'This is file1 in folder1.')
+        self.assertIn('Is a directory', ''.join(self.emulator.cat('folder1')))
+
+    def test_head_tail_commands(self):
+        """
+        Тест команд head и tail для сжатого файла.
+        """
+        self.assertEqual(''.join(self.emulator.head('-n', '1', 'startup.sh')), '# startup.sh\n')
+        self.assertEqual(''.join(self.emulator.tail('-n', '2', 'startup.sh')), 'ls\ndate\n')
+
+    def test_wc_and_grep_commands(self):
+        """
+        Тест команд wc и grep.
+        """
+        self.assertEqual(self.emulator.wc('startup.sh').split(), ['6', '11', '68', 'startup.sh'])
+        self.assertEqual(''.join(self.emulator.grep('-n', 'cd', 'startup.sh')), '4:cd folder1\n')
+
+    def test_repeated_reads_hit_cache(self):
+        """
+        Тест кэша: повторное чтение файла не распаковывает его заново.
+        """
+        ''.join(self.emulator.cat('startup.sh'))
+        ''.join(self.emulator.head('startup.sh'))
+        stats = self.emulator.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertIn('hits=1 misses=1', self.emulator.stats())
+
+    def test_find_command(self):
+        """
+        Тест команды find: поиск по маске имени в индексе директорий.
+        """
+        output = ''.join(self.emulator.find('.', '-name', 'file*.txt')).split()
+        self.assertEqual(output, ['./folder1/file1.txt', './folder1/file2.txt',
+                                  './folder2/file3.txt', './folder2/file4.txt'])
+        self.assertEqual(''.join(self.emulator.find('folder2', '-type', 'd')), 'folder2\n')
+        self.assertEqual(''.join(self.emulator.find('.', '-type', 'x')), 'find: Unknown argument to -type: x')
+
+    def test_recursive_grep(self):
+        """
+        Тест команды grep -r: результаты в порядке путей.
+        """
+        output = ''.join(self.emulator.grep('-r', 'folder2', 'folder2')).splitlines()
+        self.assertEqual(output, ['folder2/file3.txt:This is file3 in folder2.',
+                                  'folder2/file4.txt:This is file4 in folder2.'])
+
+    def test_recursive_grep_parallel(self):
+        """
+        Тест команды grep -r: пул процессов дает тот же результат, что и поиск в одном процессе.
+        """
+        serial = ''.join(self.emulator.grep('-r', '-n', 'file[13]', '.'))
+        self.emulator.search_workers = 2
+        with patch.object(core, 'PARALLEL_SEARCH_MIN_BYTES', 0):
+            parallel = ''.join(self.emulator.grep('-r', '-n', 'file[13]', '.'))
+        self.emulator.cleanup()
+        self.assertEqual(parallel, serial)
+        self.assertEqual(len(serial.splitlines()), 2)
+
+    def test_iter_output(self):
+        """
+        Тест потокового вывода команды: вывод завершается переводом строки.
+        """
+        self.assertEqual(''.join(self.emulator.iter_output('cat folder1/file1.txt')),
+                         'This is file1 in folder1.\n')
+        self.assertEqual(list(self.emulator.iter_output('   ')), [])
+
+    def test_cancel_command(self):
+        """
+        Тест прерывания команды: после cancel() вывод обрывается.
+        """
+        output = self.emulator.iter_output('cat startup.sh')
+        self.assertTrue(next(output).startswith('# startup.sh'))
+        self.emulator.cancel()
+        self.assertEqual(list(output), ['^C\n'])
+        # Следующая команда выполняется как обычно
+        self.assertEqual(''.join(self.emulator.iter_output('ls')), 'folder1\nfolder2\nstartup.sh\n')
+
+    def test_cancel_queued_command(self):
+        """
+        Тест прерывания команды, поставленной в очередь: cancel() до запуска не теряется.
+        """
+        self.emulator.cancel_event.clear()
+        self.emulator.cancel()
+        self.assertEqual(list(self.emulator.iter_output('cat startup.sh', clear_cancel=False)), ['^C\n'])
+
+    def test_run_script(self):
+        """
+        Тест выполнения скрипта: комментарии и пустые строки пропускаются.
+        """
+        output = io.StringIO()
+        self.emulator.run_script(['# comment', '', 'cd folder2', 'ls'], output)
+        self.assertEqual(output.getvalue(), 'Changed directory to folder2\nfile3.txt\nfile4.txt\n')
+
+    def test_argument_spec(self):
+        """
+        Тест реестра команд: проверка числа аргументов по спецификации.
+        """
+        self.assertEqual(''.join(self.emulator.iter_output('cd')), 'cd: missing operand\nusage: cd DIR\n')
+        self.assertIn('too many arguments', ''.join(self.emulator.iter_output('uptime now')))
+        self.assertEqual(''.join(self.emulator.iter_output('nope')), 'nope: command not found\n')
+
+
+class TestCommandRegistry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.temp_dir, 'hello_plugin.py'), 'w') as f:
+            f.write("from commands import command\n"
+                    "@command('hello', max_args=1, usage='hello [NAME]')\n"
+                    "def hello(emulator, name='world'):\n"
+                    "    return f'Hello, {name}!'\n")
+        sys.path.insert(0, self.temp_dir)
+        self.registry = commands.CommandRegistry()
+        self.entry_point = EntryPoint('hello', 'hello_plugin:hello', commands.ENTRY_POINT_GROUP)
+
+    def tearDown(self):
+        sys.path.remove(self.temp_dir)
+        sys.modules.pop('hello_plugin', None)
+        commands.registry._commands.pop('hello', None)
+        shutil.rmtree(self.temp_dir)
+
+    def test_lazy_entry_point(self):
+        """
+        Тест реестра команд: модуль стороннего пакета импортируется при первом вызове команды.
+        """
+        with patch.object(commands, 'entry_points', return_value=[self.entry_point]):
+            self.assertIn('hello', self.registry.names())
+            self.assertNotIn('hello_plugin', sys.modules)
+            spec = self.registry.get('hello')
+        self.assertIn('hello_plugin', sys.modules)
+        self.assertEqual(spec.handler(None, 'VFS'), 'Hello, VFS!')
+
+    def test_decorator_registration(self):
+        """
+        Тест реестра команд: регистрация обработчика декоратором.
+        """
+        @self.registry.command('echo', usage='echo [TEXT]...')
+        def echo(emulator, *words):
+            return ' '.join(words)
+
+        spec = self.registry.get('echo')
+        self.assertIs(spec.handler, echo)
+        self.assertIsNone(spec.check_args(['a', 'b']))
+
+
+class TestBatchMode(unittest.TestCase):
+    def test_batch_from_stdin(self):
+        """
+        Тест пакетного режима: команды из stdin, вывод в stdout, без tkinter.
+        """
+        code = ("import sys, core; core.main(['--batch']); "
+                "sys.stdout.write(str('tkinter' in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code], input='cd folder1\nls\n',
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout, 'Changed directory to folder1\nfile1.txt\nfile2.txt\nFalse')
+
+
+class TestLogging(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.temp_dir, 'emulator.log')
+
+    def tearDown(self):
+        core.stop_logging()
+        shutil.rmtree(self.temp_dir)
+
+    def make_emulator(self, level):
+        config_path = os.path.join(self.temp_dir, 'config.xml')
+        with open(config_path, 'w') as f:
+            f.write(f'<config><vfs_path>virtual_fs.zip</vfs_path>'
+                    f'<startup_script>startup.sh</startup_script>'
+                    f'<log_file>{self.log_path}</log_file><log_level>{level}</log_level></config>')
+        return Emulator(config_path)
+
+    def read_log(self):
+        core.stop_logging()
+        if not os.path.exists(self.log_path):
+            return ''
+        with open(self.log_path) as f:
+            return f.read()
+
+    def test_debug_records_written(self):
+        """
+        Тест логирования: записи из очереди попадают в файл после остановки потока.
+        """
+        self.make_emulator('DEBUG').run_command('ls')
+        self.assertIn('Command executed: ls', self.read_log())
+
+    def test_level_from_config(self):
+        """
+        Тест логирования: уровень из конфигурации отсекает отладочные записи.
+        """
+        self.make_emulator('WARNING').run_command('ls')
+        self.assertEqual(self.read_log(), '')
+
+
+class TestMemberCache(unittest.TestCase):
+    def test_eviction_by_bytes(self):
+        """
+        Тест кэша: вытеснение самых старых записей при превышении бюджета.
+        """
+        cache = MemberCache(max_bytes=10, max_item_size=10)
+        cache.put('a', b'12345')
+        cache.put('b', b'12345')
+        cache.get('a')
+        cache.put('c', b'123')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'12345')
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.size, 8)
+
+    def test_large_items_not_cached(self):
+        """
+        Тест кэша: записи больше max_item_size не кэшируются.
+        """
+        cache = MemberCache(max_bytes=100)
+        cache.put('big', b'x' * 26)
+        self.assertEqual(len(cache), 0)
+
+
+class TestStoredMembers(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        vfs_path = os.path.join(self.temp_dir, 'vfs.zip')
+        with zipfile.ZipFile(vfs_path, 'w', zipfile.ZIP_STORED) as zipf:
+            zipf.writestr('big.txt', ''.join(f'line {i}\n' for i in range(100000)))
+            zipf.writestr('words.txt', 'alpha beta\n' * 20000)
+        config_path = os.path.join(self.temp_dir, 'config.xml')
+        with open(config_path, 'w') as f:
+            f.write(f'<config><vfs_path>{vfs_path}</vfs_path>'
+                    f'<startup_script>startup.sh</startup_script>'
+                    f'<cache_size>0</cache_size></config>')
+        self.emulator = Emulator(config_path)
+
+    def tearDown(self):
+        self.emulator.cleanup()
+        shutil.rmtree(self.temp_dir)
+
+    def test_tail_stored(self):
+        """
+        Тест команды tail для несжатого файла больше одного блока чтения.
+        """
+        self.assertEqual(''.join(self.emulator.tail('-n', '3', 'big.txt')),
+                         'line 99997\nline 99998\nline 99999\n')
+
+    def test_wc_across_chunks(self):
+        """
+        Тест команды wc: слова на границе блоков не считаются дважды.
+        """
+        self.assertEqual(self.emulator.wc('words.txt').split()[:3], ['20000', '40000', '220000'])
+
+
+class TestScrollback(unittest.TestCase):
+    def test_lines_to_trim(self):
+        """
+        Тест истории вывода: строки удаляются пачками после накопления запаса.
+        """
+        self.assertEqual(ShellGUI.lines_to_trim(1050, 1000), 0)
+        self.assertEqual(ShellGUI.lines_to_trim(1101, 1000), 101)
+        self.assertEqual(ShellGUI.lines_to_trim(10 ** 6, 0), 0)
+
+
+class TestVFSIndex(unittest.TestCase):
+    def test_implicit_directories(self):
+        """
+        Тест индекса: директории без собственной записи в архиве.
+        """
+        index = VFSIndex(['a/b/c.txt', 'a/d.txt', 'e/', 'top.txt'])
+        self.assertEqual(index.listdir(''), ['a', 'e', 'top.txt'])
+        self.assertEqual(index.listdir('a'), ['b', 'd.txt'])
+        self.assertEqual(index.listdir('a/b/'), ['c.txt'])
+        self.assertEqual(index.listdir('e'), [])
+        self.assertIsNone(index.listdir('missing'))
+
+    def test_lookup(self):
+        """
+        Тест индекса: определение типа объекта по пути.
+        """
+        index = VFSIndex(['a/b/c.txt'])
+        self.assertEqual(index.lookup('a/b'), 'dir')
+        self.assertEqual(index.lookup('/a/b/c.txt'), 'file')
+        self.assertIsNone(index.lookup('a/c'))
+        self.assertEqual(index.member_name('a/b/c.txt'), 'a/b/c.txt')
+
+    def test_whiteouts(self):
+        """
+        Тест индекса: записи ".wh." удаляют ранее добавленные пути.
+        """
+        index = VFSIndex(['a/b.txt', 'a/c.txt', 'd/e.txt', 'a/.wh.b.txt', '.wh.d', 'd/'])
+        self.assertEqual(index.listdir('a'), ['c.txt'])
+        self.assertEqual(index.listdir('d'), [])
+        self.assertIsNone(index.lookup('d/e.txt'))
+
+
+class TestOverlay(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.vfs_path = os.path.join(self.temp_dir, 'vfs.zip')
+        shutil.copy('virtual_fs.zip', self.vfs_path)
+        config_path = os.path.join(self.temp_dir, 'config.xml')
+        with open(config_path, 'w') as f:
+            f.write(f'<config><vfs_path>{self.vfs_path}</vfs_path>'
+                    f'<startup_script>startup.sh</startup_script>'
+                    f'<overlay_spill_bytes>16</overlay_spill_bytes></config>')
+        self.emulator = Emulator(config_path)
+
+    def tearDown(self):
+        self.emulator.cleanup()
+        shutil.rmtree(self.temp_dir)
+
+    def execute(self, command):
+        return ''.join(self.emulator.iter_output(command)).rstrip('\n')
+
+    def run_commands(self, *commands):
+        return [self.execute(command) for command in commands]
+
+    def test_write_and_read(self):
+        """
+        Тест верхнего слоя: новые файлы видны командам чтения, архив не меняется.
+        """
+        self.run_commands('mkdir -p new/dir', 'echo "hello world" > new/dir/a.txt',
+                          'echo again >> new/dir/a.txt', 'touch new/b.txt')
+        self.assertEqual(self.execute('cat new/dir/a.txt'),
+                         "hello world\nagain")
+        self.assertEqual(self.execute('ls new'), "b.txt\ndir")
+        self.assertEqual(self.execute('mkdir -p'), "mkdir: missing operand\nusage: mkdir [-p] DIR...")
+        self.assertEqual(self.run_commands('mkdir -p -p opts/a', 'mkdir opts/b/c -p', 'mkdir -- -p'),
+                         ["", "", ""])
+        self.assertEqual(self.execute('ls opts'), "a\nb")
+        self.assertEqual(self.execute('ls opts/b'), "c")
+        self.assertIn('-p', self.execute('ls'))
+        self.assertEqual(self.execute('mkdir -x dir'), "mkdir: invalid option -- 'x'\nusage: mkdir [-p] DIR...")
+        self.assertIn('new', self.execute('ls'))
+        with zipfile.ZipFile(self.vfs_path) as archive:
+            self.assertNotIn('new/dir/a.txt', archive.namelist())
+
+    def test_copy_on_write(self):
+        """
+        Тест копирования при записи: файл архива дописывается в верхнем слое.
+        """
+        self.run_commands('echo more >> folder1/file1.txt', 'cp folder1/file1.txt folder2')
+        self.assertEqual(self.execute('cat folder2/file1.txt'),
+                         "This is file1 in folder1.more")
+        self.assertEqual(self.execute('grep more folder2/file1.txt'),
+                         "This is file1 in folder1.more")
+
+    def test_remove_and_move(self):
+        """
+        Тест удаления и перемещения: файлы архива скрываются whiteout-отметками.
+        """
+        self.assertEqual(self.execute('rm folder1'),
+                         "rm: cannot remove 'folder1': Is a directory")
+        self.run_commands('rm folder2/file3.txt', 'mv folder1 moved')
+        self.assertEqual(self.execute('ls folder2'), "file4.txt")
+        self.assertEqual(self.execute('ls moved'), "file1.txt\nfile2.txt")
+        self.assertNotIn('folder1', self.execute('ls'))
+        self.assertEqual(self.execute('cat folder1/file1.txt'),
+                         "cat: folder1/file1.txt: No such file or directory")
+        self.assertEqual(self.execute('rm -f missing.txt'), "")
+
+    def test_sync(self):
+        """
+        Тест sync: изменения дописываются в архив и переживают повторное открытие.
+        """
+        self.assertEqual(self.execute('sync'), "sync: nothing to do")
+        self.run_commands('rm -r folder2', 'mkdir empty', 'echo data > folder1/new.txt')
+        self.assertEqual(self.execute('sync'),
+                         f"sync: 3 entries written to {self.vfs_path}")
+        self.assertFalse(self.emulator.fs.is_dirty())
+
+        with zipfile.ZipFile(self.vfs_path) as archive:
+            self.assertIsNone(archive.testzip())
+        index = VFSIndex(zipfile.ZipFile(self.vfs_path).namelist())
+        self.assertIsNone(index.lookup('folder2'))
+        self.assertTrue(index.is_dir('empty'))
+        self.assertEqual(self.execute('cat folder1/new.txt'), "data")
+
+    def test_move_archive_directory(self):
+        """
+        Тест mv директории архива: файлы не распаковываются, а sync переносит их содержимое.
+        """
+        self.run_commands('mv folder1 moved', 'cp moved/file2.txt copy.txt')
+        self.assertEqual(self.emulator.fs.files, {'moved/file1.txt': 'folder1/file1.txt',
+                                                  'moved/file2.txt': 'folder1/file2.txt',
+                                                  'copy.txt': 'folder1/file2.txt'})
+        self.assertEqual(self.execute('cat moved/file1.txt'), "This is file1 in folder1.")
+        self.run_commands('echo more >> moved/file2.txt')
+        self.assertEqual(self.execute('sync'), f"sync: 5 entries written to {self.vfs_path}")
+
+        with zipfile.ZipFile(self.vfs_path) as archive:
+            self.assertIsNone(archive.testzip())
+        self.assertNotIn('folder1', self.execute('ls'))
+        self.assertEqual(self.execute('cat moved/file1.txt'), "This is file1 in folder1.")
+        self.assertEqual(self.execute('cat moved/file2.txt'), "This is file2 in folder1.more")
+        self.assertEqual(self.execute('cat copy.txt'), "This is file2 in folder1.")
+
+    def test_sync_failure(self):
+        """
+        Тест неудачного sync: архив не меняется, несохраненные изменения остаются.
+        """
+        self.run_commands('rm folder2/file3.txt', 'echo important > folder1/new.txt')
+        with open(self.vfs_path, 'rb') as f:
+            original = f.read()
+        open_member = zipfile.ZipFile.open
+        writes = []
+
+        def failing_open(archive, name, mode='r', *args, **kwargs):
+            # Первая запись (whiteout) проходит, вторая падает посреди дозаписи
+            if mode == 'w':
+                writes.append(name)
+                if len(writes) == 2:
+                    raise OSError(errno.ENOSPC, 'No space left on device')
+            return open_member(archive, name, mode, *args, **kwargs)
+
+        with patch.object(zipfile.ZipFile, 'open', failing_open):
+            self.assertEqual(self.execute('sync'), "sync: [Errno 28] No space left on device")
+        with open(self.vfs_path, 'rb') as f:
+            self.assertEqual(f.read(), original)
+        self.assertTrue(self.emulator.fs.is_dirty())
+        self.assertEqual(self.execute('cat folder1/new.txt'), "important")
+        self.assertEqual(self.execute('ls folder2'), "file4.txt")
+        self.assertEqual(self.execute('sync'), f"sync: 2 entries written to {self.vfs_path}")
+        self.assertEqual(self.execute('cat folder1/new.txt'), "important")
+
+    def test_reserved_names(self):
+        """
+        Тест имен ".wh.*": они зарезервированы под отметки удаления и не создаются.
+        """
+        self.assertEqual(self.run_commands('touch .wh.file1.txt', 'mkdir -p new/.wh.dir',
+                                           'echo x > folder1/.wh.file2.txt',
+                                           'cp folder1/file1.txt folder2/.wh.file3.txt'),
+                         ["touch: cannot touch '.wh.file1.txt': Invalid argument",
+                          "mkdir: cannot create directory 'new/.wh.dir': Invalid argument",
+                          "echo: folder1/.wh.file2.txt: Invalid argument",
+                          "cp: cannot create 'folder2/.wh.file3.txt': Invalid argument"])
+        self.assertEqual(self.execute('sync'), "sync: nothing to do")
+        self.assertEqual(self.execute('ls folder2'), "file3.txt\nfile4.txt")
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.address = f"unix:{os.path.join(self.temp_dir, 'emulator.sock')}"
+        self.emulator = Emulator('config.xml')
+        self.server = EmulatorServer(self.emulator, max_workers=4)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(self.address), self.loop).result()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.emulator.cleanup()
+        shutil.rmtree(self.temp_dir)
+
+    def test_parse_address(self):
+        """
+        Тест разбора адреса сервера.
+        """
+        self.assertEqual(parse_address('unix:/tmp/s.sock'), ('unix', '/tmp/s.sock'))
+        self.assertEqual(parse_address(':8022'), ('tcp', ('127.0.0.1', 8022)))
+        self.assertEqual(parse_address('0.0.0.0:8022'), ('tcp', ('0.0.0.0', 8022)))
+        with self.assertRaises(ValueError):
+            parse_address('localhost')
+
+    def test_sessions_are_independent(self):
+        """
+        Тест сервера: у каждого подключения своя текущая директория, а индекс общий.
+        """
+        with ShellClient(self.address, timeout=10) as first, \
+                ShellClient(self.address, timeout=10) as second:
+            self.assertEqual(first.execute('cd folder1'), "Changed directory to folder1\n")
+            self.assertEqual(first.execute('ls'), "file1.txt\nfile2.txt\n")
+            self.assertEqual(second.execute('ls'), "folder1\nfolder2\nstartup.sh\n")
+            first.execute('echo shared > note.txt')
+            self.assertEqual(second.execute('cat folder1/note.txt'), "shared\n")
+
+    def test_many_sessions(self):
+        """
+        Тест сервера: сотни одновременных сеансов обслуживаются одним процессом.
+        """
+        results = []
+
+        def client(i):
+            with ShellClient(self.address, timeout=30) as c:
+                c.execute(f'cd folder{i % 2 + 1}')
+                results.append(c.execute('ls'))
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(200)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 200)
+        self.assertEqual(results.count("file1.txt\nfile2.txt\n"), 100)
+        self.assertEqual(results.count("file3.txt\nfile4.txt\n"), 100)
+
+    def test_waiting_writer_has_priority(self):
+        """
+        Тест блокировки сервера: новые чтения ждут, пока выполнится ожидающая запись.
+        """
+        async def scenario():
+            lock = server._ReadWriteLock()
+            order = []
+            await lock.acquire(False)
+            writer = asyncio.create_task(lock.acquire(True))
+            await asyncio.sleep(0)
+            reader = asyncio.create_task(lock.acquire(False))
+            reader.add_done_callback(lambda _: order.append('reader'))
+            writer.add_done_callback(lambda _: order.append('writer'))
+            await asyncio.sleep(0)
+            self.assertEqual(order, [])
+            await lock.release(False)
+            await writer
+            await lock.release(True)
+            await reader
+            return order
+
+        self.assertEqual(asyncio.run(scenario()), ['writer', 'reader'])
+
+    def test_slow_client_does_not_block_writes(self):
+        """
+        Тест сервера: клиент, не читающий вывод, не задерживает команды записи других сеансов.
+        """
+        self.emulator.fs.write('big.txt', b'x' * (16 * 1024 * 1024))
+        with patch.object(server, 'OUTPUT_STALL_TIMEOUT', 0.5), \
+                ShellClient(self.address, timeout=10) as slow, \
+                ShellClient(self.address, timeout=10) as other:
+            slow.execute('ls')
+            slow.sock.sendall(b'cat /big.txt\n')
+            time.sleep(0.2)
+            self.assertEqual(other.execute('touch /after.txt'), "")
+            self.assertIn('after.txt', other.execute('ls /'))
+
+    def test_session_shares_emulator(self):
+        """
+        Тест сеанса: не перечитывает архив и не закрывает его при завершении.
+        """
+        session = Session(self.emulator)
+        self.assertIs(session.fs, self.emulator.fs)
+        self.assertIs(session.cache, self.emulator.cache)
+        session.cd('folder2')
+        self.assertEqual(self.emulator.current_dir, '')
+        session.cleanup()
+        self.assertIn('folder1', self.emulator.ls())
+
+
+class TestGenerator(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_synthetic_tree(self):
+        """
+        Тест генератора: форма дерева и корректность сжатых заранее записей.
+        """
+        path = os.path.join(self.temp_dir, 'vfs.zip')
+        count, total = generate_virtual_fs.create_synthetic_archive(
+            path, depth=2, fanout=3, files_per_dir=4, size='uniform:0:5000', seed=7)
+        self.assertEqual(count, 4 * (1 + 3 + 9))
+        with zipfile.ZipFile(path) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(sum(info.file_size for info in archive.infolist()), total)
+            index = VFSIndex(archive.namelist())
+        self.assertEqual(index.listdir(''), ['dir0', 'dir1', 'dir2'] + [f'file{i}.txt' for i in range(4)])
+        self.assertEqual(len(index.listdir('dir2/dir1')), 4)
+
+    def test_deterministic_with_workers(self):
+        """
+        Тест генератора: архив с тем же seed не зависит от числа процессов.
+        """
+        paths = []
+        for workers in (1, 2):
+            path = os.path.join(self.temp_dir, f'vfs{workers}.zip')
+            generate_virtual_fs.create_synthetic_archive(
+                path, depth=1, fanout=2, files_per_dir=3000, max_files=5000, seed=3, workers=workers)
+            paths.append(path)
+        with open(paths[0], 'rb') as first, open(paths[1], 'rb') as second:
+            self.assertEqual(first.read(), second.read())
+        self.assertEqual(len(zipfile.ZipFile(paths[0]).namelist()), 5000)
+
+
+class TestPathResolver(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        vfs_path = os.path.join(self.temp_dir, 'vfs.zip')
+        with zipfile.ZipFile(vfs_path, 'w') as zipf:
+            zipf.writestr('data/logs/app.txt', 'log line\n')
+            zipf.writestr('data/notes.txt', 'notes\n')
+            for name, target in (('logs', 'data/logs'), ('data/logs/up', '..'),
+                                 ('abs', '/data/notes.txt'), ('loop', 'loop')):
+                info = zipfile.ZipInfo(name)
+                info.external_attr = (stat.S_IFLNK | 0o777) << 16
+                zipf.writestr(info, target)
+        self.config_path = os.path.join(self.temp_dir, 'config.xml')
+        self.write_config('zipfile')
+        self.emulator = Emulator(self.config_path)
+
+    def tearDown(self):
+        self.emulator.cleanup()
+        shutil.rmtree(self.temp_dir)
+
+    def write_config(self, backend):
+        with open(self.config_path, 'w') as f:
+            f.write(f'<config><vfs_path>{os.path.join(self.temp_dir, "vfs.zip")}</vfs_path>'
+                    f'<startup_script>startup.sh</startup_script>'
+                    f'<vfs_backend>{backend}</vfs_backend></config>')
+
+    def test_relative_and_absolute(self):
+        """
+        Тест разрешения путей: '.', '..', абсолютные пути и '~'.
+        """
+        resolve = self.emulator.resolver.resolve
+        self.assertEqual(resolve('data', '../data/./notes.txt'), 'data/notes.txt')
+        self.assertEqual(resolve('data/logs', '../../..'), '')
+        self.assertEqual(resolve('data/logs', '/data//notes.txt'), 'data/notes.txt')
+        self.assertEqual(resolve('data/logs', '~/data'), 'data')
+        self.emulator.cd('/data/logs')
+        self.assertEqual(self.emulator.cd('../..'), "Changed directory to ")
+        self.assertEqual(self.emulator.cd('~/data/logs'), "Changed directory to data/logs")
+
+    def test_symlinks(self):
+        """
+        Тест ссылок: переход по ссылкам на файлы и директории, цикл ссылок.
+        """
+        for backend in ('zipfile', 'mmap'):
+            self.emulator.cleanup()
+            self.write_config(backend)
+            self.emulator = Emulator(self.config_path)
+            self.assertEqual(''.join(self.emulator.iter_output('cat logs/app.txt')), "log line\n")
+            self.assertEqual(''.join(self.emulator.iter_output('cat abs')), "notes\n")
+            self.assertEqual(self.emulator.resolver.resolve('', 'logs/up/notes.txt'), 'data/notes.txt')
+            self.assertEqual(self.emulator.cd('logs'), "Changed directory to data/logs")
+            with self.assertRaises(PathError):
+                self.emulator.resolver.resolve('', 'loop')
+            self.assertIn('Too many levels of symbolic links', ''.join(self.emulator.iter_output('cat /loop')))
+
+    def test_memo_invalidated_by_writes(self):
+        """
+        Тест памяти разрешителя: повторные запросы отвечаются из неё, запись сбрасывает её.
+        """
+        resolver = self.emulator.resolver
+        resolver.resolve('', 'logs/app.txt')
+        resolver.resolve('', 'logs/app.txt')
+        self.assertEqual((resolver.hits, resolver.misses), (1, 1))
+        self.emulator.rm('logs')
+        self.assertEqual(self.emulator.ls('data/logs'), "app.txt\nup")
+        self.assertEqual(resolver.resolve('', 'logs/app.txt'), 'logs/app.txt')
+        self.assertIn('No such file', ''.join(self.emulator.iter_output('cat logs/app.txt')))
+
+    def test_completion(self):
+        """
+        Тест автодополнения: имена команд и пути относительно текущей директории.
+        """
+        self.assertEqual(self.emulator.complete('he'), ['head', 'help'])
+        self.assertEqual(self.emulator.complete('cat da'), ['data/'])
+        self.assertEqual(self.emulator.complete('cat data/n'), ['data/notes.txt'])
+        self.assertEqual(self.emulator.complete('ls /data/'), ['/data/logs/', '/data/notes.txt'])
+        self.emulator.cd('data')
+        self.assertEqual(self.emulator.complete('cat ../l'), ['../logs', '../loop'])
+        self.assertEqual(self.emulator.complete('cat missing/x'), [])
+
+
+class TestProfiling(unittest.TestCase):
+    def test_profile_per_command(self):
+        """
+        Тест профилирования: статистика cProfile сохраняется для каждой команды.
+        """
+        emulator = Emulator('config.xml')
+        profile_dir = tempfile.mkdtemp()
+        try:
+            emulator.profile_dir = profile_dir
+            self.assertEqual(''.join(emulator.iter_output('cat folder1/file1.txt')),
+                             "This is file1 in folder1.\n")
+            emulator.run_command('ls')
+            files = sorted(os.listdir(profile_dir))
+            self.assertEqual(files, ['000001-cat.prof', '000002-ls.prof'])
+            stats = pstats.Stats(os.path.join(profile_dir, files[0]))
+            self.assertTrue(any(func[2] == 'cat' for func in stats.stats))
+        finally:
+            emulator.cleanup()
+            shutil.rmtree(profile_dir)
+
+
+class TestMmapZipFile(unittest.TestCase):
+    def test_matches_zipfile(self):
+        """
+        Тест mmap-бэкенда: имена и содержимое записей совпадают с zipfile.
+        """
+        with zipfile.ZipFile('virtual_fs.zip') as expected, MmapZipFile('virtual_fs.zip') as actual:
+            self.assertEqual(actual.namelist(), expected.namelist())
+            for name in expected.namelist():
+                with actual.open(name) as f:
+                    self.assertEqual(f.read(), expected.read(name))
+                self.assertEqual(actual.getinfo(name).CRC, expected.getinfo(name).CRC)
+
+    def test_missing_member(self):
+        """
+        Тест mmap-бэкенда: открытие отсутствующей записи.
+        """
+        with MmapZipFile('virtual_fs.zip') as archive:
+            with self.assertRaises(KeyError):
+                archive.open('missing.txt')
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
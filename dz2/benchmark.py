@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Git commit graph visualizer.
+
+Synthetic repositories are generated with ``git fast-import`` (a main line
+with a merged side commit every MERGE_EVERY commits) and cached in a work
+directory, so repeated runs reuse them.
+
+Usage:
+    python benchmark.py backends --commits 50000
+    python benchmark.py jobs --commits 50000 --branches 16 --jobs 1 4 16
+    python benchmark.py memory --commits 1000000
+    python benchmark.py window --commits 50000
+    python benchmark.py parse --commits 50000 --parses 1000000
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, Iterator, List
+
+import core
+from compactgraph import CompactGraph
+from dates import format_date
+
+DEFAULT_COMMITS = 50000
+
+# The memory benchmark builds graphs in-process, without a repository
+DEFAULT_MEMORY_COMMITS = 1_000_000
+
+# Commit objects parsed by the parse benchmark (the repository's commits, repeated)
+DEFAULT_PARSES = 1_000_000
+
+# Every MERGE_EVERY-th commit on the main line merges a side commit
+MERGE_EVERY = 50
+
+# Commits read through the subprocess backend before extrapolating (two process spawns each)
+DEFAULT_SUBPROCESS_SAMPLE = 2000
+
+BENCH_TAG = 'bench'
+
+
+def fast_import_stream(commits: int, branches: int = 1):
+    """
+    Yields a ``git fast-import`` stream describing a synthetic history.
+
+    With one branch, history is a main line with a merged side commit every
+    MERGE_EVERY commits. With several, commits are dealt round-robin to
+    independent lines that an octopus merge joins at the end, so a
+    traversal frontier is ``branches`` commits wide.
+
+    Args:
+        commits: Number of commits (side commits and the final merge come on top).
+        branches: Number of parallel lines.
+
+    Yields:
+        Chunks of the stream as bytes.
+    """
+    def data(payload: bytes) -> bytes:
+        return b'data %d\n%s\n' % (len(payload), payload)
+
+    def person(i: int) -> bytes:
+        return b'Author %d <author%d@example.com>' % (i % 7, i % 7)
+
+    mark = 0
+    tips = [0] * branches
+    timestamp = 1_600_000_000
+    for i in range(commits):
+        line = i % branches
+        side_mark = 0
+        if branches == 1 and i and i % MERGE_EVERY == 0:
+            mark += 1
+            side_mark = mark
+            yield (b'commit refs/heads/side\nmark :%d\n' % mark +
+                   b'author Side Author <side@example.com> %d +0300\n' % timestamp +
+                   b'committer Side Author <side@example.com> %d +0300\n' % timestamp +
+                   data(b'Side change %d' % i) +
+                   b'from :%d\n' % tips[0] +
+                   b'M 100644 inline side.txt\n' + data(b'side %d\n' % i))
+        mark += 1
+        timestamp += 60
+        ref = b'refs/heads/main' if branches == 1 else b'refs/heads/line%d' % line
+        stream = (b'commit %s\nmark :%d\n' % (ref, mark) +
+                  b'author %s %d +0000\n' % (person(i), timestamp) +
+                  b'committer %s %d +0000\n' % (person(i), timestamp) +
+                  data(b'Commit %d\n\nBody of commit %d.' % (i, i)))
+        if tips[line]:
+            stream += b'from :%d\n' % tips[line]
+        if side_mark:
+            stream += b'merge :%d\n' % side_mark
+        stream += b'M 100644 inline file%d.txt\n' % (i % 100) + data(b'content %d\n' % i)
+        tips[line] = mark
+        yield stream
+    if branches > 1:
+        mark += 1
+        yield (b'commit refs/heads/main\nmark :%d\n' % mark +
+               b'author %s %d +0000\n' % (person(0), timestamp) +
+               b'committer %s %d +0000\n' % (person(0), timestamp) +
+               data(b'Merge %d lines' % branches) +
+               b'from :%d\n' % tips[0] +
+               b''.join(b'merge :%d\n' % tip for tip in tips[1:] if tip))
+        tips[0] = mark
+    yield b'reset refs/tags/%s\nfrom :%d\n\n' % (BENCH_TAG.encode(), tips[0])
+
+
+def generate_repo(path: str, commits: int, branches: int = 1) -> str:
+    """
+    Creates a synthetic repository with a ``bench`` tag on the last commit.
+
+    Args:
+        path: Directory for the repository (created).
+        commits: Number of commits.
+        branches: Number of parallel lines (see fast_import_stream).
+
+    Returns:
+        The path.
+    """
+    subprocess.run(['git', 'init', '-q', path], check=True)
+    process = subprocess.Popen(['git', 'fast-import', '--quiet'], cwd=path, stdin=subprocess.PIPE)
+    for chunk in fast_import_stream(commits, branches):
+        process.stdin.write(chunk)
+    process.stdin.close()
+    if process.wait() != 0:
+        raise RuntimeError('git fast-import failed')
+    return path
+
+
+def repo_path(work_dir: str, commits: int, branches: int = 1) -> str:
+    """
+    Returns a cached synthetic repository of the given shape, generating it if needed.
+    """
+    name = f'repo-{commits}' if branches == 1 else f'repo-{commits}-x{branches}'
+    path = os.path.join(work_dir, name)
+    if not os.path.isdir(path):
+        print(f"generating {path}...", file=sys.stderr)
+        generate_repo(path + '.tmp', commits, branches)
+        os.rename(path + '.tmp', path)
+    return path
+
+
+def bench_backends(repo: str, subprocess_sample: int) -> Dict[str, dict]:
+    """
+    Times a full traversal with each object backend.
+
+    The subprocess backend reads only the first ``subprocess_sample`` commits
+    and the full time is extrapolated from its rate.
+    """
+    start_sha1 = core.get_tag_commit_sha1(repo, BENCH_TAG)
+    results = {}
+    for backend in core.OBJECT_BACKENDS:
+        core.close_object_readers()
+        start = time.perf_counter()
+        if backend == 'subprocess':
+            commits = 0
+            sha1 = start_sha1
+            while sha1 and commits < subprocess_sample:
+                node = core.parse_commit(core.read_object(repo, sha1, backend))
+                commits += 1
+                sha1 = node.parents[0] if node.parents else None
+        else:
+            commits = len(core.build_commit_graph(repo, start_sha1, backend))
+        elapsed = time.perf_counter() - start
+        results[backend] = {
+            'commits': commits,
+            'seconds': round(elapsed, 3),
+            'commits_per_s': round(commits / elapsed, 1),
+        }
+    total = results['native']['commits']
+    for result in results.values():
+        result['full_walk_s'] = round(total / result['commits_per_s'], 2)
+        result['extrapolated'] = result['commits'] != total
+    return results
+
+
+def bench_jobs(repo: str, jobs_list: List[int], backends: List[str]) -> List[dict]:
+    """
+    Times a full traversal (without commit-graph) for each worker count.
+
+    Returns:
+        One result per (backend, jobs), with the speed-up over one worker.
+    """
+    start_sha1 = core.get_tag_commit_sha1(repo, BENCH_TAG)
+    results = []
+    for backend in backends:
+        baseline = None
+        for jobs in jobs_list:
+            core.close_object_readers()
+            start = time.perf_counter()
+            graph = core.build_commit_graph(repo, start_sha1, backend, use_commit_graph=False, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            results.append({
+                'backend': backend,
+                'jobs': jobs,
+                'commits': len(graph),
+                'seconds': round(elapsed, 3),
+                'speedup': round(baseline / elapsed, 2),
+            })
+    return results
+
+
+def synthetic_nodes(commits: int) -> Iterator[core.CommitNode]:
+    """
+    Yields parsed commits of the same shape as fast_import_stream, newest first.
+
+    SHA1s are hashes of the commit number; nodes are built as parse_commit
+    builds them, with the author date already formatted.
+    """
+    def sha1(i: int) -> str:
+        return hashlib.sha1(b'%d' % i).hexdigest()
+
+    side = commits
+    for i in range(commits - 1, -1, -1):
+        timestamp = 1_600_000_000 + 60 * i
+        parents = [sha1(i - 1)] if i else []
+        if i and i % MERGE_EVERY == 0:
+            parents.append(sha1(side))
+        yield core.CommitNode(sha1(i), f'Author {i % 7} <author{i % 7}@example.com>',
+                              format_date(timestamp, 0), f'Commit {i}\n\nBody of commit {i}.',
+                              parents, timestamp, timestamp, 0)
+        if i and i % MERGE_EVERY == 0:
+            yield core.CommitNode(sha1(side), 'Side Author <side@example.com>', format_date(timestamp, 180),
+                                  f'Side change {i}', [sha1(i - 1)], timestamp, timestamp, 180)
+            side += 1
+
+
+def bench_memory(commits: int) -> Dict[str, dict]:
+    """
+    Measures the memory of a dict of CommitNode and of a CompactGraph.
+
+    Allocations are traced with tracemalloc: "bytes" is what the graph holds
+    once built, "peak" the maximum while building it.
+    """
+    def measure(build) -> dict:
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        graph = build()
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result = {
+            'commits': len(graph),
+            'seconds': round(elapsed, 2),
+            'bytes': current,
+            'peak': peak,
+            'bytes_per_commit': round(current / len(graph), 1),
+        }
+        del graph
+        return result
+
+    def compact() -> CompactGraph:
+        return CompactGraph.from_nodes(synthetic_nodes(commits))
+
+    return {
+        'dict': measure(lambda: {node.sha1: node for node in synthetic_nodes(commits)}),
+        'compact': measure(compact),
+    }
+
+
+def bench_window(repo: str, max_depth: int) -> List[dict]:
+    """
+    Times walking and shaping a window of history and counts what would be rendered.
+
+    Each variant writes its DOT text to memory; "nodes" and "edges" are
+    what Graphviz would have to lay out.
+    """
+    start_sha1 = core.get_tag_commit_sha1(repo, BENCH_TAG)
+    since = core.build_commit_graph(repo, start_sha1, max_depth=max_depth)
+    since = min(node.commit_time for node in since.values())
+    variants = [
+        ('full', {}, False),
+        ('simplify', {}, True),
+        (f'max_depth={max_depth}', {'max_depth': max_depth}, False),
+        ('since (same depth)', {'since': since}, False),
+        ('first_parent', {'first_parent': True}, False),
+        ('first_parent+simplify', {'first_parent': True}, True),
+    ]
+    results = []
+    for name, limits, simplify in variants:
+        core.close_object_readers()
+        start = time.perf_counter()
+        graph = core.build_commit_graph(repo, start_sha1, **limits)
+        window = core.window_graph(graph, first_parent=limits.get('first_parent', False))
+        if simplify:
+            window = core.collapse_linear_chains(window, [start_sha1])
+        core.generate_dot(window, ('sha', 'commit_date'))
+        elapsed = time.perf_counter() - start
+        results.append({
+            'variant': name,
+            'walked': len(graph),
+            'nodes': len(window),
+            'edges': sum(len(node.parents) for node in window.values()),
+            'seconds': round(elapsed, 3),
+        })
+    return results
+
+
+def bench_parse(repo: str, parses: int) -> Dict[str, dict]:
+    """
+    Times parse_commit on the repository's commit objects.
+
+    All commit objects are read into memory first, then parsed round-robin
+    until ``parses`` commits were parsed, so object reads are not measured.
+    "headers" touches only parents and commit time, as a walk does; "full"
+    also reads author, date and message, as a label with those fields does.
+    """
+    start_sha1 = core.get_tag_commit_sha1(repo, BENCH_TAG)
+    sha1s = list(core.build_commit_graph(repo, start_sha1, use_commit_graph=False))
+    reader = core.get_object_reader(repo, 'native')
+    objects = [(sha1, reader.read(sha1)[1]) for sha1 in sha1s]
+    results = {}
+    for mode in ('headers', 'full'):
+        gc.collect()
+        start = time.perf_counter()
+        for i in range(parses):
+            sha1, data = objects[i % len(objects)]
+            node = core.parse_commit(core.GitObject(sha1, 'commit', data))
+            node.parents, node.commit_time
+            if mode == 'full':
+                node.author, node.date, node.message
+        elapsed = time.perf_counter() - start
+        results[mode] = {
+            'parses': parses,
+            'distinct': len(objects),
+            'seconds': round(elapsed, 2),
+            'us_per_commit': round(elapsed / parses * 1e6, 2),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Git commit graph visualizer benchmarks')
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'git-graph-bench'),
+                        help='Directory for generated repositories')
+    parser.add_argument('--json', help='Write results as JSON to this file (default: stdout)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backends = commands.add_parser('backends', help='Compare object backends on a full traversal')
+    backends.add_argument('--commits', type=int, default=DEFAULT_COMMITS)
+    backends.add_argument('--subprocess-sample', type=int, default=DEFAULT_SUBPROCESS_SAMPLE,
+                          help='Commits read through the subprocess backend before extrapolating')
+    backends.add_argument('--gc', action='store_true', help='Pack the repository before measuring')
+
+    jobs = commands.add_parser('jobs', help='Scaling of the parallel traversal with the number of workers')
+    jobs.add_argument('--commits', type=int, default=DEFAULT_COMMITS)
+    jobs.add_argument('--branches', type=int, default=16,
+                      help='Parallel lines in the synthetic history (frontier width)')
+    jobs.add_argument('--jobs', type=int, nargs='+', default=[1, 4, 16])
+    jobs.add_argument('--backends', nargs='+', default=['native', 'batch'], choices=['native', 'batch'])
+
+    memory = commands.add_parser('memory', help='Memory of the in-memory graph representations')
+    memory.add_argument('--commits', type=int, default=DEFAULT_MEMORY_COMMITS)
+
+    window = commands.add_parser('window', help='Size of the rendered graph with traversal limits and simplification')
+    window.add_argument('--commits', type=int, default=DEFAULT_COMMITS)
+    window.add_argument('--max-depth', type=int, default=1000)
+
+    parse = commands.add_parser('parse', help='Commit parsing speed on real commit objects')
+    parse.add_argument('--commits', type=int, default=DEFAULT_COMMITS)
+    parse.add_argument('--parses', type=int, default=DEFAULT_PARSES)
+    args = parser.parse_args()
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    report = {'command': args.command, 'cpus': os.cpu_count()}
+    if args.command == 'backends':
+        repo = repo_path(args.work_dir, args.commits)
+        if args.gc:
+            subprocess.run(['git', 'gc', '-q'], cwd=repo, check=True)
+        report['commits'] = args.commits
+        report['results'] = bench_backends(repo, args.subprocess_sample)
+        for backend, result in report['results'].items():
+            note = ' (extrapolated)' if result['extrapolated'] else ''
+            print(f"{backend:10} {result['commits_per_s']:10,.0f} commits/s  "
+                  f"full walk {result['full_walk_s']:8.2f} s{note}", file=sys.stderr)
+    elif args.command == 'jobs':
+        repo = repo_path(args.work_dir, args.commits, args.branches)
+        report.update(commits=args.commits, branches=args.branches)
+        report['results'] = bench_jobs(repo, args.jobs, args.backends)
+        for result in report['results']:
+            print(f"{result['backend']:8} jobs {result['jobs']:3}  {result['seconds']:8.3f} s  "
+                  f"x{result['speedup']:.2f}", file=sys.stderr)
+    elif args.command == 'window':
+        repo = repo_path(args.work_dir, args.commits)
+        report.update(commits=args.commits, max_depth=args.max_depth)
+        report['results'] = bench_window(repo, args.max_depth)
+        for result in report['results']:
+            print(f"{result['variant']:22} walked {result['walked']:7}  nodes {result['nodes']:7}  "
+                  f"edges {result['edges']:7}  {result['seconds']:7.3f} s", file=sys.stderr)
+    elif args.command == 'parse':
+        repo = repo_path(args.work_dir, args.commits)
+        report.update(commits=args.commits)
+        report['results'] = bench_parse(repo, args.parses)
+        for mode, result in report['results'].items():
+            print(f"{mode:8} {result['us_per_commit']:7.2f} us/commit  {result['seconds']:7.2f} s "
+                  f"({result['parses']:,} parses of {result['distinct']:,} objects)", file=sys.stderr)
+    elif args.command == 'memory':
+        report['commits'] = args.commits
+        report['results'] = bench_memory(args.commits)
+        for name, result in report['results'].items():
+            print(f"{name:8} {result['bytes_per_commit']:8.1f} B/commit  "
+                  f"total {result['bytes'] / 2**20:8.1f} MiB  peak {result['peak'] / 2**20:8.1f} MiB  "
+                  f"{result['seconds']:6.2f} s", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Object reading through long-lived ``git cat-file --batch`` processes.
+
+Each process answers any number of requests over its pipes, returning type
+and content in one response, so a traversal pays for process start-up once
+instead of twice per object. Requests are pipelined: a batch of SHA1s is
+written before the responses are read back.
+"""
+
+import queue
+import subprocess
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+# Requests written before reading responses. Their total size (41 bytes each)
+# stays well below the pipe buffer, so writing never blocks while git waits
+# for us to drain its output.
+PIPELINE_DEPTH = 256
+
+DEFAULT_POOL_SIZE = 4
+
+
+class CatFileProcess:
+    """
+    A single ``git cat-file --batch`` process.
+
+    Not thread-safe; CatFilePool hands each process to one thread at a time.
+    """
+
+    def __init__(self, repo_path: str):
+        self.process = subprocess.Popen(
+            ['git', 'cat-file', '--batch'],
+            cwd=repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def read_many(self, sha1s: List[str]) -> List[Optional[Tuple[str, bytes]]]:
+        """
+        Reads several objects with pipelined requests.
+
+        Args:
+            sha1s: Hex SHA1s (or any names git accepts).
+
+        Returns:
+            (object type, raw content) for each request, None for missing objects.
+        """
+        results = []
+        for start in range(0, len(sha1s), PIPELINE_DEPTH):
+            chunk = sha1s[start:start + PIPELINE_DEPTH]
+            self.process.stdin.write(''.join(sha1 + '\n' for sha1 in chunk).encode('ascii'))
+            self.process.stdin.flush()
+            for _ in chunk:
+                results.append(self._read_response())
+        return results
+
+    def _read_response(self) -> Optional[Tuple[str, bytes]]:
+        """Parses one ``<sha> <type> <size>`` header and the content after it."""
+        stdout = self.process.stdout
+        header = stdout.readline()
+        if not header:
+            raise RuntimeError('git cat-file exited unexpectedly')
+        parts = header.split()
+        if len(parts) != 3:
+            # "<name> missing" or "<name> ambiguous"
+            return None
+        size = int(parts[2])
+        content = stdout.read(size)
+        stdout.read(1)  # newline after the content
+        return parts[1].decode('ascii'), content
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+        self.process.stdout.close()
+
+
+class CatFilePool:
+    """
+    A pool of ``git cat-file --batch`` processes for one repository.
+
+    Processes start on demand, up to ``size``; a thread takes an idle process
+    for the duration of a request, so concurrent traversal threads never
+    share a pipe.
+
+    Attributes:
+        repo_path: Path to the Git repository.
+        size: Maximum number of processes.
+    """
+
+    def __init__(self, repo_path: str, size: int = DEFAULT_POOL_SIZE):
+        self.repo_path = repo_path
+        self.size = size
+        self._idle: 'queue.LifoQueue[CatFileProcess]' = queue.LifoQueue()
+        self._processes: List[CatFileProcess] = []
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> CatFileProcess:
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                if len(self._processes) < self.size:
+                    process = CatFileProcess(self.repo_path)
+                    self._processes.append(process)
+                    return process
+            try:
+                # Timeout: a failed process may have freed a slot meanwhile
+                return self._idle.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def read_many(self, sha1s: Iterable[str]) -> List[Optional[Tuple[str, bytes]]]:
+        """
+        Reads several objects over one process.
+
+        Args:
+            sha1s: Hex SHA1s of the objects.
+
+        Returns:
+            (object type, raw content) for each object, None for missing ones.
+        """
+        process = self._acquire()
+        try:
+            results = process.read_many(list(sha1s))
+        except Exception:
+            # The pipe is out of sync after a failure: drop the process
+            with self._lock:
+                self._processes.remove(process)
+            process.close()
+            raise
+        self._idle.put(process)
+        return results
+
+    def read(self, sha1: str) -> Tuple[str, bytes]:
+        """
+        Reads an object.
+
+        Args:
+            sha1: Hex SHA1 of the object.
+
+        Returns:
+            (object type, raw content).
+        """
+        result = self.read_many([sha1])[0]
+        if result is None:
+            raise FileNotFoundError(f"Object '{sha1}' not found.")
+        return result
+
+    def close(self) -> None:
+        """Stops all processes."""
+        with self._lock:
+            processes, self._processes = self._processes, []
+        for process in processes:
+            process.close()
+        self._idle = queue.LifoQueue()
@@ -0,0 +1,224 @@
+"""
+Reader for Git's commit-graph file (``objects/info/commit-graph``).
+
+The file stores, for every commit, its parents (as positions in a sorted
+SHA1 table) and its commit time, so a traversal can follow history without
+inflating and parsing commit objects. Both a single file and a split chain
+(``objects/info/commit-graphs/commit-graph-chain``) are supported.
+"""
+
+import mmap
+import os
+import struct
+from typing import List, Optional
+
+from objectstore import find_common_dir, find_git_dir
+
+SIGNATURE = b'CGPH'
+CHUNK_OID_FANOUT = b'OIDF'
+CHUNK_OID_LOOKUP = b'OIDL'
+CHUNK_COMMIT_DATA = b'CDAT'
+CHUNK_EXTRA_EDGES = b'EDGE'
+CHUNK_BASE_GRAPHS = b'BASE'
+
+HASH_LEN = 20
+COMMIT_DATA_LEN = HASH_LEN + 16
+
+# Parent slot values in CDAT
+PARENT_NONE = 0x70000000
+PARENT_EXTRA_EDGES = 0x80000000
+EDGE_LAST = 0x80000000
+
+
+class _GraphFile:
+    """One memory-mapped commit-graph file (a single graph or one layer of a chain)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        signature, version, hash_version, chunk_count, self.base_count = \
+            struct.unpack_from('>4sBBBB', self.data, 0)
+        if signature != SIGNATURE or version != 1 or hash_version != 1:
+            self.data.close()
+            raise ValueError(f"Unsupported commit-graph file: {path}")
+        chunks = {}
+        for i in range(chunk_count + 1):
+            chunk_id, offset = struct.unpack_from('>4sQ', self.data, 8 + i * 12)
+            chunks[chunk_id] = offset
+        for required in (CHUNK_OID_FANOUT, CHUNK_OID_LOOKUP, CHUNK_COMMIT_DATA):
+            if required not in chunks:
+                self.data.close()
+                raise ValueError(f"Commit-graph chunk {required.decode()} missing: {path}")
+        self.fanout = struct.unpack_from('>256I', self.data, chunks[CHUNK_OID_FANOUT])
+        self.count = self.fanout[255]
+        self.oids = chunks[CHUNK_OID_LOOKUP]
+        self.commit_data = chunks[CHUNK_COMMIT_DATA]
+        self.extra_edges = chunks.get(CHUNK_EXTRA_EDGES)
+        # Global position of this file's first commit (set for chain layers)
+        self.offset = 0
+
+    def find(self, sha: bytes) -> Optional[int]:
+        """Binary search in the OID table; returns the local position."""
+        first = sha[0]
+        lo = self.fanout[first - 1] if first else 0
+        hi = self.fanout[first]
+        data = self.data
+        oids = self.oids
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = oids + mid * HASH_LEN
+            current = data[start:start + HASH_LEN]
+            if current < sha:
+                lo = mid + 1
+            elif current > sha:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def close(self) -> None:
+        self.data.close()
+
+
+class CommitGraph:
+    """
+    Commit topology and commit times from the commit-graph file(s).
+
+    Commits are addressed by global positions: layers of a split chain are
+    concatenated, base layer first, exactly as Git numbers them.
+
+    Attributes:
+        count: Total number of commits in the graph.
+    """
+
+    def __init__(self, files: List[_GraphFile]):
+        self._files = files
+        offset = 0
+        for graph_file in files:
+            graph_file.offset = offset
+            offset += graph_file.count
+        self.count = offset
+
+    def _file_at(self, position: int) -> _GraphFile:
+        for graph_file in self._files:
+            if position < graph_file.offset + graph_file.count:
+                return graph_file
+        raise IndexError(position)
+
+    def lookup(self, sha1: str) -> Optional[int]:
+        """
+        Finds a commit.
+
+        Args:
+            sha1: Hex SHA1 of the commit.
+
+        Returns:
+            The commit's position, or None if the graph does not contain it.
+        """
+        sha = bytes.fromhex(sha1)
+        for graph_file in self._files:
+            local = graph_file.find(sha)
+            if local is not None:
+                return graph_file.offset + local
+        return None
+
+    def sha1_at(self, position: int) -> str:
+        """Returns the hex SHA1 of the commit at a position."""
+        graph_file = self._file_at(position)
+        start = graph_file.oids + (position - graph_file.offset) * HASH_LEN
+        return graph_file.data[start:start + HASH_LEN].hex()
+
+    def _commit_data(self, position: int):
+        graph_file = self._file_at(position)
+        start = graph_file.commit_data + (position - graph_file.offset) * COMMIT_DATA_LEN
+        return graph_file, struct.unpack_from('>IIII', graph_file.data, start + HASH_LEN)
+
+    def parents(self, position: int) -> List[int]:
+        """
+        Returns the parent positions of a commit in order.
+
+        Args:
+            position: Position of the commit.
+
+        Returns:
+            Positions of its parents.
+        """
+        graph_file, (first, second, _, _) = self._commit_data(position)
+        parents = []
+        if first == PARENT_NONE:
+            return parents
+        parents.append(first)
+        if second == PARENT_NONE:
+            return parents
+        if not second & PARENT_EXTRA_EDGES:
+            parents.append(second)
+            return parents
+        # Octopus merge: the remaining parents are listed in the EDGE chunk
+        if graph_file.extra_edges is None:
+            raise ValueError(f"Commit-graph EDGE chunk missing: {graph_file.path}")
+        index = second & ~PARENT_EXTRA_EDGES
+        while True:
+            edge, = struct.unpack_from('>I', graph_file.data, graph_file.extra_edges + index * 4)
+            parents.append(edge & ~EDGE_LAST)
+            if edge & EDGE_LAST:
+                return parents
+            index += 1
+
+    def tree(self, position: int) -> str:
+        """Returns the hex SHA1 of the commit's root tree."""
+        graph_file = self._file_at(position)
+        start = graph_file.commit_data + (position - graph_file.offset) * COMMIT_DATA_LEN
+        return graph_file.data[start:start + HASH_LEN].hex()
+
+    def commit_time(self, position: int) -> int:
+        """Returns the committer timestamp (seconds since the epoch, UTC)."""
+        _, (_, _, high, low) = self._commit_data(position)
+        return ((high & 0x3) << 32) | low
+
+    def close(self) -> None:
+        for graph_file in self._files:
+            graph_file.close()
+        self._files = []
+
+
+def open_commit_graph(repo_path: str) -> Optional[CommitGraph]:
+    """
+    Opens the commit-graph of a repository.
+
+    As in Git, the graph is ignored when grafts, a shallow clone or replace
+    refs could make it disagree with the commit objects.
+
+    Args:
+        repo_path: Path to the Git repository.
+
+    Returns:
+        A CommitGraph, or None if the repository has no usable commit-graph.
+    """
+    common_dir = find_common_dir(find_git_dir(repo_path))
+    info = os.path.join(common_dir, 'objects', 'info')
+    replace = os.path.join(common_dir, 'refs', 'replace')
+    if os.path.exists(os.path.join(info, 'grafts')) or \
+            os.path.exists(os.path.join(common_dir, 'shallow')) or \
+            (os.path.isdir(replace) and os.listdir(replace)):
+        return None
+
+    files = []
+    try:
+        single = os.path.join(info, 'commit-graph')
+        if os.path.isfile(single):
+            files.append(_GraphFile(single))
+        else:
+            chain = os.path.join(info, 'commit-graphs', 'commit-graph-chain')
+            if not os.path.isfile(chain):
+                return None
+            with open(chain, 'r') as f:
+                hashes = [line.strip() for line in f if line.strip()]
+            for graph_hash in hashes:
+                files.append(_GraphFile(os.path.join(info, 'commit-graphs', f'graph-{graph_hash}.graph')))
+    except (OSError, ValueError, struct.error):
+        # Unreadable or unsupported graph: traverse through the objects instead
+        for graph_file in files:
+            graph_file.close()
+        return None
+    return CommitGraph(files)
@@ -0,0 +1,352 @@
+"""
+Compact, array-backed storage for a commit graph.
+
+A ``Dict[str, CommitNode]`` costs several hundred bytes per commit: a hex
+key, a node object with its own dict, strings for author, date and message
+and a list of parent strings. CompactGraph interns every SHA1 to an integer
+id and keeps one row per commit in flat arrays:
+
+* 20-byte binary SHA1s of commits and root trees in bytearrays;
+* parents in CSR form (``array('I')`` offsets and edges of parent ids);
+* commit and author timestamps as int64, author UTC offsets as int16;
+* authors interned (a repository has far fewer authors than commits);
+* messages UTF-8 encoded in one blob.
+
+The graph is a read-only Mapping from hex SHA1 to a CommitView, which has
+the same attributes as CommitNode, so DotWriter, generate_dot and the graph
+cache work on either.
+"""
+
+from array import array
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from dates import format_date
+from graphcache import CommitRow
+
+HASH_LEN = 20
+
+# Sentinels in the per-commit arrays
+NO_TIME = -(1 << 63)
+NO_AUTHOR = 0xFFFFFFFF
+NO_ROW = 0xFFFFFFFF
+NO_TREE = bytes(HASH_LEN)
+
+
+class CommitView:
+    """
+    A commit of a CompactGraph, with the attributes of CommitNode.
+
+    Views are created on access and hold only the graph and an id; fields
+    are read from the graph's arrays.
+    """
+
+    __slots__ = ('_graph', '_id')
+
+    def __init__(self, graph: 'CompactGraph', commit_id: int):
+        self._graph = graph
+        self._id = commit_id
+
+    @property
+    def sha1(self) -> str:
+        return self._graph.sha1_of(self._id)
+
+    @property
+    def parents(self) -> List[str]:
+        graph = self._graph
+        return [graph.sha1_of(parent) for parent in graph.parent_ids(self._id)]
+
+    @property
+    def tree(self) -> Optional[str]:
+        """SHA1 of the root tree, or None if it was not known when the commit was added."""
+        return self._graph._tree(self._id)
+
+    @property
+    def commit_time(self) -> Optional[int]:
+        commit_time = self._graph._commit_times[self._id]
+        return None if commit_time == NO_TIME else commit_time
+
+    @property
+    def loaded(self) -> bool:
+        """Whether author, date and message are known without reading the object."""
+        return self._graph._author_ids[self._id] != NO_AUTHOR
+
+    @property
+    def author(self) -> str:
+        return self._graph._author(self._id)
+
+    @property
+    def author_time(self) -> Optional[int]:
+        graph = self._graph
+        graph._ensure_loaded(self._id)
+        author_time = graph._author_times[self._id]
+        return None if author_time == NO_TIME else author_time
+
+    @property
+    def author_tz(self) -> Optional[int]:
+        return self._graph._author_tzs[self._id] if self.author_time is not None else None
+
+    @property
+    def date(self) -> str:
+        return self._graph._date(self._id)
+
+    @property
+    def message(self) -> str:
+        return self._graph._message(self._id)
+
+    def to_row(self) -> CommitRow:
+        """
+        Returns the commit as a graph cache row without loading lazy fields.
+        """
+        graph, commit_id = self._graph, self._id
+        if self.loaded and graph._author_times[commit_id] != NO_TIME:
+            return (self.sha1, self.parents, self.commit_time, self.author,
+                    graph._author_times[commit_id], graph._author_tzs[commit_id], self.message)
+        return self.sha1, self.parents, self.commit_time, None, None, None, None
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CommitView) and other._graph is self._graph and other._id == self._id
+
+    def __hash__(self) -> int:
+        return hash((id(self._graph), self._id))
+
+    def __repr__(self) -> str:
+        return f'CommitView({self.sha1!r})'
+
+
+class CompactGraph(Mapping):
+    """
+    Commit graph in flat arrays, mapping hex SHA1 to CommitView.
+
+    Commits are iterated in the order they were added. A parent that was
+    never added (outside a depth-limited walk, or not read yet) still gets an
+    id, so edges to it are kept, but it is not part of the mapping.
+
+    Lookups use a dict from binary SHA1 to id while the graph is built;
+    freeze() replaces it with a sorted id array searched by bisection, which
+    costs 4 bytes per commit instead of about a hundred.
+    """
+
+    def __init__(self, load: Optional[Callable[[str], object]] = None):
+        """
+        Args:
+            load: Function returning a fully parsed commit (CommitNode) for a
+                SHA1; used to fill commits added without author and message.
+        """
+        self.load = load
+        # Per id: every SHA1 seen, as a commit or as a parent
+        self._shas = bytearray()
+        self._trees = bytearray()
+        self._rows = array('I')
+        self._commit_times = array('q')
+        self._author_ids = array('I')
+        self._author_times = array('q')
+        self._author_tzs = array('h')
+        self._message_starts = array('Q')
+        self._message_lengths = array('I')
+        self._messages = bytearray()
+        # Per row (added commit), in the order of adding: its id and parents in CSR form
+        self._row_ids = array('I')
+        self._offsets = array('I', [0])
+        self._edges = array('I')
+        self._authors: List[str] = []
+        self._author_index: Dict[str, int] = {}
+        # Dates of commits that have no author timestamp (formatted elsewhere)
+        self._dates: Dict[int, str] = {}
+        self._index: Optional[Dict[bytes, int]] = {}
+        self._order: Optional[array] = None
+
+    @classmethod
+    def from_nodes(cls, nodes, load: Optional[Callable[[str], object]] = None) -> 'CompactGraph':
+        """
+        Builds a frozen graph.
+
+        Args:
+            nodes: CommitNode (or CommitView) instances, each commit once.
+            load: See __init__.
+
+        Returns:
+            A CompactGraph instance.
+        """
+        graph = cls(load)
+        for node in nodes:
+            graph.add(node)
+        graph.freeze()
+        return graph
+
+    def _intern(self, sha: bytes) -> int:
+        """Returns the id of a binary SHA1, assigning a new one if needed."""
+        index = self._index
+        if index is None:
+            raise ValueError('CompactGraph is frozen.')
+        commit_id = index.get(sha)
+        if commit_id is None:
+            commit_id = index[sha] = len(self._rows)
+            self._shas += sha
+            self._trees += NO_TREE
+            self._rows.append(NO_ROW)
+            self._commit_times.append(NO_TIME)
+            self._author_ids.append(NO_AUTHOR)
+            self._author_times.append(NO_TIME)
+            self._author_tzs.append(0)
+            self._message_starts.append(0)
+            self._message_lengths.append(0)
+        return commit_id
+
+    def add(self, node) -> CommitView:
+        """
+        Adds a commit.
+
+        A node that is not loaded stays lazy when the graph has a loader;
+        without one its fields are read now.
+
+        Args:
+            node: A CommitNode or CommitView.
+
+        Returns:
+            The view of the added commit.
+        """
+        intern, edges = self._intern, self._edges
+        commit_id = intern(bytes.fromhex(node.sha1))
+        if self._rows[commit_id] != NO_ROW:
+            raise ValueError(f"Commit '{node.sha1}' is already in the graph.")
+        self._rows[commit_id] = len(self._row_ids)
+        self._row_ids.append(commit_id)
+        edges.extend([intern(bytes.fromhex(parent)) for parent in node.parents])
+        self._offsets.append(len(edges))
+        if node.commit_time is not None:
+            self._commit_times[commit_id] = node.commit_time
+        self._set_tree(commit_id, node.tree)
+        if node.loaded or self.load is None:
+            self._set_fields(commit_id, node)
+        return CommitView(self, commit_id)
+
+    def _set_fields(self, commit_id: int, node) -> None:
+        """Stores author, date and message of a commit."""
+        author = node.author
+        author_id = self._author_index.get(author)
+        if author_id is None:
+            author_id = self._author_index[author] = len(self._authors)
+            self._authors.append(author)
+        if node.author_time is not None:
+            self._author_times[commit_id] = node.author_time
+            self._author_tzs[commit_id] = node.author_tz
+        else:
+            self._dates[commit_id] = node.date
+        message = node.message.encode('utf-8')
+        self._message_starts[commit_id] = len(self._messages)
+        self._message_lengths[commit_id] = len(message)
+        self._messages += message
+        self._author_ids[commit_id] = author_id
+        if self._tree(commit_id) is None:
+            self._set_tree(commit_id, node.tree)
+
+    def _set_tree(self, commit_id: int, tree: Optional[str]) -> None:
+        if tree is not None:
+            self._trees[commit_id * HASH_LEN:(commit_id + 1) * HASH_LEN] = bytes.fromhex(tree)
+
+    def _tree(self, commit_id: int) -> Optional[str]:
+        tree = self._trees[commit_id * HASH_LEN:(commit_id + 1) * HASH_LEN]
+        return None if tree == NO_TREE else tree.hex()
+
+    def _ensure_loaded(self, commit_id: int) -> None:
+        if self._author_ids[commit_id] == NO_AUTHOR:
+            self._set_fields(commit_id, self.load(self.sha1_of(commit_id)))
+
+    def _author(self, commit_id: int) -> str:
+        self._ensure_loaded(commit_id)
+        return self._authors[self._author_ids[commit_id]]
+
+    def _date(self, commit_id: int) -> str:
+        self._ensure_loaded(commit_id)
+        author_time = self._author_times[commit_id]
+        if author_time == NO_TIME:
+            return self._dates.get(commit_id, '')
+        return format_date(author_time, self._author_tzs[commit_id])
+
+    def _message(self, commit_id: int) -> str:
+        self._ensure_loaded(commit_id)
+        start = self._message_starts[commit_id]
+        return self._messages[start:start + self._message_lengths[commit_id]].decode('utf-8')
+
+    def freeze(self) -> None:
+        """
+        Drops the SHA1 dict in favour of a sorted id array; no commits can be added after.
+        """
+        index = self._index
+        if index is None:
+            return
+        # Sorting the dict's own keys creates no new bytes objects
+        self._order = array('I', map(index.__getitem__, sorted(index)))
+        self._index = None
+
+    def id_of(self, sha1: str) -> Optional[int]:
+        """
+        Finds the id of a SHA1 (an added commit or a parent).
+
+        Args:
+            sha1: Hex SHA1.
+
+        Returns:
+            The id, or None if the SHA1 is unknown.
+        """
+        try:
+            sha = bytes.fromhex(sha1)
+        except ValueError:
+            return None
+        if self._index is not None:
+            return self._index.get(sha)
+        shas, order = self._shas, self._order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            commit_id = order[mid]
+            current = shas[commit_id * HASH_LEN:(commit_id + 1) * HASH_LEN]
+            if current < sha:
+                lo = mid + 1
+            elif current > sha:
+                hi = mid
+            else:
+                return commit_id
+        return None
+
+    def sha1_of(self, commit_id: int) -> str:
+        """Returns the hex SHA1 of an id."""
+        return self._shas[commit_id * HASH_LEN:(commit_id + 1) * HASH_LEN].hex()
+
+    def parent_ids(self, commit_id: int) -> array:
+        """Returns the parent ids of an added commit in order."""
+        row = self._rows[commit_id]
+        return self._edges[self._offsets[row]:self._offsets[row + 1]]
+
+    def __getitem__(self, sha1: str) -> CommitView:
+        commit_id = self.id_of(sha1) if isinstance(sha1, str) else None
+        if commit_id is None or self._rows[commit_id] == NO_ROW:
+            raise KeyError(sha1)
+        return CommitView(self, commit_id)
+
+    def __iter__(self) -> Iterator[str]:
+        for commit_id in self._row_ids:
+            yield self.sha1_of(commit_id)
+
+    def __len__(self) -> int:
+        return len(self._row_ids)
+
+    def values(self) -> Iterator[CommitView]:
+        for commit_id in self._row_ids:
+            yield CommitView(self, commit_id)
+
+    def items(self) -> Iterator[Tuple[str, CommitView]]:
+        for commit_id in self._row_ids:
+            yield self.sha1_of(commit_id), CommitView(self, commit_id)
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by the arrays, blobs and interned authors
+        (without the build-time SHA1 dict).
+        """
+        arrays = (self._rows, self._commit_times, self._author_ids, self._author_times, self._author_tzs,
+                  self._message_starts, self._message_lengths, self._row_ids, self._offsets, self._edges)
+        size = len(self._shas) + len(self._trees) + len(self._messages) + sum(a.itemsize * len(a) for a in arrays)
+        if self._order is not None:
+            size += self._order.itemsize * len(self._order)
+        return size + sum(len(author) for author in self._authors)
@@ -11,12 +11,58 @@ Usage:
     python git_graph_visualizer.py /path/to/config.xml
 """
 
+import io
 import os
+import re
+import atexit
 import argparse
 import subprocess
+import threading
 import xml.etree.ElementTree as ET
-from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Set
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, IO, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, Union
+
+from catfile import CatFilePool
+from commitgraph import open_commit_graph
+from compactgraph import CompactGraph
+from dates import format_date, parse_date, parse_tz
+from graphcache import CommitRow, GraphCache, default_cache_path
+from objectstore import ObjectStore
+from refs import RefResolver
+from trees import TreeReader, split_path
+
+# Object backends: native reader, pool of `git cat-file --batch`, two `git cat-file` runs per object
+OBJECT_BACKENDS = ('native', 'batch', 'subprocess')
+DEFAULT_OBJECT_BACKEND = 'native'
+
+# Batches of object reads queued per worker thread in a parallel traversal
+PARALLEL_QUEUE_FACTOR = 4
+PARALLEL_BATCH_SIZE = 64
+
+# Shortest run of linear commits replaced by one node when simplifying
+DEFAULT_MIN_CHAIN = 2
+
+# Write buffer of the DOT file
+DOT_BUFFER_SIZE = 1 << 20
+
+# Nodes collected before one write to the DOT stream
+DOT_WRITE_BATCH = 256
+
+# Characters that need escaping inside a double-quoted DOT string
+_DOT_SPECIAL = re.compile(r'[\\"\r\n]')
+
+# Fields a node label can show; 'commit_date' comes from the commit-graph file
+# when available and needs no object reads
+LABEL_FIELDS = ('sha', 'author', 'date', 'commit_date', 'message')
+DEFAULT_LABEL_FIELDS = ('sha', 'author', 'date')
+
+# Open object readers by (absolute repository path, backend)
+_object_readers: Dict[Tuple[str, str], Union[ObjectStore, CatFilePool]] = {}
+_object_readers_lock = threading.Lock()
+
+# Ref resolvers by (absolute repository path, backend); packed-refs is parsed once per resolver
+_ref_resolvers: Dict[Tuple[str, str], RefResolver] = {}
 
 class GitObject:
     """Class representing a Git object."""
@@ -24,17 +70,110 @@ class GitObject:
     def __init__(self, sha1: str, obj_type: str, content: bytes):
         self.sha1 = sha1
         self.type = obj_type
-        self.content = content.decode('utf-8', errors='replace')
+        self.data = content
+
+    @property
+    def content(self) -> str:
+        """The object as text (invalid UTF-8 replaced); parsers work on ``data``."""
+        return self.data.decode('utf-8', errors='replace')
 
 class CommitNode:
-    """Class representing a commit in the dependency graph."""
+    """
+    Class representing a commit in the dependency graph.
+
+    Nodes built from the commit-graph file carry only parents and commit
+    time; author, date and message are read from the commit object on first
+    access.
+    """
 
-    def __init__(self, sha1: str, author: str, date: str, message: str, parents: List[str]):
+    def __init__(self, sha1: str, author: str, date: Optional[str], message: str, parents: List[str],
+                 commit_time: Optional[int] = None, author_time: Optional[int] = None,
+                 author_tz: Optional[int] = None, tree: Optional[str] = None):
+        """
+        Args:
+            sha1: SHA1 of the commit.
+            author: "Name <email>".
+            date: Formatted author date; None to format it from author_time on access.
+            message: Commit message, or its raw bytes, decoded on first access.
+            parents: SHA1s of the parents.
+            commit_time: Committer timestamp.
+            author_time: Author timestamp.
+            author_tz: Author's UTC offset in minutes.
+            tree: SHA1 of the root tree, if known.
+        """
         self.sha1 = sha1
-        self.author = author
-        self.date = date
-        self.message = message
+        self._author = author
+        self._date = date
+        self._message = message
         self.parents = parents
+        self.commit_time = commit_time
+        self.author_time = author_time
+        self.author_tz = author_tz
+        self.tree = tree
+        self._load: Optional[Callable[[str], 'CommitNode']] = None
+
+    @classmethod
+    def lazy(cls, sha1: str, parents: List[str], commit_time: int,
+             load: Callable[[str], 'CommitNode'], tree: Optional[str] = None) -> 'CommitNode':
+        """
+        Creates a node whose author, date and message are loaded on demand.
+
+        Args:
+            sha1: SHA1 of the commit.
+            parents: SHA1s of the parents.
+            commit_time: Committer timestamp.
+            load: Function returning the fully parsed node for a SHA1.
+            tree: SHA1 of the root tree, if known.
+
+        Returns:
+            A CommitNode instance.
+        """
+        node = cls(sha1, '', '', '', parents, commit_time, tree=tree)
+        node._load = load
+        return node
+
+    def _fill(self) -> None:
+        full = self._load(self.sha1)
+        self._author, self._date, self._message = full.author, full.date, full.message
+        self.author_time, self.author_tz = full.author_time, full.author_tz
+        self.tree = self.tree or full.tree
+        self._load = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether author, date and message are known without reading the object."""
+        return self._load is None
+
+    def to_row(self) -> CommitRow:
+        """
+        Returns the node as a cache row without loading lazy fields.
+        """
+        if self.loaded and self.author_time is not None:
+            return (self.sha1, self.parents, self.commit_time, self._author,
+                    self.author_time, self.author_tz, self.message)
+        return self.sha1, self.parents, self.commit_time, None, None, None, None
+
+    @property
+    def author(self) -> str:
+        if self._load is not None:
+            self._fill()
+        return self._author
+
+    @property
+    def date(self) -> str:
+        if self._load is not None:
+            self._fill()
+        if self._date is None:
+            self._date = format_date(self.author_time, self.author_tz) if self.author_time is not None else ''
+        return self._date
+
+    @property
+    def message(self) -> str:
+        if self._load is not None:
+            self._fill()
+        if isinstance(self._message, bytes):
+            self._message = self._message.decode('utf-8', errors='replace').strip()
+        return self._message
 
 def parse_config(config_path: str) -> Dict[str, str]:
     """
@@ -52,47 +191,196 @@ def parse_config(config_path: str) -> Dict[str, str]:
         'graphviz_path': root.find('graphviz_path').text.strip(),
         'repo_path': root.find('repo_path').text.strip(),
         'output_path': root.find('output_path').text.strip(),
-        'tag_name': root.find('tag_name').text.strip(),
+        'tag_name': (root.findtext('tag_name') or '').strip(),
+        'refs': (root.findtext('refs') or '').split(),
+        'object_backend': (root.findtext('object_backend') or DEFAULT_OBJECT_BACKEND).strip(),
     }
+    if not config['tag_name'] and not config['refs']:
+        raise ValueError('Either tag_name or refs must be set.')
+    if config['object_backend'] not in OBJECT_BACKENDS:
+        raise ValueError(f"Unknown object backend '{config['object_backend']}'.")
+    config['label_fields'] = parse_label_fields(root.findtext('label') or ','.join(DEFAULT_LABEL_FIELDS))
+    config['cache_path'] = (root.findtext('cache_path') or '').strip() or default_cache_path()
+    max_depth = (root.findtext('max_depth') or '').strip()
+    config['max_depth'] = int(max_depth) if max_depth else None
+    since = (root.findtext('since') or '').strip()
+    config['since'] = parse_date(since) if since else None
+    config['first_parent'] = _parse_flag(root.findtext('first_parent'))
+    config['paths'] = (root.findtext('paths') or '').split()
+    config['simplify'] = _parse_flag(root.findtext('simplify'))
     return config
 
-def get_tag_commit_sha1(repo_path: str, tag_name: str) -> str:
+
+def _parse_flag(value: Optional[str]) -> bool:
+    return (value or '').strip().lower() in ('1', 'true', 'yes')
+
+
+def parse_label_fields(value: str) -> Tuple[str, ...]:
+    """
+    Parses a comma-separated list of label fields.
+
+    Args:
+        value: For example "sha,author,date".
+
+    Returns:
+        A tuple of field names from LABEL_FIELDS.
+    """
+    fields = tuple(field.strip() for field in value.split(',') if field.strip())
+    unknown = [field for field in fields if field not in LABEL_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown label fields: {', '.join(unknown) or value!r}.")
+    return fields
+
+def get_ref_resolver(repo_path: str, backend: str = DEFAULT_OBJECT_BACKEND) -> RefResolver:
+    """
+    Returns the ref resolver of a repository, creating it on first use.
+
+    Args:
+        repo_path: Path to the Git repository.
+        backend: Object backend used to peel tags that packed-refs does not peel.
+
+    Returns:
+        A RefResolver instance.
+    """
+    path = os.path.abspath(repo_path)
+    # Функция чтения привязана к бэкенду, поэтому у каждого бэкенда свой резолвер
+    key = (path, backend)
+    with _object_readers_lock:
+        resolver = _ref_resolvers.get(key)
+    if resolver is None:
+        def read(sha1: str) -> Tuple[str, bytes]:
+            if backend == 'subprocess':
+                obj = read_object_subprocess(path, sha1)
+                return obj.type, obj.data
+            return get_object_reader(path, backend).read(sha1)
+        resolver = RefResolver(path, read)
+        with _object_readers_lock:
+            resolver = _ref_resolvers.setdefault(key, resolver)
+    return resolver
+
+
+def get_tag_commit_sha1(repo_path: str, tag_name: str, backend: str = DEFAULT_OBJECT_BACKEND) -> str:
     """
     Retrieves the SHA1 of the commit that the tag points to.
 
+    Loose and packed tags are supported; annotated tags are peeled to
+    their commit.
+
     Args:
         repo_path: Path to the Git repository.
         tag_name: Name of the tag.
+        backend: Object backend used for peeling.
 
     Returns:
         The SHA1 hash of the commit.
     """
-    tag_path = os.path.join(repo_path, '.git', 'refs', 'tags', tag_name)
-    if not os.path.exists(tag_path):
+    resolver = get_ref_resolver(repo_path, backend)
+    full_name = f'refs/tags/{tag_name}'
+    sha1 = resolver.read_ref(full_name)
+    if sha1 is None:
         raise FileNotFoundError(f"Tag '{tag_name}' not found.")
-    with open(tag_path, 'r') as f:
-        sha1 = f.read().strip()
-    return sha1
+    return resolver.peel(full_name, sha1)
+
 
-def read_object(repo_path: str, sha1: str) -> GitObject:
+def resolve_start_commits(repo_path: str, names: Sequence[str],
+                          backend: str = DEFAULT_OBJECT_BACKEND) -> List[str]:
     """
-    Reads a Git object from the repository using git cat-file.
+    Resolves start points for a traversal.
+
+    Args:
+        repo_path: Path to the Git repository.
+        names: Tags, branches, other refs, HEAD or SHA1s, short names as in git rev-parse.
+        backend: Object backend used for peeling.
+
+    Returns:
+        Commit SHA1s in the given order, without duplicates.
+    """
+    resolver = get_ref_resolver(repo_path, backend)
+    commits = []
+    for name in names:
+        sha1 = resolver.resolve(name)
+        if sha1 not in commits:
+            commits.append(sha1)
+    return commits
+
+
+def get_object_reader(repo_path: str, backend: str = DEFAULT_OBJECT_BACKEND) -> Union[ObjectStore, CatFilePool]:
+    """
+    Returns the object reader of a repository, opening it on first use.
+
+    Args:
+        repo_path: Path to the Git repository.
+        backend: 'native' or 'batch'.
+
+    Returns:
+        An ObjectStore or CatFilePool shared by all reads from this repository.
+    """
+    key = (os.path.abspath(repo_path), backend)
+    with _object_readers_lock:
+        reader = _object_readers.get(key)
+        if reader is None:
+            if backend == 'native':
+                reader = ObjectStore(key[0])
+            elif backend == 'batch':
+                reader = CatFilePool(key[0])
+            else:
+                raise ValueError(f"Unknown object backend '{backend}'.")
+            _object_readers[key] = reader
+        return reader
+
+
+def close_object_readers() -> None:
+    """
+    Closes all open object readers (unmaps packs, stops git processes).
+    """
+    with _object_readers_lock:
+        readers = list(_object_readers.values())
+        _object_readers.clear()
+        _ref_resolvers.clear()
+    for reader in readers:
+        reader.close()
+
+
+atexit.register(close_object_readers)
+
+
+def read_object(repo_path: str, sha1: str, backend: str = DEFAULT_OBJECT_BACKEND) -> GitObject:
+    """
+    Reads a Git object.
 
     Args:
         repo_path: Path to the Git repository.
         sha1: SHA1 hash of the object.
+        backend: One of OBJECT_BACKENDS; 'native' reads loose objects and packs directly.
 
     Returns:
         A GitObject instance.
     """
-    import subprocess
+    if backend == 'subprocess':
+        return read_object_subprocess(repo_path, sha1)
+    obj_type, content = get_object_reader(repo_path, backend).read(sha1)
+    return GitObject(sha1, obj_type, content)
+
 
+def read_object_subprocess(repo_path: str, sha1: str) -> GitObject:
+    """
+    Reads a Git object from the repository using git cat-file.
+
+    Two processes per object; kept as a reference implementation for
+    repositories the native reader does not support.
+
+    Args:
+        repo_path: Path to the Git repository.
+        sha1: SHA1 hash of the object.
+
+    Returns:
+        A GitObject instance.
+    """
     result = subprocess.run(
         ['git', 'cat-file', '-p', sha1],
         cwd=repo_path,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
+        stderr=subprocess.PIPE
     )
 
     if result.returncode != 0:
@@ -109,104 +397,824 @@ def read_object(repo_path: str, sha1: str) -> GitObject:
 
     obj_type = type_result.stdout.strip()
 
-    return GitObject(sha1, obj_type, result.stdout.encode('utf-8'))
+    return GitObject(sha1, obj_type, result.stdout)
 
 
+def scan_commit_headers(data: bytes) -> Tuple[Optional[str], List[str], bytes, Optional[int],
+                                               Optional[int], Optional[int], int]:
+    """
+    Scans the header of a raw commit, stopping at the blank line before the message.
+
+    Header lines are matched as bytes; only the values that are used are
+    decoded. Git writes (and fsck requires) the headers in a fixed order:
+    tree, parents, author, committer, then optional ones such as gpgsig, so
+    the scan takes them in that order and stops after the committer. Text in
+    the message is never taken for a header.
+
+    Args:
+        data: Raw commit object.
+
+    Returns:
+        (tree, parents, author as raw "Name <email>", author time, author
+        UTC offset in minutes, commit time, offset of the message in data).
+    """
+    end = data.find(b'\n\n')
+    header, body = (data[:end], end + 2) if end >= 0 else (data, len(data))
+    lines = header.split(b'\n')
+    tree = None
+    parents = []
+    author = b''
+    author_time = author_tz = commit_time = None
+    i = 0
+    if lines[0][:5] == b'tree ':
+        tree = lines[0][5:].decode('ascii')
+        i = 1
+    while i < len(lines) and lines[i][:7] == b'parent ':
+        parents.append(lines[i][7:].decode('ascii'))
+        i += 1
+    for line in lines[i:]:
+        if line[:7] == b'author ':
+            # Формат: "Имя <email> timestamp timezone"
+            author, timestamp, tz = line[7:].rsplit(b' ', 2)
+            author_time = int(timestamp)
+            # Временная зона в минутах от UTC
+            author_tz = parse_tz(tz)
+        elif line[:10] == b'committer ':
+            commit_time = int(line.rsplit(b' ', 2)[1])
+            if author_time is not None:
+                break
+    return tree, parents, author, author_time, author_tz, commit_time, body
+
 
 def parse_commit(obj: GitObject) -> CommitNode:
     """
     Parses a Git commit object.
 
+    Only the header is parsed: the date is formatted and the message
+    decoded when first accessed.
+
     Args:
         obj: GitObject instance representing a commit.
 
     Returns:
         A CommitNode instance.
     """
-    lines = obj.content.split('\n')
-    parents = []
-    author = ''
-    date = ''
-    message = ''
-    in_message = False
-    for line in lines:
-        if line.startswith('parent '):
-            parents.append(line[7:])
-        elif line.startswith('author '):
-            author_info = line[7:]
-            # Разбиваем строку на части
-            # Формат: "Имя <email> timestamp timezone"
-            author_parts = author_info.rsplit(' ', 2)
-            author_name_email = author_parts[0]
-            timestamp = int(author_parts[1])
-            timezone_str = author_parts[2]
-            # Обработка временной зоны
-            tz_sign = 1 if timezone_str.startswith('+') else -1
-            tz_hours = int(timezone_str[1:3])
-            tz_minutes = int(timezone_str[3:5])
-            tz_offset = tz_sign * timedelta(hours=tz_hours, minutes=tz_minutes)
-            # Создаём объект datetime с учётом временной зоны
-            dt = datetime.fromtimestamp(timestamp, tz=timezone(tz_offset))
-            date_time = dt.strftime('%Y-%m-%d %H:%M:%S %z')
-            author = author_name_email
-            date = date_time
-        elif line == '':
-            in_message = True
-        elif in_message:
-            message += line + '\n'
-    return CommitNode(obj.sha1, author, date, message.strip(), parents)
-
-
-def build_commit_graph(repo_path: str, start_sha1: str) -> Dict[str, CommitNode]:
+    data = obj.data
+    tree, parents, author, author_time, author_tz, commit_time, body = scan_commit_headers(data)
+    return CommitNode(obj.sha1, author.decode('utf-8', errors='replace'), None, data[body:], parents,
+                      commit_time, author_time, author_tz, tree)
+
+
+def commit_loader(repo_path: str, backend: str = DEFAULT_OBJECT_BACKEND) -> Callable[[str], CommitNode]:
     """
-    Builds the commit graph starting from a specific commit.
+    Returns a function that reads and parses a commit, for lazy nodes.
 
     Args:
         repo_path: Path to the Git repository.
-        start_sha1: SHA1 of the starting commit.
+        backend: Object backend (see read_object).
+
+    Returns:
+        load(sha1) -> CommitNode.
+    """
+    def load(sha1: str) -> CommitNode:
+        return parse_commit(read_object(repo_path, sha1, backend))
+    return load
+
+
+class CachedCommits(Mapping):
+    """
+    Commits of one repository in the graph cache, read on demand.
+
+    Each lookup is a single indexed query, so a run reads only the cached
+    commits its walk reaches instead of the whole cached history. Iteration
+    covers the commits found so far.
+
+    Attributes:
+        lazy: SHA1s of found commits that were cached without author and message.
+    """
+
+    def __init__(self, cache: GraphCache, repo_path: str, backend: str = DEFAULT_OBJECT_BACKEND):
+        """
+        Args:
+            cache: The graph cache.
+            repo_path: Path to the Git repository.
+            backend: Object backend for commits cached without author and message.
+        """
+        self.cache = cache
+        self.repo_path = repo_path
+        self.load = commit_loader(repo_path, backend)
+        self.lazy: Set[str] = set()
+        self._found: Set[str] = set()
+        self._missing: Set[str] = set()
+
+    def __getitem__(self, sha1: str) -> CommitNode:
+        row = None if sha1 in self._missing else self.cache.row(self.repo_path, sha1)
+        if row is None:
+            self._missing.add(sha1)
+            raise KeyError(sha1)
+        sha1, parents, commit_time, author, author_time, author_tz, message = row
+        self._found.add(sha1)
+        if author is None:
+            self.lazy.add(sha1)
+            return CommitNode.lazy(sha1, parents, commit_time, self.load)
+        return CommitNode(sha1, author, None, message, parents, commit_time, author_time, author_tz)
+
+    def __contains__(self, sha1) -> bool:
+        if sha1 in self._found:
+            return True
+        return super().__contains__(sha1)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._found)
+
+    def __len__(self) -> int:
+        return len(self._found)
+
+
+def load_cached_graph(cache: GraphCache, repo_path: str,
+                      backend: str = DEFAULT_OBJECT_BACKEND) -> CachedCommits:
+    """
+    Opens the cached commits of a repository.
+
+    Args:
+        cache: The graph cache.
+        repo_path: Path to the Git repository.
+        backend: Object backend for commits cached without author and message.
+
+    Returns:
+        A CachedCommits mapping; commits are read from the cache when looked up.
+    """
+    return CachedCommits(cache, repo_path, backend)
+
+
+def update_graph_cache(cache: GraphCache, repo_path: str, graph: Mapping[str, CommitNode],
+                       cached: Mapping[str, CommitNode], cached_lazy: Set[str]) -> int:
+    """
+    Stores new commits, and cached ones whose object has been read since loading.
+
+    Args:
+        cache: The graph cache.
+        repo_path: Path to the Git repository.
+        graph: The commit graph of this run.
+        cached: Commits looked up in the cache during the run.
+        cached_lazy: SHA1s of cached commits that had no author and message.
+
+    Returns:
+        Number of commits written.
+    """
+    return cache.store(repo_path, (node.to_row() for sha1, node in graph.items()
+                                   if sha1 not in cached or (sha1 in cached_lazy and node.loaded)))
+
+
+def build_commit_graph(repo_path: str, start_sha1: Union[str, Sequence[str]],
+                       backend: str = DEFAULT_OBJECT_BACKEND,
+                       use_commit_graph: bool = True,
+                       known: Optional[Mapping[str, CommitNode]] = None,
+                       jobs: int = 1,
+                       max_depth: Optional[int] = None,
+                       since: Optional[int] = None,
+                       first_parent: bool = False) -> Dict[str, CommitNode]:
+    """
+    Builds the commit graph starting from a specific commit.
+
+    Collects walk_commit_graph; see it for the arguments.
 
     Returns:
         A dictionary mapping commit SHA1 to CommitNode.
     """
+    return {node.sha1: node for node in walk_commit_graph(repo_path, start_sha1, backend, use_commit_graph,
+                                                          known, jobs, max_depth, since, first_parent)}
+
+
+def walk_commit_graph(repo_path: str, start_sha1: Union[str, Sequence[str]],
+                      backend: str = DEFAULT_OBJECT_BACKEND,
+                      use_commit_graph: bool = True,
+                      known: Optional[Mapping[str, CommitNode]] = None,
+                      jobs: int = 1,
+                      max_depth: Optional[int] = None,
+                      since: Optional[int] = None,
+                      first_parent: bool = False) -> Iterator[CommitNode]:
+    """
+    Walks the commit graph depth-first from the start commits.
+
+    Nodes are yielded as soon as they are visited, so a consumer such as
+    DotWriter can emit output before the traversal finishes.
+
+    When the repository has a commit-graph file, parents and commit times
+    are taken from it and commit objects are read only when a node's author,
+    date or message is accessed. Commits missing from the file (newer than
+    its last write) are read from the object database. Commits in ``known``
+    (for example, loaded from the graph cache) are taken as they are.
+
+    With ``jobs`` > 1 object reads run in a thread pool (see
+    _fetch_parallel) and nodes are yielded once all are fetched, in the same
+    order as with the serial walk.
+
+    The limits stop the walk early instead of filtering a full history:
+    commits beyond ``max_depth`` or committed before ``since`` are not read.
+    With ``max_depth`` the walk is breadth-first, so each commit is reached
+    by its shortest path. Yielded nodes keep all their parents, including
+    ones outside the window; see window_graph.
+
+    Args:
+        repo_path: Path to the Git repository.
+        start_sha1: SHA1 of the starting commit, or several SHA1s walked as one graph.
+        backend: Object backend (see read_object).
+        use_commit_graph: Whether to use the commit-graph file if present.
+        known: Already parsed commits by SHA1.
+        jobs: Number of threads reading objects.
+        max_depth: Maximum number of edges from a start commit (0: the start commits only).
+        since: Skip commits with a commit time before this timestamp.
+        first_parent: Follow only the first parent of merges.
+
+    Yields:
+        CommitNode instances, each commit once.
+    """
+    commit_graph = open_commit_graph(repo_path) if use_commit_graph else None
+    load = commit_loader(repo_path, backend)
+    known = {} if known is None else known
+
+    def from_index(sha1: str, position: Optional[int]):
+        """Node from ``known`` or the commit-graph with its parents' positions, or None."""
+        commit_node = known.get(sha1)
+        if commit_node is not None:
+            return commit_node, [None] * len(commit_node.parents)
+        if commit_graph is not None and position is None:
+            position = commit_graph.lookup(sha1)
+        if position is None:
+            return None
+        parent_positions = commit_graph.parents(position)
+        parents = [commit_graph.sha1_at(p) for p in parent_positions]
+        return (CommitNode.lazy(sha1, parents, commit_graph.commit_time(position), load, commit_graph.tree(position)),
+                parent_positions)
+
+    def from_object(sha1: str) -> Optional[CommitNode]:
+        """Reads and parses a commit object; None for other object types."""
+        obj = read_object(repo_path, sha1, backend)
+        return parse_commit(obj) if obj.type == 'commit' else None
+
+    def from_objects(sha1s: List[str]) -> List[Optional[CommitNode]]:
+        """Reads several commits at once (pipelined for the batch backend)."""
+        if backend == 'subprocess':
+            return [from_object(sha1) for sha1 in sha1s]
+        nodes = []
+        for sha1, result in zip(sha1s, get_object_reader(repo_path, backend).read_many(sha1s)):
+            if result is None:
+                raise FileNotFoundError(f"Object '{sha1}' not found.")
+            obj = GitObject(sha1, *result)
+            nodes.append(parse_commit(obj) if obj.type == 'commit' else None)
+        return nodes
+
+    def follow(commit_node: CommitNode, parent_positions: List[Optional[int]],
+               depth: int) -> Optional[List[Tuple[str, Optional[int]]]]:
+        """Parents to walk next with their positions, or None if the commit is outside the window."""
+        if since is not None and commit_node.commit_time is not None and commit_node.commit_time < since:
+            return None
+        if max_depth is not None and depth >= max_depth:
+            return []
+        parents = list(zip(commit_node.parents, parent_positions))
+        return parents[:1] if first_parent else parents
+
+    starts = [start_sha1] if isinstance(start_sha1, str) else list(start_sha1)
+    try:
+        if jobs > 1:
+            if backend == 'batch':
+                # One cat-file process per thread
+                reader = get_object_reader(repo_path, backend)
+                reader.size = max(reader.size, jobs)
+            nodes = _fetch_parallel(starts, from_index, from_objects, follow, jobs, max_depth is not None)
+            yield from _serial_order(starts, nodes, max_depth, first_parent).values()
+            return
+
+        breadth_first = max_depth is not None
+        # (SHA1, position in the commit-graph if already known, depth)
+        stack: Deque[Tuple[str, Optional[int], int]] = deque(
+            (sha1, None, 0) for sha1 in (starts if breadth_first else reversed(starts)))
+        pop = stack.popleft if breadth_first else stack.pop
+        visited: Set[str] = set()
+        while stack:
+            sha1, position, depth = pop()
+            if sha1 in visited:
+                continue
+            visited.add(sha1)
+            found = from_index(sha1, position)
+            if found is not None:
+                commit_node, parent_positions = found
+            else:
+                commit_node = from_object(sha1)
+                if commit_node is None:
+                    continue
+                parent_positions = [None] * len(commit_node.parents)
+            parents = follow(commit_node, parent_positions, depth)
+            if parents is None:
+                continue
+            yield commit_node
+            stack.extend((parent, position, depth + 1) for parent, position in parents)
+    finally:
+        if commit_graph is not None:
+            commit_graph.close()
+
+
+def _fetch_parallel(starts: List[str], from_index, from_objects, follow, jobs: int,
+                    shortest: bool = False) -> Dict[str, Optional[CommitNode]]:
+    """
+    Fetches all commits reachable from the start points with a thread pool.
+
+    The calling thread is the coordinator: it alone owns the map of
+    discovered commits and the frontier, so neither needs a lock. Nodes
+    available without I/O (cache, commit-graph) are resolved inline; object
+    reads are submitted to the workers in batches of up to
+    PARALLEL_BATCH_SIZE commits, with at most PARALLEL_QUEUE_FACTOR * jobs
+    batches in flight.
+
+    Batches complete out of order, so a commit may first be reached by a
+    longer path. With ``shortest`` a commit found again at a smaller depth is
+    expanded again, which a depth limit needs.
+
+    Args:
+        starts: SHA1s of the start points.
+        from_index: from_index(sha1, position) -> (node, parent positions) or None.
+        from_objects: from_objects(sha1s) -> nodes (None for non-commits).
+        follow: follow(node, parent positions, depth) -> parents to walk, or None to skip the node.
+        jobs: Number of worker threads.
+        shortest: Whether depths must be the shortest distances from the start points.
+
+    Returns:
+        Every visited SHA1 mapped to its node (None for non-commits and skipped commits).
+    """
+    nodes: Dict[str, Optional[CommitNode]] = {}
+    # Smallest known depth of every discovered commit
+    depths: Dict[str, int] = dict.fromkeys(starts, 0)
+    frontier = deque((sha1, None, 0) for sha1 in starts)
+    in_flight = {}
+    reading: Set[str] = set()
+
+    def expand(sha1: str, commit_node: CommitNode, parent_positions: List[Optional[int]], depth: int) -> None:
+        parents = follow(commit_node, parent_positions, depth)
+        if parents is None:
+            nodes[sha1] = None
+            return
+        nodes[sha1] = commit_node
+        for parent, position in parents:
+            known_depth = depths.get(parent)
+            if known_depth is None or (shortest and depth + 1 < known_depth):
+                depths[parent] = depth + 1
+                frontier.append((parent, position, depth + 1))
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='graph-walk') as executor:
+        while frontier or in_flight:
+            while frontier and len(in_flight) < jobs * PARALLEL_QUEUE_FACTOR:
+                batch = []
+                # Spread a narrow frontier over the workers instead of one large batch
+                size = min(PARALLEL_BATCH_SIZE, len(frontier) // jobs + 1)
+                while frontier and len(batch) < size:
+                    sha1, position, depth = frontier.popleft()
+                    if depth > depths[sha1] or sha1 in reading:
+                        # Superseded by a shorter path, or the read in flight will use the new depth
+                        continue
+                    if sha1 in nodes:
+                        if nodes[sha1] is not None:
+                            expand(sha1, nodes[sha1], [None] * len(nodes[sha1].parents), depth)
+                        continue
+                    found = from_index(sha1, position)
+                    if found is not None:
+                        expand(sha1, *found, depth)
+                    else:
+                        batch.append(sha1)
+                if batch:
+                    in_flight[executor.submit(from_objects, batch)] = batch
+                    reading.update(batch)
+            if not in_flight:
+                continue
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                for sha1, commit_node in zip(in_flight.pop(future), future.result()):
+                    reading.discard(sha1)
+                    if commit_node is None:
+                        nodes[sha1] = None
+                    else:
+                        expand(sha1, commit_node, [None] * len(commit_node.parents), depths[sha1])
+    return nodes
+
+
+def _serial_order(starts: List[str], nodes: Dict[str, Optional[CommitNode]],
+                  max_depth: Optional[int] = None, first_parent: bool = False) -> Dict[str, CommitNode]:
+    """
+    Orders fetched nodes exactly as the serial walk would (breadth-first with a depth limit).
+    """
     graph = {}
-    stack = [start_sha1]
+    breadth_first = max_depth is not None
+    stack = deque((sha1, 0) for sha1 in (starts if breadth_first else reversed(starts)))
+    pop = stack.popleft if breadth_first else stack.pop
     visited: Set[str] = set()
     while stack:
-        sha1 = stack.pop()
+        sha1, depth = pop()
         if sha1 in visited:
             continue
         visited.add(sha1)
-        obj = read_object(repo_path, sha1)
-        if obj.type != 'commit':
+        commit_node = nodes.get(sha1)
+        if commit_node is None:
             continue
-        commit_node = parse_commit(obj)
         graph[sha1] = commit_node
-        stack.extend(commit_node.parents)
+        if breadth_first and depth >= max_depth:
+            continue
+        parents = commit_node.parents[:1] if first_parent else commit_node.parents
+        stack.extend((parent, depth + 1) for parent in parents)
     return graph
 
 
-def generate_dot(graph: Dict[str, CommitNode]) -> str:
+def read_tree_object(repo_path: str, sha1: str, backend: str = DEFAULT_OBJECT_BACKEND) -> bytes:
+    """
+    Reads the raw content of a tree object.
+
+    Args:
+        repo_path: Path to the Git repository.
+        sha1: SHA1 of the tree.
+        backend: Object backend (see read_object).
+
+    Returns:
+        The tree in Git's binary format.
+    """
+    if backend == 'subprocess':
+        # `git cat-file -p` pretty-prints trees; ask for the raw object instead
+        result = subprocess.run(['git', 'cat-file', 'tree', sha1], cwd=repo_path,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise FileNotFoundError(f"Tree '{sha1}' not found.")
+        return result.stdout
+    obj_type, content = get_object_reader(repo_path, backend).read(sha1)
+    if obj_type != 'tree':
+        raise ValueError(f"Object '{sha1}' is a {obj_type}, not a tree.")
+    return content
+
+
+def select_paths(repo_path: str, graph: Mapping[str, CommitNode], paths: Sequence[str],
+                 backend: str = DEFAULT_OBJECT_BACKEND, first_parent: bool = False) -> Set[str]:
+    """
+    Finds the commits that change something under the given path prefixes.
+
+    As in ``git log -- <paths>``, a commit is selected when the content at
+    the prefixes differs from every parent (a merge that takes the content
+    of one of its parents is not); a root commit is selected when any of
+    the prefixes exists. Only the trees along the prefixes are read.
+
+    Args:
+        repo_path: Path to the Git repository.
+        graph: The commits to check.
+        paths: Path prefixes relative to the repository root ("src/lib").
+        backend: Object backend (see read_object).
+        first_parent: Compare merges with their first parent only.
+
+    Returns:
+        SHA1s of the selected commits.
+    """
+    reader = TreeReader(lambda sha1: read_tree_object(repo_path, sha1, backend))
+    prefixes = [split_path(path) for path in paths]
+    states: Dict[str, Tuple[Optional[str], ...]] = {}
+
+    def state(sha1: str) -> Tuple[Optional[str], ...]:
+        """SHA1s at the prefixes in a commit; parents outside the graph are read."""
+        if sha1 not in states:
+            commit_node = graph.get(sha1)
+            tree = commit_node.tree if commit_node is not None else None
+            if tree is None:
+                tree = parse_commit(read_object(repo_path, sha1, backend)).tree
+            states[sha1] = tuple(reader.lookup(tree, prefix) for prefix in prefixes)
+        return states[sha1]
+
+    selected = set()
+    for sha1, commit_node in graph.items():
+        current = state(sha1)
+        parents = commit_node.parents[:1] if first_parent else commit_node.parents
+        if parents:
+            if all(state(parent) != current for parent in parents):
+                selected.add(sha1)
+        elif any(entry is not None for entry in current):
+            selected.add(sha1)
+    return selected
+
+
+def with_parents(node: CommitNode, parents: List[str]) -> CommitNode:
+    """
+    Returns the node with another parent list, without reading its fields.
+
+    Args:
+        node: A CommitNode or a CommitView.
+        parents: The new parents.
+
+    Returns:
+        The node itself if the parents are the same, else a lazy copy.
+    """
+    if parents == node.parents:
+        return node
+    return CommitNode.lazy(node.sha1, parents, node.commit_time, lambda sha1: node, node.tree)
+
+
+def window_graph(graph: Mapping[str, CommitNode], keep: Optional[Set[str]] = None,
+                 first_parent: bool = False) -> Dict[str, CommitNode]:
+    """
+    Restricts a walked graph to a window and rewrites its edges to match.
+
+    Edges to commits outside the graph (cut off by a depth or date limit)
+    are dropped. Commits not in ``keep`` are removed and the edges through
+    them are rewritten to their nearest kept ancestors, as ``git log
+    --graph`` does with a path filter.
+
+    Args:
+        graph: Commits from walk_commit_graph.
+        keep: Commits to keep; all when None.
+        first_parent: Keep only first-parent edges.
+
+    Returns:
+        A dictionary mapping commit SHA1 to node, in the order of ``graph``.
+    """
+    def parents_of(commit_node: CommitNode) -> List[str]:
+        return commit_node.parents[:1] if first_parent else commit_node.parents
+
+    # Nearest kept ancestors of removed commits
+    ancestors: Dict[str, List[str]] = {}
+
+    def kept_ancestors(sha1: str) -> List[str]:
+        if keep is None or sha1 in keep:
+            return [sha1] if sha1 in graph else []
+        if sha1 not in graph:
+            return []
+        # Iterative post-order: a removed run can be as long as the history
+        stack = [sha1]
+        while stack:
+            current = stack[-1]
+            if current in ancestors:
+                stack.pop()
+                continue
+            parents = parents_of(graph[current])
+            pending = [parent for parent in parents
+                       if parent not in keep and parent in graph and parent not in ancestors]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            found: List[str] = []
+            for parent in parents:
+                for ancestor in ([parent] if parent in keep else ancestors.get(parent, [])):
+                    if ancestor not in found:
+                        found.append(ancestor)
+            ancestors[current] = found
+        return ancestors[sha1]
+
+    window = {}
+    for sha1, commit_node in graph.items():
+        if keep is not None and sha1 not in keep:
+            continue
+        parents: List[str] = []
+        for parent in parents_of(commit_node):
+            for ancestor in kept_ancestors(parent):
+                if ancestor not in parents:
+                    parents.append(ancestor)
+        window[sha1] = with_parents(commit_node, parents)
+    return window
+
+
+class SummaryNode(CommitNode):
+    """
+    A run of linear commits drawn as one node (see collapse_linear_chains).
+
+    The node takes the SHA1 of the newest commit of the run, so edges from
+    its child need no rewriting, and the parents of the oldest one.
+
+    Attributes:
+        commits: SHA1s of the collapsed commits, newest first.
+        first_commit_time: Commit time of the oldest commit.
+    """
+
+    def __init__(self, nodes: Sequence[CommitNode]):
+        newest, oldest = nodes[0], nodes[-1]
+        super().__init__(newest.sha1, '', '', f'{len(nodes)} commits', list(oldest.parents),
+                         newest.commit_time)
+        self.commits = [commit_node.sha1 for commit_node in nodes]
+        self.first_commit_time = oldest.commit_time
+
+
+def collapse_linear_chains(graph: Mapping[str, CommitNode], starts: Iterable[str] = (),
+                           min_length: int = DEFAULT_MIN_CHAIN) -> Dict[str, CommitNode]:
+    """
+    Replaces runs of linear commits with summary nodes.
+
+    A commit is linear when it has exactly one parent and exactly one child
+    in the graph; start points, roots, merges and branch points are never
+    collapsed, so the shape of the history is kept.
+
+    Args:
+        graph: The commit graph (e.g. from window_graph).
+        starts: SHA1s of the start points; kept even when they have a child in the graph.
+        min_length: Shortest run that is collapsed.
+
+    Returns:
+        A dictionary mapping SHA1 to CommitNode or SummaryNode, in the order of ``graph``.
+    """
+    starts = set(starts)
+    children: Dict[str, int] = {}
+    # The only child of commits that have one
+    child_of: Dict[str, str] = {}
+    for sha1, commit_node in graph.items():
+        for parent in commit_node.parents:
+            children[parent] = children.get(parent, 0) + 1
+            child_of[parent] = sha1
+
+    def linear(sha1: str) -> bool:
+        commit_node = graph.get(sha1)
+        return (commit_node is not None and sha1 not in starts and children.get(sha1) == 1
+                and len(commit_node.parents) == 1 and commit_node.parents[0] in graph)
+
+    # Run heads (newest commit of a run) mapped to their summary; other members to None
+    collapsed: Dict[str, Optional[SummaryNode]] = {}
+    for sha1 in graph:
+        if not linear(sha1) or linear(child_of[sha1]):
+            continue
+        run = [graph[sha1]]
+        while linear(run[-1].parents[0]):
+            run.append(graph[run[-1].parents[0]])
+        if len(run) >= min_length:
+            collapsed[sha1] = SummaryNode(run)
+            collapsed.update(dict.fromkeys((member.sha1 for member in run[1:]), None))
+
+    simplified = {}
+    for sha1, commit_node in graph.items():
+        if sha1 in collapsed:
+            if collapsed[sha1] is not None:
+                simplified[sha1] = collapsed[sha1]
+        else:
+            simplified[sha1] = commit_node
+    return simplified
+
+
+def escape_dot(text: str) -> str:
+    """
+    Escapes text for a double-quoted DOT string.
+
+    Args:
+        text: Arbitrary text (author names, messages).
+
+    Returns:
+        The text with backslashes and quotes escaped and line breaks as DOT "\\n".
+    """
+    if _DOT_SPECIAL.search(text) is None:
+        return text
+    return (text.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\r', '').replace('\n', '\\n'))
+
+
+def format_label(node: CommitNode, fields: Sequence[str] = DEFAULT_LABEL_FIELDS) -> str:
+    """
+    Builds the DOT label of a commit node.
+
+    Args:
+        node: The commit.
+        fields: Fields to show, from LABEL_FIELDS.
+
+    Returns:
+        Escaped label text with DOT line breaks.
+    """
+    if isinstance(node, SummaryNode):
+        return _summary_label(node, fields)
+    parts = []
+    for field in fields:
+        if field == 'sha':
+            parts.append(node.sha1[:7])
+        elif field == 'author':
+            parts.append(escape_dot(node.author))
+        elif field == 'date':
+            parts.append(node.date)
+        elif field == 'commit_date':
+            if node.commit_time is not None:
+                parts.append(format_date(node.commit_time, 0))
+        elif field == 'message':
+            parts.append(escape_dot(node.message.split('\n', 1)[0]))
+    return '\\n'.join(parts)
+
+
+def _summary_label(node: SummaryNode, fields: Sequence[str]) -> str:
+    """Label of a collapsed run: SHA1 range, number of commits and dates (no fields needing objects)."""
+    parts = []
+    if 'sha' in fields:
+        parts.append(f'{node.commits[-1][:7]}..{node.commits[0][:7]}')
+    parts.append(node.message)
+    if ('date' in fields or 'commit_date' in fields) and node.commit_time is not None:
+        parts.append(f'{format_date(node.first_commit_time, 0)[:10]} .. {format_date(node.commit_time, 0)[:10]}')
+    return '\\n'.join(parts)
+
+
+class DotWriter:
+    """
+    Writes a DOT graph node by node to a text stream.
+
+    Usage:
+        with open(path, 'w') as f, DotWriter(f) as writer:
+            for node in walk_commit_graph(repo_path, start_sha1):
+                writer.write_node(node)
+
+    Attributes:
+        nodes: Number of nodes written.
+        edges: Number of edges written.
+    """
+
+    HEADER = ('digraph G {\n'
+              '  rankdir=TB;\n'  # Вертикальное расположение
+              '  node [shape=box, style=filled, color="lightblue"];\n'
+              '  edge [color="gray"];\n')
+    FOOTER = '}\n'
+
+    def __init__(self, stream: IO[str], label_fields: Sequence[str] = DEFAULT_LABEL_FIELDS):
+        self.stream = stream
+        self.label_fields = label_fields
+        self.nodes = 0
+        self.edges = 0
+        self._pending: List[str] = []
+        stream.write(self.HEADER)
+
+    def __enter__(self) -> 'DotWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+
+    def write_node(self, node: CommitNode) -> None:
+        """
+        Writes a node and the edges to its parents.
+
+        Args:
+            node: The commit.
+        """
+        sha1 = node.sha1
+        style = ', style="filled,dashed"' if isinstance(node, SummaryNode) else ''
+        text = f'  "{sha1}" [label="{format_label(node, self.label_fields)}"{style}];\n'
+        for parent_sha1 in node.parents:
+            text += f'  "{sha1}" -> "{parent_sha1}";\n'
+        pending = self._pending
+        pending.append(text)
+        if len(pending) >= DOT_WRITE_BATCH:
+            self.flush()
+        self.nodes += 1
+        self.edges += len(node.parents)
+
+    def write_nodes(self, nodes: Iterable[CommitNode]) -> None:
+        for node in nodes:
+            self.write_node(node)
+
+    def flush(self) -> None:
+        """Writes pending nodes to the stream."""
+        if self._pending:
+            self.stream.write(''.join(self._pending))
+            self._pending.clear()
+
+    def close(self) -> None:
+        """Ends the graph (the stream itself is left open)."""
+        self.flush()
+        self.stream.write(self.FOOTER)
+
+
+def generate_dot(graph: Mapping[str, CommitNode], label_fields: Sequence[str] = DEFAULT_LABEL_FIELDS) -> str:
     """
     Generates a DOT representation of the commit graph.
 
     Args:
-        graph: The commit graph.
+        graph: The commit graph (a dict of CommitNode or a CompactGraph).
+        label_fields: Fields shown in node labels (see LABEL_FIELDS).
 
     Returns:
         A string containing the DOT graph.
     """
-    dot = 'digraph G {\n'
-    dot += '  rankdir=TB;\n'  # Изменено на TB для вертикального расположения
-    dot += '  node [shape=box, style=filled, color="lightblue"];\n'  # Добавлены стили для узлов
-    dot += '  edge [color="gray"];\n'  # Добавлены стили для ребер
+    buffer = io.StringIO()
+    with DotWriter(buffer, label_fields) as writer:
+        writer.write_nodes(graph.values())
+    return buffer.getvalue()
 
-    for sha1, node in graph.items():
-        label = f"{node.sha1[:7]}\\n{node.author}\\n{node.date}"
-        dot += f'  "{sha1}" [label="{label}"];\n'
-        for parent_sha1 in node.parents:
-            dot += f'  "{sha1}" -> "{parent_sha1}";\n'
-    dot += '}\n'
-    return dot
+
+def stream_dot_file(nodes: Iterable[CommitNode], dot_path: str,
+                    label_fields: Sequence[str] = DEFAULT_LABEL_FIELDS,
+                    load: Optional[Callable[[str], CommitNode]] = None) -> CompactGraph:
+    """
+    Writes nodes to a DOT file as they arrive, without building the text in memory.
+
+    The written commits are kept in a CompactGraph, so the nodes themselves
+    can be freed as soon as they are written.
+
+    Args:
+        nodes: Commits, e.g. from walk_commit_graph.
+        dot_path: Path to the output DOT file.
+        label_fields: Fields shown in node labels.
+        load: Loader for commits written without author and message (see commit_loader).
+
+    Returns:
+        The written commits.
+    """
+    graph = CompactGraph(load)
+    with open(dot_path, 'w', buffering=DOT_BUFFER_SIZE) as f, DotWriter(f, label_fields) as writer:
+        for node in nodes:
+            writer.write_node(node)
+            graph.add(node)
+    graph.freeze()
+    return graph
 
 
 def write_dot_file(dot_content: str, dot_path: str) -> None:
@@ -233,24 +1241,71 @@ def generate_graph_image(graphviz_path: str, dot_path: str, output_path: str, la
     subprocess.run([graphviz_path, '-K', layout, '-Tpng', dot_path, '-o', output_path], check=True)
 
 
-def main(config_path: str) -> None:
+def main(config_path: str, backend: str = None, label_fields: Sequence[str] = None,
+         use_cache: bool = True, refs: Sequence[str] = None, jobs: int = 1,
+         max_depth: Optional[int] = None, since: Optional[int] = None, first_parent: bool = False,
+         paths: Sequence[str] = None, simplify: bool = False) -> None:
     """
     Main function to execute the visualization process.
 
     Args:
         config_path: Path to the XML configuration file.
+        backend: Object backend overriding the configuration.
+        label_fields: Label fields overriding the configuration.
+        use_cache: Whether to reuse and update the on-disk graph cache.
+        refs: Start refs overriding tag_name and refs from the configuration.
+        jobs: Number of threads reading commit objects.
+        max_depth: Depth limit of the walk overriding the configuration.
+        since: Date limit of the walk (timestamp) overriding the configuration.
+        first_parent: Follow only first parents.
+        paths: Show only commits changing these path prefixes.
+        simplify: Collapse runs of linear commits into summary nodes.
     """
     # Parse configuration
     config = parse_config(config_path)
+    backend = backend or config['object_backend']
+    label_fields = label_fields or config['label_fields']
+    max_depth = max_depth if max_depth is not None else config['max_depth']
+    since = since if since is not None else config['since']
+    first_parent = first_parent or config['first_parent']
+    paths = paths or config['paths']
+    simplify = simplify or config['simplify']
 
     # Build commit graph
-    start_sha1 = get_tag_commit_sha1(config['repo_path'], config['tag_name'])
-    graph = build_commit_graph(config['repo_path'], start_sha1)
+    refs = refs or config['refs']
+    if refs:
+        start_sha1 = resolve_start_commits(config['repo_path'], refs, backend)
+    else:
+        start_sha1 = get_tag_commit_sha1(config['repo_path'], config['tag_name'], backend)
+    cache = GraphCache(config['cache_path']) if use_cache else None
+    try:
+        cached = load_cached_graph(cache, config['repo_path'], backend) if cache else {}
+        nodes = walk_commit_graph(config['repo_path'], start_sha1, backend, known=cached, jobs=jobs,
+                                  max_depth=max_depth, since=since, first_parent=first_parent)
+        dot_path = os.path.join(os.path.dirname(config['output_path']), 'graph.dot')
+        load = commit_loader(config['repo_path'], backend)
+        if max_depth is None and since is None and not first_parent and not paths and not simplify:
+            # Generate DOT file while the graph is being walked
+            graph = stream_dot_file(nodes, dot_path, label_fields, load)
+        else:
+            # Edges of a window are only known once it is walked: shape it, then write it
+            graph = CompactGraph(load)
+            for node in nodes:
+                graph.add(node)
+            keep = select_paths(config['repo_path'], graph, paths, backend, first_parent) if paths else None
+            window = window_graph(graph, keep, first_parent)
+            if simplify:
+                starts = [start_sha1] if isinstance(start_sha1, str) else start_sha1
+                window = collapse_linear_chains(window, starts)
+            with open(dot_path, 'w', buffering=DOT_BUFFER_SIZE) as f, DotWriter(f, label_fields) as writer:
+                writer.write_nodes(window.values())
 
-    # Generate DOT file
-    dot_content = generate_dot(graph)
-    dot_path = os.path.join(os.path.dirname(config['output_path']), 'graph.dot')
-    write_dot_file(dot_content, dot_path)
+        # Rendering may have read lazy commits: store them together with new ones
+        if cache:
+            update_graph_cache(cache, config['repo_path'], graph, cached, cached.lazy)
+    finally:
+        if cache:
+            cache.close()
 
     # Generate graph image
     generate_graph_image(config['graphviz_path'], dot_path, config['output_path'])
@@ -260,5 +1315,27 @@ def main(config_path: str) -> None:
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Git Commit Dependency Graph Visualizer')
     parser.add_argument('config_path', help='Path to the XML configuration file')
+    parser.add_argument('--backend', choices=OBJECT_BACKENDS,
+                        help='How Git objects are read (default: object_backend from the config, else native)')
+    parser.add_argument('--label', type=parse_label_fields, metavar='FIELDS',
+                        help=f"Comma-separated label fields from {', '.join(LABEL_FIELDS)} "
+                             f"(default: label from the config, else {','.join(DEFAULT_LABEL_FIELDS)})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not read or update the graph cache (cache_path in the config)')
+    parser.add_argument('--ref', action='append', dest='refs', metavar='NAME',
+                        help='Start from this tag, branch, HEAD or SHA1 instead of tag_name (repeatable)')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Number of threads reading commit objects (default: 1)')
+    parser.add_argument('--max-depth', type=int, metavar='N',
+                        help='Walk at most N edges from the start commits (default: max_depth from the config)')
+    parser.add_argument('--since', type=parse_date, metavar='DATE',
+                        help='Skip commits committed before DATE (ISO 8601 or a timestamp)')
+    parser.add_argument('--first-parent', action='store_true',
+                        help='Follow only the first parent of merges')
+    parser.add_argument('--path', action='append', dest='paths', metavar='PREFIX',
+                        help='Show only commits that change files under PREFIX (repeatable)')
+    parser.add_argument('--simplify', action='store_true',
+                        help='Collapse runs of linear commits into one node each')
     args = parser.parse_args()
-    main(args.config_path)
+    main(args.config_path, args.backend, args.label, not args.no_cache, args.refs, max(1, args.jobs),
+         args.max_depth, args.since, args.first_parent, args.paths, args.simplify)
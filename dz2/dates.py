@@ -0,0 +1,79 @@
+"""
+Formatting of Git author and committer dates.
+
+Git stores a date as seconds since the epoch plus the author's UTC offset
+("+0300"); labels show it in the author's local time.
+
+A history has only a handful of distinct offsets, so parsed offsets and
+their formatted suffixes are cached per offset, and dates are formatted
+with time.gmtime instead of building a timezone and a datetime per commit.
+"""
+
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Union
+
+# Offsets as they appear in commits ("+0300" or b"+0300") -> minutes
+_tz_minutes: Dict[Union[str, bytes], int] = {}
+
+
+def parse_tz(tz: Union[str, bytes]) -> int:
+    """
+    Converts a Git timezone ("+0300", "-0130") to minutes east of UTC.
+
+    Args:
+        tz: Timezone in Git's format, as text or as bytes of a raw commit.
+
+    Returns:
+        Offset in minutes.
+    """
+    minutes = _tz_minutes.get(tz)
+    if minutes is None:
+        text = tz.decode('ascii') if isinstance(tz, bytes) else tz
+        sign = -1 if text.startswith('-') else 1
+        minutes = _tz_minutes[tz] = sign * (int(text[1:3]) * 60 + int(text[3:5]))
+    return minutes
+
+
+@lru_cache(maxsize=None)
+def _tz_suffix(tz_minutes: int) -> str:
+    """Formats an offset the way %z does ("+0300")."""
+    sign = '-' if tz_minutes < 0 else '+'
+    hours, minutes = divmod(abs(tz_minutes), 60)
+    return f' {sign}{hours:02d}{minutes:02d}'
+
+
+def format_date(timestamp: int, tz_minutes: int) -> str:
+    """
+    Formats a Git date in the given timezone.
+
+    Args:
+        timestamp: Seconds since the epoch.
+        tz_minutes: Offset in minutes east of UTC.
+
+    Returns:
+        For example "2024-05-01 12:30:00 +0300".
+    """
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(timestamp + tz_minutes * 60)) + _tz_suffix(tz_minutes)
+
+
+def parse_date(value: str) -> int:
+    """
+    Parses a date given on the command line or in the configuration.
+
+    Args:
+        value: Seconds since the epoch, or an ISO 8601 date or date and time
+            ("2024-05-01", "2024-05-01 12:30", "2024-05-01T12:30:00+03:00");
+            local time when no offset is given.
+
+    Returns:
+        Seconds since the epoch.
+    """
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}'.") from None
@@ -0,0 +1,150 @@
+"""
+On-disk cache of parsed commits, shared between runs of the visualizer.
+
+Commits are immutable, so a cached commit never goes stale: the next run
+only reads commits it has not seen before and takes the rest of the graph
+from the cache. Entries are stored in SQLite, keyed by the absolute
+repository path and the binary SHA1, and are looked up one by one as the
+walk reaches them, so a run never reads the whole cached history.
+"""
+
+import os
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_CACHE_NAME = 'graph-cache.sqlite'
+
+# (sha1, parents, commit_time, author, author_time, author_tz, message); the
+# author fields and message are None for commits whose object was never read
+CommitRow = Tuple[str, List[str], Optional[int], Optional[str], Optional[int], Optional[int], Optional[str]]
+
+# Bumped when the schema changes; older caches are dropped and rebuilt
+SCHEMA_VERSION = 2
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS repos (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commits (
+    repo_id INTEGER NOT NULL,
+    sha1 BLOB NOT NULL,
+    parents BLOB NOT NULL,
+    commit_time INTEGER,
+    author TEXT,
+    author_time INTEGER,
+    author_tz INTEGER,
+    message TEXT,
+    PRIMARY KEY (repo_id, sha1)
+) WITHOUT ROWID;
+'''
+
+
+def default_cache_path() -> str:
+    """
+    Returns the default cache file location ($XDG_CACHE_HOME or ~/.cache).
+
+    Returns:
+        Path to the cache database.
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'git-graph-visualizer', DEFAULT_CACHE_NAME)
+
+
+class GraphCache:
+    """
+    SQLite cache of commits for any number of repositories.
+
+    Attributes:
+        path: Path to the database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # The cache only saves work: drop an incompatible one
+            self._db.executescript('DROP TABLE IF EXISTS commits; DROP TABLE IF EXISTS repos;')
+            self._db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self._db.executescript(_SCHEMA)
+        self._repo_ids: Dict[str, int] = {}
+
+    def _repo_id(self, repo_path: str) -> int:
+        key = os.path.abspath(repo_path)
+        repo_id = self._repo_ids.get(key)
+        if repo_id is None:
+            with self._db:
+                self._db.execute('INSERT OR IGNORE INTO repos (path) VALUES (?)', (key,))
+            repo_id = self._db.execute('SELECT id FROM repos WHERE path = ?', (key,)).fetchone()[0]
+            self._repo_ids[key] = repo_id
+        return repo_id
+
+    @staticmethod
+    def _row(record: tuple) -> CommitRow:
+        sha1, parents, commit_time, author, author_time, author_tz, message = record
+        return (sha1.hex(), [parents[i:i + 20].hex() for i in range(0, len(parents), 20)],
+                commit_time, author, author_time, author_tz, message)
+
+    def row(self, repo_path: str, sha1: str) -> Optional[CommitRow]:
+        """
+        Reads one cached commit.
+
+        Args:
+            repo_path: Path to the Git repository.
+            sha1: Hex SHA1 of the commit.
+
+        Returns:
+            The CommitRow, or None if the commit is not cached.
+        """
+        record = self._db.execute(
+            'SELECT sha1, parents, commit_time, author, author_time, author_tz, message '
+            'FROM commits WHERE repo_id = ? AND sha1 = ?',
+            (self._repo_id(repo_path), bytes.fromhex(sha1))).fetchone()
+        return None if record is None else self._row(record)
+
+    def rows(self, repo_path: str) -> Iterator[CommitRow]:
+        """
+        Reads all cached commits of a repository.
+
+        Args:
+            repo_path: Path to the Git repository.
+
+        Yields:
+            CommitRow tuples.
+        """
+        cursor = self._db.execute(
+            'SELECT sha1, parents, commit_time, author, author_time, author_tz, message '
+            'FROM commits WHERE repo_id = ?', (self._repo_id(repo_path),))
+        for record in cursor:
+            yield self._row(record)
+
+    def store(self, repo_path: str, rows: Iterable[CommitRow]) -> int:
+        """
+        Adds or replaces commits in one transaction.
+
+        Args:
+            repo_path: Path to the Git repository.
+            rows: CommitRow tuples.
+
+        Returns:
+            Number of rows written.
+        """
+        repo_id = self._repo_id(repo_path)
+        records = [(repo_id, bytes.fromhex(sha1), b''.join(bytes.fromhex(p) for p in parents),
+                    commit_time, author, author_time, author_tz, message)
+                   for sha1, parents, commit_time, author, author_time, author_tz, message in rows]
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?, ?, ?, ?)', records)
+        return len(records)
+
+    def clear(self, repo_path: str) -> None:
+        """Drops all cached commits of a repository."""
+        with self._db:
+            self._db.execute('DELETE FROM commits WHERE repo_id = ?', (self._repo_id(repo_path),))
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,499 @@
+"""
+Native reader for the Git object database.
+
+Reads loose objects from ``.git/objects`` with zlib and packed objects from
+``.pack``/``.idx`` (version 2) files through ``mmap``, including OFS_DELTA and
+REF_DELTA resolution, so that walking the history needs no ``git`` processes.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+OBJECT_TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+OFS_DELTA = 6
+REF_DELTA = 7
+
+IDX_MAGIC = b'\377tOc'
+PACK_MAGIC = b'PACK'
+
+# Upper bound for the total size of cached delta bases.
+DEFAULT_BASE_CACHE_BYTES = 32 * 1024 * 1024
+
+# Compressed bytes fed to zlib per step while inflating a packed object.
+_INFLATE_STEP = 64 * 1024
+
+
+def find_git_dir(repo_path: str) -> str:
+    """
+    Locates the Git directory of a repository.
+
+    Handles regular checkouts (``.git`` directory), worktrees and submodules
+    (``.git`` file with a ``gitdir:`` line) and bare repositories.
+
+    Args:
+        repo_path: Path to the repository (work tree or bare).
+
+    Returns:
+        Path to the Git directory.
+    """
+    dot_git = os.path.join(repo_path, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git
+    if os.path.isfile(dot_git):
+        with open(dot_git, 'r') as f:
+            line = f.read().strip()
+        if line.startswith('gitdir:'):
+            return os.path.normpath(os.path.join(repo_path, line[len('gitdir:'):].strip()))
+    if os.path.isfile(os.path.join(repo_path, 'HEAD')) and \
+            os.path.isdir(os.path.join(repo_path, 'objects')):
+        return repo_path
+    raise FileNotFoundError(f"'{repo_path}' is not a Git repository.")
+
+
+def find_common_dir(git_dir: str) -> str:
+    """
+    Returns the directory holding objects and shared refs (differs for worktrees).
+
+    Args:
+        git_dir: Path to the Git directory.
+
+    Returns:
+        Path to the common Git directory.
+    """
+    commondir = os.path.join(git_dir, 'commondir')
+    if os.path.isfile(commondir):
+        with open(commondir, 'r') as f:
+            return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    return git_dir
+
+
+def _read_varint(data, pos: int) -> Tuple[int, int]:
+    """Reads a little-endian base-128 size as used in delta headers."""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """
+    Applies a Git delta to its base object.
+
+    Args:
+        base: Content of the base object.
+        delta: Delta instructions.
+
+    Returns:
+        The reconstructed object content.
+    """
+    base_size, pos = _read_varint(delta, 0)
+    if base_size != len(base):
+        raise ValueError('Delta base size mismatch')
+    target_size, pos = _read_varint(delta, pos)
+    out = bytearray()
+    end = len(delta)
+    while pos < end:
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            # Copy a range of the base object.
+            offset = size = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (0x10 << i):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            out += base[offset:offset + (size or 0x10000)]
+        elif op:
+            # Insert literal bytes from the delta.
+            out += delta[pos:pos + op]
+            pos += op
+        else:
+            raise ValueError('Invalid delta opcode 0')
+    if len(out) != target_size:
+        raise ValueError('Delta result size mismatch')
+    return bytes(out)
+
+
+class PackFile:
+    """
+    A pack file and its version 2 index, both memory-mapped.
+
+    Attributes:
+        idx_path: Path to the ``.idx`` file.
+        pack_path: Path to the ``.pack`` file.
+        count: Number of objects in the pack.
+    """
+
+    def __init__(self, idx_path: str):
+        self.idx_path = idx_path
+        self.pack_path = idx_path[:-len('.idx')] + '.pack'
+        with open(idx_path, 'rb') as f:
+            self._idx = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._idx[:4] != IDX_MAGIC or struct.unpack_from('>I', self._idx, 4)[0] != 2:
+            self._idx.close()
+            raise ValueError(f"Unsupported pack index format: {idx_path}")
+        self._fanout = struct.unpack_from('>256I', self._idx, 8)
+        self.count = self._fanout[255]
+        self._names = 8 + 256 * 4
+        self._offsets = self._names + self.count * (20 + 4)
+        self._large_offsets = self._offsets + self.count * 4
+        self._pack = None
+        self._lock = threading.Lock()
+
+    def _pack_map(self) -> mmap.mmap:
+        """Maps the pack file on first use."""
+        if self._pack is None:
+            with self._lock:
+                if self._pack is None:
+                    with open(self.pack_path, 'rb') as f:
+                        pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    if pack[:4] != PACK_MAGIC:
+                        pack.close()
+                        raise ValueError(f"Not a pack file: {self.pack_path}")
+                    self._pack = pack
+        return self._pack
+
+    def sha_at(self, index: int) -> bytes:
+        """Returns the binary SHA1 of the object at a position in the index."""
+        start = self._names + index * 20
+        return self._idx[start:start + 20]
+
+    def find(self, sha: bytes) -> Optional[int]:
+        """
+        Looks up an object by binary SHA1.
+
+        Args:
+            sha: 20-byte object name.
+
+        Returns:
+            Offset of the object in the pack, or None if the pack lacks it.
+        """
+        first = sha[0]
+        lo = self._fanout[first - 1] if first else 0
+        hi = self._fanout[first]
+        idx = self._idx
+        names = self._names
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = names + mid * 20
+            current = idx[start:start + 20]
+            if current < sha:
+                lo = mid + 1
+            elif current > sha:
+                hi = mid
+            else:
+                return self._offset_at(mid)
+        return None
+
+    def _offset_at(self, index: int) -> int:
+        offset, = struct.unpack_from('>I', self._idx, self._offsets + index * 4)
+        if offset & 0x80000000:
+            # The real offset lives in the 64-bit table.
+            offset, = struct.unpack_from('>Q', self._idx,
+                                         self._large_offsets + (offset & 0x7fffffff) * 8)
+        return offset
+
+    def entry_header(self, offset: int) -> Tuple[int, int, int, object]:
+        """
+        Parses the header of a pack entry.
+
+        Args:
+            offset: Offset of the entry in the pack.
+
+        Returns:
+            (type number, inflated size, offset of the zlib data, delta base),
+            where the delta base is a pack offset for OFS_DELTA, a binary SHA1
+            for REF_DELTA and None otherwise.
+        """
+        pack = self._pack_map()
+        pos = offset
+        byte = pack[pos]
+        pos += 1
+        obj_type = (byte >> 4) & 7
+        size = byte & 0x0f
+        shift = 4
+        while byte & 0x80:
+            byte = pack[pos]
+            pos += 1
+            size |= (byte & 0x7f) << shift
+            shift += 7
+        base = None
+        if obj_type == OFS_DELTA:
+            byte = pack[pos]
+            pos += 1
+            distance = byte & 0x7f
+            while byte & 0x80:
+                byte = pack[pos]
+                pos += 1
+                distance = ((distance + 1) << 7) | (byte & 0x7f)
+            base = offset - distance
+        elif obj_type == REF_DELTA:
+            base = pack[pos:pos + 20]
+            pos += 20
+        return obj_type, size, pos, base
+
+    def inflate(self, pos: int, size: int) -> bytes:
+        """
+        Inflates the zlib stream of a pack entry.
+
+        Args:
+            pos: Offset of the zlib data.
+            size: Expected inflated size.
+
+        Returns:
+            The inflated bytes.
+        """
+        pack = self._pack_map()
+        decompressor = zlib.decompressobj()
+        parts = []
+        step = max(size + 64, 512)
+        while not decompressor.eof:
+            chunk = pack[pos:pos + step]
+            if not chunk:
+                raise ValueError(f"Truncated pack entry in {self.pack_path}")
+            parts.append(decompressor.decompress(chunk))
+            pos += step
+            step = _INFLATE_STEP
+        data = b''.join(parts)
+        if len(data) != size:
+            raise ValueError(f"Corrupt pack entry in {self.pack_path}")
+        return data
+
+    def close(self) -> None:
+        if self._pack is not None:
+            self._pack.close()
+            self._pack = None
+        self._idx.close()
+
+
+class ObjectStore:
+    """
+    Read-only access to the objects of a repository without spawning ``git``.
+
+    Packs are scanned once and rescanned when an object is not found, so
+    packs written by a concurrent ``git gc`` are picked up. Resolved delta
+    bases are kept in a small LRU cache because history walks read
+    neighbouring objects that share delta chains.
+
+    Attributes:
+        git_dir: Path to the Git directory.
+        object_dirs: Object directories, the repository's own first, then alternates.
+    """
+
+    def __init__(self, repo_path: str, base_cache_bytes: int = DEFAULT_BASE_CACHE_BYTES):
+        self.git_dir = find_git_dir(repo_path)
+        objects = os.path.join(find_common_dir(self.git_dir), 'objects')
+        if not os.path.isdir(objects):
+            raise FileNotFoundError(f"Object directory '{objects}' not found.")
+        self.object_dirs = [objects] + self._alternates(objects)
+        self._packs: List[PackFile] = []
+        self._pack_paths = set()
+        self._scan_lock = threading.Lock()
+        self._base_cache: 'OrderedDict[Tuple[str, int], Tuple[int, bytes]]' = OrderedDict()
+        self._base_cache_size = 0
+        self._base_cache_bytes = base_cache_bytes
+        self._cache_lock = threading.Lock()
+        self._scan_packs()
+
+    @staticmethod
+    def _alternates(objects: str) -> List[str]:
+        """Reads ``objects/info/alternates``."""
+        path = os.path.join(objects, 'info', 'alternates')
+        if not os.path.isfile(path):
+            return []
+        with open(path, 'r') as f:
+            return [os.path.normpath(os.path.join(objects, line.strip()))
+                    for line in f if line.strip() and not line.startswith('#')]
+
+    def _scan_packs(self) -> bool:
+        """
+        Opens pack indexes that appeared since the last scan.
+
+        Returns:
+            True if new packs were found.
+        """
+        found = False
+        with self._scan_lock:
+            for objects in self.object_dirs:
+                pack_dir = os.path.join(objects, 'pack')
+                if not os.path.isdir(pack_dir):
+                    continue
+                for name in sorted(os.listdir(pack_dir)):
+                    path = os.path.join(pack_dir, name)
+                    if not name.endswith('.idx') or path in self._pack_paths:
+                        continue
+                    if not os.path.exists(path[:-len('.idx')] + '.pack'):
+                        continue
+                    self._packs.append(PackFile(path))
+                    self._pack_paths.add(path)
+                    found = True
+        return found
+
+    @property
+    def packs(self) -> List[PackFile]:
+        return list(self._packs)
+
+    def read(self, sha1: str) -> Tuple[str, bytes]:
+        """
+        Reads an object.
+
+        Args:
+            sha1: Hex SHA1 of the object.
+
+        Returns:
+            (object type, raw content).
+        """
+        try:
+            sha = bytes.fromhex(sha1)
+        except ValueError:
+            raise FileNotFoundError(f"Object '{sha1}' not found.")
+        result = self._read_binary(sha)
+        if result is None:
+            raise FileNotFoundError(f"Object '{sha1}' not found.")
+        obj_type, data = result
+        return OBJECT_TYPES[obj_type], data
+
+    def read_many(self, sha1s: Iterable[str]) -> List[Optional[Tuple[str, bytes]]]:
+        """
+        Reads several objects.
+
+        Args:
+            sha1s: Hex SHA1s of the objects.
+
+        Returns:
+            (object type, raw content) for each object, None for missing ones.
+        """
+        results = []
+        for sha1 in sha1s:
+            try:
+                results.append(self.read(sha1))
+            except FileNotFoundError:
+                results.append(None)
+        return results
+
+    def _read_binary(self, sha: bytes) -> Optional[Tuple[int, bytes]]:
+        """Reads an object by binary SHA1, returning (type number, content)."""
+        for attempt in range(2):
+            for pack in self._packs:
+                offset = pack.find(sha)
+                if offset is not None:
+                    return self._read_packed(pack, offset)
+            loose = self._read_loose(sha.hex())
+            if loose is not None:
+                return loose
+            if attempt == 0 and not self._scan_packs():
+                break
+        return None
+
+    def _read_loose(self, sha1: str) -> Optional[Tuple[int, bytes]]:
+        """Reads and inflates a loose object file."""
+        for objects in self.object_dirs:
+            path = os.path.join(objects, sha1[:2], sha1[2:])
+            try:
+                with open(path, 'rb') as f:
+                    raw = zlib.decompress(f.read())
+            except FileNotFoundError:
+                continue
+            header, _, data = raw.partition(b'\0')
+            type_name, _, size = header.decode('ascii').partition(' ')
+            if int(size) != len(data):
+                raise ValueError(f"Corrupt loose object {sha1}")
+            return _TYPE_NUMBERS[type_name], data
+        return None
+
+    def _cached_base(self, key: Tuple[str, int]) -> Optional[Tuple[int, bytes]]:
+        with self._cache_lock:
+            entry = self._base_cache.get(key)
+            if entry is not None:
+                self._base_cache.move_to_end(key)
+            return entry
+
+    def _cache_base(self, key: Tuple[str, int], entry: Tuple[int, bytes]) -> None:
+        size = len(entry[1])
+        if size > self._base_cache_bytes // 4:
+            return
+        with self._cache_lock:
+            if key in self._base_cache:
+                return
+            self._base_cache[key] = entry
+            self._base_cache_size += size
+            while self._base_cache_size > self._base_cache_bytes:
+                _, (_, old) = self._base_cache.popitem(last=False)
+                self._base_cache_size -= len(old)
+
+    def _read_packed(self, pack: PackFile, offset: int) -> Tuple[int, bytes]:
+        """
+        Reads a packed object, resolving its delta chain iteratively.
+
+        Args:
+            pack: Pack containing the object.
+            offset: Offset of the object's entry.
+
+        Returns:
+            (type number, content).
+        """
+        chain = []
+        while True:
+            key = (pack.pack_path, offset)
+            cached = self._cached_base(key) if chain else None
+            if cached is not None:
+                obj_type, data = cached
+                break
+            obj_type, size, data_pos, base = pack.entry_header(offset)
+            if obj_type == OFS_DELTA:
+                chain.append((key, pack.inflate(data_pos, size)))
+                offset = base
+            elif obj_type == REF_DELTA:
+                chain.append((key, pack.inflate(data_pos, size)))
+                located = self._locate(base)
+                if located is None:
+                    # Base outside any pack: a loose object (thin pack remnants)
+                    loose = self._read_loose(base.hex())
+                    if loose is None:
+                        raise FileNotFoundError(f"Delta base '{base.hex()}' not found.")
+                    obj_type, data = loose
+                    break
+                pack, offset = located
+            else:
+                data = pack.inflate(data_pos, size)
+                if chain:
+                    self._cache_base(key, (obj_type, data))
+                break
+        # Apply deltas from the base outwards, caching intermediate bases
+        for i in range(len(chain) - 1, -1, -1):
+            key, delta = chain[i]
+            data = apply_delta(data, delta)
+            if i:
+                self._cache_base(key, (obj_type, data))
+        return obj_type, data
+
+    def _locate(self, sha: bytes) -> Optional[Tuple[PackFile, int]]:
+        """Finds the pack and offset holding an object."""
+        for pack in self._packs:
+            offset = pack.find(sha)
+            if offset is not None:
+                return pack, offset
+        return None
+
+    def close(self) -> None:
+        """Unmaps all pack files."""
+        for pack in self._packs:
+            pack.close()
+        self._packs = []
+        self._pack_paths = set()
+
+
+_TYPE_NUMBERS: Dict[str, int] = {name: number for number, name in OBJECT_TYPES.items()}
@@ -0,0 +1,189 @@
+"""
+Resolution of Git references to commits.
+
+Reads loose refs and ``packed-refs`` (loaded once and reloaded only when the
+file changes), follows symbolic refs such as HEAD, expands short names in
+the same order as ``git rev-parse`` and peels annotated tags to commits,
+using the peeled ``^`` lines of ``packed-refs`` where available.
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from objectstore import find_common_dir, find_git_dir
+
+# Same limit as Git's SYMREF_MAXDEPTH
+MAX_SYMREF_DEPTH = 5
+
+# Short names are tried with these prefixes, in order (see git-rev-parse(1))
+SHORT_NAME_RULES = ('{}', 'refs/{}', 'refs/tags/{}', 'refs/heads/{}', 'refs/remotes/{}', 'refs/remotes/{}/HEAD')
+
+# Refs stored per worktree; everything else under refs/ is shared
+PER_WORKTREE_PREFIXES = ('refs/worktree/', 'refs/bisect/', 'refs/rewritten/')
+
+_SHA1_RE = re.compile(r'[0-9a-f]{40}')
+
+# read_object(sha1) -> (object type, raw content)
+ObjectReader = Callable[[str], Tuple[str, bytes]]
+
+
+class RefError(FileNotFoundError):
+    """A reference does not exist or cannot be resolved."""
+
+
+class RefResolver:
+    """
+    Resolves reference names of one repository.
+
+    Attributes:
+        git_dir: Git directory (per-worktree refs and HEAD).
+        common_dir: Directory with shared refs and packed-refs.
+    """
+
+    def __init__(self, repo_path: str, read_object: Optional[ObjectReader] = None):
+        """
+        Args:
+            repo_path: Path to the Git repository.
+            read_object: Object reader used to peel tags missing peeled lines.
+        """
+        self.git_dir = find_git_dir(repo_path)
+        self.common_dir = find_common_dir(self.git_dir)
+        self.read_object = read_object
+        self._packed: Dict[str, str] = {}
+        self._peeled: Dict[str, str] = {}
+        self._fully_peeled = False
+        self._packed_stamp = None
+        self._lock = threading.Lock()
+
+    def _load_packed_refs(self) -> None:
+        """(Re)reads packed-refs if it changed since the last load."""
+        path = os.path.join(self.common_dir, 'packed-refs')
+        try:
+            st = os.stat(path)
+            stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        with self._lock:
+            if stamp == self._packed_stamp:
+                return
+            packed, peeled, fully_peeled = {}, {}, False
+            if stamp is not None:
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    last = None
+                    for line in f:
+                        line = line.rstrip('\n')
+                        if line.startswith('#'):
+                            # "# pack-refs with: peeled fully-peeled sorted"
+                            fully_peeled = 'fully-peeled' in line.split()
+                        elif line.startswith('^'):
+                            if last is not None:
+                                peeled[last] = line[1:]
+                        elif line:
+                            sha1, _, name = line.partition(' ')
+                            packed[name] = sha1
+                            last = name
+            self._packed, self._peeled, self._fully_peeled = packed, peeled, fully_peeled
+            self._packed_stamp = stamp
+
+    def _ref_path(self, name: str) -> str:
+        per_worktree = not name.startswith('refs/') or name.startswith(PER_WORKTREE_PREFIXES)
+        return os.path.join(self.git_dir if per_worktree else self.common_dir, *name.split('/'))
+
+    def read_ref(self, name: str) -> Optional[str]:
+        """
+        Resolves a full reference name, following symbolic refs.
+
+        Args:
+            name: Full name, e.g. "HEAD" or "refs/tags/v1.0.0".
+
+        Returns:
+            The SHA1 the reference points to, or None if it does not exist.
+        """
+        resolved = self._follow(name)
+        return resolved[1] if resolved else None
+
+    def _follow(self, name: str) -> Optional[Tuple[str, str]]:
+        """Follows symbolic refs; returns (name of the final ref, SHA1)."""
+        self._load_packed_refs()
+        for _ in range(MAX_SYMREF_DEPTH + 1):
+            path = self._ref_path(name)
+            if os.path.isfile(path):
+                with open(path, 'r') as f:
+                    content = f.read().strip()
+                if content.startswith('ref:'):
+                    name = content[len('ref:'):].strip()
+                    continue
+                if _SHA1_RE.fullmatch(content):
+                    return name, content
+                raise RefError(f"Reference '{name}' is broken.")
+            sha1 = self._packed.get(name)
+            return (name, sha1) if sha1 is not None else None
+        raise RefError(f"Too many levels of symbolic refs at '{name}'.")
+
+    def lookup(self, name: str) -> Tuple[str, str]:
+        """
+        Expands a short name and resolves it.
+
+        Args:
+            name: A full or short ref name ("v1.0.0", "main", "origin/main", "HEAD")
+                or a full hex SHA1.
+
+        Returns:
+            (full name of the final reference after symbolic refs, or the
+            SHA1 itself; SHA1).
+        """
+        if _SHA1_RE.fullmatch(name):
+            return name, name
+        for rule in SHORT_NAME_RULES:
+            full_name = rule.format(name)
+            if full_name == name and not name.startswith('refs/') and not name.isupper():
+                # Outside refs/ only all-caps names (HEAD, FETCH_HEAD, ...) are refs
+                continue
+            resolved = self._follow(full_name)
+            if resolved is not None:
+                return resolved
+        raise RefError(f"Reference '{name}' not found.")
+
+    def peel(self, full_name: str, sha1: str) -> str:
+        """
+        Peels a reference target to a commit.
+
+        Args:
+            full_name: Full reference name (used to find a peeled line).
+            sha1: The reference's target.
+
+        Returns:
+            SHA1 of the commit.
+        """
+        self._load_packed_refs()
+        if self._packed.get(full_name) == sha1:
+            peeled = self._peeled.get(full_name)
+            if peeled is not None:
+                return peeled
+            if self._fully_peeled:
+                # packed-refs lists every peelable ref: no line means not a tag
+                return sha1
+        if self.read_object is None:
+            return sha1
+        for _ in range(MAX_SYMREF_DEPTH * 8):
+            obj_type, content = self.read_object(sha1)
+            if obj_type != 'tag':
+                return sha1
+            # The first header line of a tag is "object <sha1>"
+            sha1 = content[len(b'object '):content.index(b'\n')].decode('ascii')
+        raise RefError(f"Tag chain of '{full_name}' is too long.")
+
+    def resolve(self, name: str) -> str:
+        """
+        Resolves a name to a commit SHA1, peeling annotated tags.
+
+        Args:
+            name: Full or short ref name, or a SHA1.
+
+        Returns:
+            SHA1 of the commit.
+        """
+        full_name, sha1 = self.lookup(name)
+        return self.peel(full_name, sha1)
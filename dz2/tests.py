@@ -3,7 +3,7 @@ import tempfile
 import os
 import shutil
 from core import (
-    parse_config, get_tag_commit_sha1, read_object, parse_commit,
+    parse_config, get_tag_commit_sha1, read_object, read_object_subprocess, parse_commit,
     build_commit_graph, generate_dot, write_dot_file, generate_graph_image
 )
 from unittest.mock import patch
@@ -11,6 +11,12 @@ from datetime import datetime, timezone, timedelta
 import zlib
 import subprocess
 
+@pytest.fixture(autouse=True)
+def temp_cache_home(tmp_path, monkeypatch):
+    # Кэш графа по умолчанию пишется в $XDG_CACHE_HOME - не трогаем домашний каталог
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
+
 @pytest.fixture
 def temp_repo():
     # Создаем временный каталог для репозитория
@@ -139,3 +145,522 @@ def test_main(temp_repo):
         mock_print.assert_called_with("Graph generated successfully.")
 
     os.unlink(config_path)
+
+def _git_objects(repo_dir):
+    """Returns {sha1: (type, content)} for all objects, as read by git itself."""
+    output = subprocess.run(['git', 'cat-file', '--batch-all-objects', '--batch'],
+                            cwd=repo_dir, stdout=subprocess.PIPE, check=True).stdout
+    objects = {}
+    pos = 0
+    while pos < len(output):
+        header_end = output.index(b'\n', pos)
+        sha1, obj_type, size = output[pos:header_end].decode().split()
+        start = header_end + 1
+        objects[sha1] = (obj_type, output[start:start + int(size)])
+        pos = start + int(size) + 1
+    return objects
+
+@pytest.fixture
+def history_repo(temp_repo):
+    # Много версий одного файла - при упаковке git сохранит их дельтами
+    repo_dir, tag_name, commit_sha1 = temp_repo
+    test_file = os.path.join(repo_dir, 'test.txt')
+    for i in range(30):
+        with open(test_file, 'a') as f:
+            f.write(f'line {i} ' + 'x' * 200 + '\n')
+        subprocess.run(['git', 'commit', '-qam', f'Commit {i}'], cwd=repo_dir, check=True)
+    yield repo_dir
+
+def test_native_reader_loose_objects(history_repo):
+    from objectstore import ObjectStore
+    store = ObjectStore(history_repo)
+    assert store.packs == []
+    for sha1, (obj_type, content) in _git_objects(history_repo).items():
+        assert store.read(sha1) == (obj_type, content)
+    store.close()
+
+@pytest.mark.parametrize('delta_base_offset', ['true', 'false'])
+def test_native_reader_packed_objects(history_repo, delta_base_offset):
+    from objectstore import ObjectStore, OFS_DELTA, REF_DELTA
+    # false - дельты ссылаются на базу по SHA1 (REF_DELTA), true - по смещению (OFS_DELTA)
+    subprocess.run(['git', '-c', f'repack.useDeltaBaseOffset={delta_base_offset}',
+                    'repack', '-adq', '-f', '--depth=10'], cwd=history_repo, check=True)
+    store = ObjectStore(history_repo)
+    assert len(store.packs) == 1
+    pack = store.packs[0]
+    kinds = {pack.entry_header(pack.find(pack.sha_at(i)))[0] for i in range(pack.count)}
+    assert (OFS_DELTA if delta_base_offset == 'true' else REF_DELTA) in kinds
+    expected = _git_objects(history_repo)
+    for sha1, (obj_type, content) in expected.items():
+        assert store.read(sha1) == (obj_type, content)
+    with pytest.raises(FileNotFoundError):
+        store.read('0' * 40)
+    store.close()
+
+def test_read_object_picks_up_new_packs(history_repo):
+    head = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=history_repo,
+                          stdout=subprocess.PIPE, text=True, check=True).stdout.strip()
+    graph = build_commit_graph(history_repo, head)
+    # После упаковки свободные объекты удалены, хранилище должно найти новый пак
+    subprocess.run(['git', 'gc', '-q', '--prune=now'], cwd=history_repo, check=True)
+    with open(os.path.join(history_repo, 'test.txt'), 'a') as f:
+        f.write('after gc\n')
+    subprocess.run(['git', 'commit', '-qam', 'After gc'], cwd=history_repo, check=True)
+    new_head = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=history_repo,
+                              stdout=subprocess.PIPE, text=True, check=True).stdout.strip()
+    new_graph = build_commit_graph(history_repo, new_head)
+    assert len(new_graph) == len(graph) + 1
+    assert new_graph[new_head].parents == [head]
+    assert read_object(history_repo, head).content == read_object_subprocess(history_repo, head).content
+
+def test_batch_backend(history_repo):
+    from catfile import CatFilePool
+    expected = _git_objects(history_repo)
+    pool = CatFilePool(history_repo, size=2)
+    shas = list(expected)
+    # Запросы отправляются пачками, без ожидания ответа на каждый
+    assert pool.read_many(shas + ['0' * 40]) == [expected[sha] for sha in shas] + [None]
+    with pytest.raises(FileNotFoundError):
+        pool.read('0' * 40)
+    pool.close()
+
+def test_batch_backend_threads(history_repo):
+    from concurrent.futures import ThreadPoolExecutor
+    from catfile import CatFilePool
+    expected = _git_objects(history_repo)
+    pool = CatFilePool(history_repo, size=3)
+    with ThreadPoolExecutor(8) as executor:
+        results = dict(zip(expected, executor.map(pool.read, expected)))
+    assert results == expected
+    assert len(pool._processes) <= 3
+    pool.close()
+
+def test_build_commit_graph_backends(history_repo):
+    head = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=history_repo,
+                          stdout=subprocess.PIPE, text=True, check=True).stdout.strip()
+    graphs = [build_commit_graph(history_repo, head, backend) for backend in ('native', 'batch', 'subprocess')]
+    assert len(graphs[0]) == 31
+    for graph in graphs[1:]:
+        assert {sha: (n.author, n.date, n.message, n.parents) for sha, n in graph.items()} == \
+               {sha: (n.author, n.date, n.message, n.parents) for sha, n in graphs[0].items()}
+
+def test_benchmark_generate_repo(tmp_path):
+    from benchmark import generate_repo, BENCH_TAG, MERGE_EVERY
+    repo_dir = generate_repo(str(tmp_path / 'repo'), MERGE_EVERY + 1)
+    graph = build_commit_graph(repo_dir, get_tag_commit_sha1(repo_dir, BENCH_TAG))
+    # Основная линия и один слитый побочный коммит
+    assert len(graph) == MERGE_EVERY + 2
+    assert sum(len(node.parents) == 2 for node in graph.values()) == 1
+
+def _git(repo_dir, *args):
+    return subprocess.run(['git', *args], cwd=repo_dir, stdout=subprocess.PIPE,
+                          text=True, check=True).stdout.strip()
+
+@pytest.fixture
+def octopus_repo(history_repo):
+    # Две ветки и слияние трех родителей - третий родитель хранится в чанке EDGE
+    for branch in ('b1', 'b2'):
+        _git(history_repo, 'checkout', '-q', '-b', branch, 'HEAD~5')
+        with open(os.path.join(history_repo, f'{branch}.txt'), 'w') as f:
+            f.write(branch)
+        _git(history_repo, 'add', f'{branch}.txt')
+        _git(history_repo, 'commit', '-qm', f'On {branch}')
+    _git(history_repo, 'checkout', '-q', 'master' if _git(history_repo, 'branch', '--list', 'master') else 'main')
+    _git(history_repo, 'merge', '-q', '-m', 'Octopus', 'b1', 'b2')
+    yield history_repo
+
+def _graph_summary(graph):
+    return {sha: (node.parents, node.commit_time) for sha, node in graph.items()}
+
+def test_commit_graph_matches_objects(octopus_repo):
+    from commitgraph import open_commit_graph
+    head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    expected = build_commit_graph(octopus_repo, head, use_commit_graph=False)
+    assert len(expected[head].parents) == 3
+    assert open_commit_graph(octopus_repo) is None
+
+    _git(octopus_repo, 'commit-graph', 'write', '--reachable')
+    graph = build_commit_graph(octopus_repo, head)
+    assert _graph_summary(graph) == _graph_summary(expected)
+    # Автор и сообщение читаются из объекта при первом обращении
+    assert graph[head].message == 'Octopus'
+    assert graph[head].author == expected[head].author
+
+def test_commit_graph_chain_and_new_commits(octopus_repo):
+    head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    _git(octopus_repo, 'commit-graph', 'write', '--reachable', '--split')
+    with open(os.path.join(octopus_repo, 'test.txt'), 'a') as f:
+        f.write('more\n')
+    _git(octopus_repo, 'commit', '-qam', 'Second layer')
+    _git(octopus_repo, 'commit-graph', 'write', '--reachable', '--split=no-merge')
+    chain = os.path.join(octopus_repo, '.git', 'objects', 'info', 'commit-graphs', 'commit-graph-chain')
+    with open(chain) as f:
+        assert len(f.read().split()) == 2
+    # Коммит, которого еще нет в commit-graph, читается из объектов
+    _git(octopus_repo, 'commit', '-q', '--allow-empty', '-m', 'Not in graph')
+    new_head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    graph = build_commit_graph(octopus_repo, new_head)
+    assert _graph_summary(graph) == _graph_summary(
+        build_commit_graph(octopus_repo, new_head, use_commit_graph=False))
+    assert head in graph
+
+def test_commit_graph_labels_without_object_reads(octopus_repo):
+    from core import format_label
+    head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    _git(octopus_repo, 'commit-graph', 'write', '--reachable')
+    with patch('core.read_object', side_effect=AssertionError('object read')):
+        graph = build_commit_graph(octopus_repo, head)
+        dot_content = generate_dot(graph, ('sha', 'commit_date'))
+    timestamp = int(_git(octopus_repo, 'log', '-1', '--format=%ct'))
+    date = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S %z')
+    assert f'"{head}" [label="{head[:7]}\\n{date}"];' in dot_content
+    assert format_label(graph[head], ('sha', 'message')) == f'{head[:7]}\\nOctopus'
+
+def test_parse_config_optional_fields():
+    config_xml = '''<config>
+        <graphviz_path>/usr/bin/dot</graphviz_path>
+        <repo_path>/path/to/repo</repo_path>
+        <output_path>/path/to/output/graph.png</output_path>
+        <tag_name>v1.0.0</tag_name>
+        <object_backend>batch</object_backend>
+        <label>sha, commit_date</label>
+    </config>'''
+    with tempfile.NamedTemporaryFile('w', delete=False) as f:
+        f.write(config_xml)
+        config_path = f.name
+    config = parse_config(config_path)
+    os.unlink(config_path)
+    assert config['object_backend'] == 'batch'
+    assert config['label_fields'] == ('sha', 'commit_date')
+
+def test_graph_cache_incremental(octopus_repo, temp_cache_home):
+    from core import load_cached_graph, update_graph_cache
+    from graphcache import GraphCache, default_cache_path
+    assert default_cache_path().startswith(str(temp_cache_home))
+    head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    _git(octopus_repo, 'commit-graph', 'write', '--reachable')
+    cache = GraphCache(default_cache_path())
+    graph = build_commit_graph(octopus_repo, head)
+    graph[head].author  # загружает один коммит из объектов
+    assert update_graph_cache(cache, octopus_repo, graph, {}, set()) == len(graph)
+
+    cached = load_cached_graph(cache, octopus_repo)
+    # Коммиты читаются из кэша по одному, только когда их запрашивают
+    assert len(cached) == 0
+    assert _graph_summary({sha: cached[sha] for sha in graph}) == _graph_summary(graph)
+    assert {sha for sha in graph if cached[sha].loaded} == {head}
+    assert cached.lazy == set(graph) - {head}
+
+    # Новый коммит: из объектов читается только он
+    _git(octopus_repo, 'commit', '-q', '--allow-empty', '-m', 'New')
+    new_head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    with patch('core.read_object', wraps=read_object) as mock_read:
+        new_graph = build_commit_graph(octopus_repo, new_head, known=cached)
+    assert [call.args[1] for call in mock_read.call_args_list] == [new_head]
+    assert len(new_graph) == len(graph) + 1
+    assert new_graph[new_head].message == 'New'
+    cache.close()
+
+def test_main_uses_graph_cache(history_repo, tmp_path):
+    head = _git(history_repo, 'rev-parse', 'HEAD')
+    _git(history_repo, 'tag', 'v1')
+    config_path = tmp_path / 'config.xml'
+    config_path.write_text(f'''<config>
+        <graphviz_path>/usr/bin/dot</graphviz_path>
+        <repo_path>{history_repo}</repo_path>
+        <output_path>{tmp_path / 'graph.png'}</output_path>
+        <tag_name>v1</tag_name>
+        <cache_path>{tmp_path / 'cache.sqlite'}</cache_path>
+    </config>''')
+    from core import main
+    with patch('core.generate_graph_image'), patch('builtins.print'):
+        main(str(config_path))
+        first = (tmp_path / 'graph.dot').read_text()
+        # Второй запуск строит тот же граф, не читая объектов
+        with patch('core.read_object', side_effect=AssertionError('object read')):
+            main(str(config_path))
+    assert (tmp_path / 'graph.dot').read_text() == first
+    assert f'"{head}"' in first
+
+def test_ref_resolver_packed_and_annotated(history_repo):
+    from core import get_ref_resolver
+    head = _git(history_repo, 'rev-parse', 'HEAD')
+    _git(history_repo, 'tag', '-a', 'v2', '-m', 'Annotated', 'HEAD~3')
+    target = _git(history_repo, 'rev-parse', 'HEAD~3')
+    # Свободный аннотированный тег разыменовывается через объект тега
+    assert get_tag_commit_sha1(history_repo, 'v2') == target
+
+    _git(history_repo, 'pack-refs', '--all')
+    assert not os.path.exists(os.path.join(history_repo, '.git', 'refs', 'tags', 'v2'))
+    # Строки '^' в packed-refs: объекты не читаются
+    with patch('core.get_object_reader', side_effect=AssertionError('object read')):
+        assert get_tag_commit_sha1(history_repo, 'v2') == target
+        assert get_tag_commit_sha1(history_repo, 'test_tag') == _git(history_repo, 'rev-list', '--max-parents=0', 'HEAD')
+        resolver = get_ref_resolver(history_repo)
+        assert resolver.resolve('HEAD') == head
+        assert resolver.resolve('v2') == target
+    # Резолвер привязан к бэкенду, которым разыменовываются теги
+    assert get_ref_resolver(history_repo, 'subprocess') is not resolver
+    assert get_ref_resolver(history_repo, 'subprocess') is get_ref_resolver(history_repo, 'subprocess')
+    assert resolver.resolve(head) == head
+    with pytest.raises(FileNotFoundError):
+        get_tag_commit_sha1(history_repo, 'missing')
+
+    # packed-refs перечитывается после изменения
+    _git(history_repo, 'tag', 'v3', 'HEAD~1')
+    _git(history_repo, 'pack-refs', '--all')
+    assert get_tag_commit_sha1(history_repo, 'v3') == _git(history_repo, 'rev-parse', 'HEAD~1')
+
+def test_resolve_start_commits(octopus_repo):
+    from core import resolve_start_commits
+    from refs import RefError
+    _git(octopus_repo, 'checkout', '-q', 'b1')
+    commits = resolve_start_commits(octopus_repo, ['HEAD', 'b2', 'refs/heads/b1', 'test_tag'])
+    assert commits == [_git(octopus_repo, 'rev-parse', name) for name in ('b1', 'b2', 'test_tag')]
+    with pytest.raises(RefError):
+        resolve_start_commits(octopus_repo, ['no-such-branch'])
+
+    graph = build_commit_graph(octopus_repo, commits[:2])
+    expected = set(_git(octopus_repo, 'rev-list', 'b1', 'b2').split())
+    assert set(graph) == expected
+
+@pytest.mark.parametrize('backend', ['native', 'batch'])
+def test_parallel_traversal_matches_serial(octopus_repo, backend):
+    starts = [_git(octopus_repo, 'rev-parse', name) for name in ('HEAD', 'b1', 'test_tag')]
+    serial = build_commit_graph(octopus_repo, starts, backend)
+    for jobs in (2, 8):
+        parallel = build_commit_graph(octopus_repo, starts, backend, jobs=jobs)
+        # Тот же граф в том же порядке обхода
+        assert list(parallel) == list(serial)
+        assert {sha: (n.author, n.date, n.message, n.parents) for sha, n in parallel.items()} == \
+               {sha: (n.author, n.date, n.message, n.parents) for sha, n in serial.items()}
+        assert generate_dot(parallel) == generate_dot(serial)
+
+def test_parallel_traversal_commit_graph_and_known(octopus_repo):
+    head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    _git(octopus_repo, 'commit-graph', 'write', '--reachable')
+    _git(octopus_repo, 'commit', '-q', '--allow-empty', '-m', 'Not in graph')
+    new_head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    known = build_commit_graph(octopus_repo, _git(octopus_repo, 'rev-parse', 'HEAD~10'))
+    serial = build_commit_graph(octopus_repo, new_head, known=known)
+    parallel = build_commit_graph(octopus_repo, new_head, known=known, jobs=4)
+    assert list(parallel) == list(serial)
+    assert _graph_summary(parallel) == _graph_summary(serial)
+    assert head in parallel
+
+def test_dot_escaping():
+    from core import CommitNode, escape_dot
+    assert escape_dot('plain') == 'plain'
+    assert escape_dot('a "quoted" \\ name\nnext') == 'a \\"quoted\\" \\\\ name\\nnext'
+    node = CommitNode('a' * 40, 'Bob "The Builder" \\o/ <bob@example.com>', '2024-01-01 00:00:00 +0000',
+                      'Fix "bug"\n\nDetails', ['b' * 40])
+    dot_content = generate_dot({node.sha1: node}, ('sha', 'author', 'message'))
+    assert (f'  "{node.sha1}" [label="aaaaaaa\\nBob \\"The Builder\\" \\\\o/ <bob@example.com>'
+            f'\\nFix \\"bug\\""];\n') in dot_content
+    assert f'  "{node.sha1}" -> "{"b" * 40}";\n' in dot_content
+
+def test_dot_streams_during_traversal(history_repo, tmp_path):
+    import io
+    from core import DotWriter, walk_commit_graph, stream_dot_file
+    head = _git(history_repo, 'rev-parse', 'HEAD')
+    with patch('core.read_object', wraps=read_object) as mock_read:
+        nodes = walk_commit_graph(history_repo, head)
+        buffer = io.StringIO()
+        writer = DotWriter(buffer)
+        writer.write_node(next(nodes))
+        writer.flush()
+        # Первый узел записан, когда прочитан только один коммит
+        assert mock_read.call_count == 1
+        assert f'"{head}" [label=' in buffer.getvalue()
+        writer.write_nodes(nodes)
+        writer.close()
+    assert writer.nodes == 31 and writer.edges == 30
+    assert buffer.getvalue() == generate_dot(build_commit_graph(history_repo, head))
+
+    dot_path = tmp_path / 'graph.dot'
+    graph = stream_dot_file(walk_commit_graph(history_repo, head), str(dot_path))
+    assert dot_path.read_text() == generate_dot(graph)
+
+def test_compact_graph(octopus_repo):
+    from core import CommitNode, commit_loader
+    from compactgraph import CompactGraph
+    head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    graph = build_commit_graph(octopus_repo, head, use_commit_graph=False)
+    compact = CompactGraph.from_nodes(graph.values())
+    assert list(compact) == list(graph)
+    assert _graph_summary(compact) == _graph_summary(graph)
+    assert {sha: (n.commit_time, n.author_time, n.author_tz, n.date) for sha, n in compact.items()} == \
+           {sha: (n.commit_time, n.author_time, n.author_tz, n.date) for sha, n in graph.items()}
+    assert generate_dot(compact, ('sha', 'author', 'date', 'commit_date', 'message')) == \
+           generate_dot(graph, ('sha', 'author', 'date', 'commit_date', 'message'))
+    # После freeze поиск идет двоичным поиском по отсортированным SHA1
+    assert all(compact[sha].sha1 == sha for sha in graph)
+    assert 'f' * 40 not in compact and 'xyz' not in compact
+    with pytest.raises(ValueError):
+        compact.add(graph[head])
+
+    # Ленивые узлы читаются из объектов при первом обращении
+    _git(octopus_repo, 'commit-graph', 'write', '--reachable')
+    lazy = build_commit_graph(octopus_repo, head)
+    compact = CompactGraph(commit_loader(octopus_repo))
+    for node in lazy.values():
+        compact.add(node)
+    with patch('core.read_object', wraps=read_object) as mock_read:
+        assert not compact[head].loaded
+        assert compact[head].message == graph[head].message
+        assert compact[head].loaded and mock_read.call_count == 1
+    assert compact[head].to_row() == graph[head].to_row()
+
+    # Родитель вне графа: ребро сохраняется, но коммит в граф не входит
+    node = CommitNode('a' * 40, 'A <a@b>', '', 'msg', ['b' * 40], 1, 1, 0)
+    partial = CompactGraph.from_nodes([node])
+    assert list(partial) == ['a' * 40] and partial['a' * 40].parents == ['b' * 40]
+    assert 'b' * 40 not in partial and len(partial) == 1
+
+def test_walk_limits(octopus_repo):
+    head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    full = build_commit_graph(octopus_repo, head)
+    side = {_git(octopus_repo, 'rev-parse', branch) for branch in ('b1', 'b2')}
+
+    # Глубина считается по кратчайшему пути: b1 и b2 на расстоянии 1
+    window = build_commit_graph(octopus_repo, head, max_depth=1)
+    assert set(window) == {head, _git(octopus_repo, 'rev-parse', 'HEAD~1')} | side
+    assert len(build_commit_graph(octopus_repo, head, max_depth=0)) == 1
+    # Параллельный обход дает тот же результат и порядок
+    for kwargs in ({'max_depth': 3}, {'first_parent': True}):
+        assert list(build_commit_graph(octopus_repo, head, jobs=4, **kwargs)) == \
+               list(build_commit_graph(octopus_repo, head, **kwargs))
+
+    first_parent = build_commit_graph(octopus_repo, head, first_parent=True)
+    assert set(first_parent) == set(full) - side
+
+    # Дата отсечения: коммиты старше нее не читаются
+    since = full[_git(octopus_repo, 'rev-parse', 'HEAD~3')].commit_time
+    recent = build_commit_graph(octopus_repo, head, since=since)
+    assert recent and all(node.commit_time >= since for node in recent.values())
+    assert set(recent) == {sha for sha, node in full.items() if node.commit_time >= since}
+
+def test_walk_since_prunes(temp_repo):
+    from dates import parse_date
+    repo_dir, _, _ = temp_repo
+    for day in range(1, 6):
+        env = dict(os.environ, GIT_COMMITTER_DATE=f'2024-01-0{day}T12:00:00+00:00')
+        subprocess.run(['git', 'commit', '-q', '--allow-empty', '-m', f'Day {day}'],
+                       cwd=repo_dir, check=True, env=env)
+    head = _git(repo_dir, 'rev-parse', 'HEAD')
+    with patch('core.read_object', wraps=read_object) as mock_read:
+        graph = build_commit_graph(repo_dir, head, since=parse_date('2024-01-03T00:00:00+00:00'))
+    assert [node.message for node in graph.values()] == ['Day 5', 'Day 4', 'Day 3']
+    # Читается только граничный коммит Day 2
+    assert mock_read.call_count == 4
+    assert parse_date('1700000000') == 1700000000
+
+def test_path_filter_and_window(octopus_repo):
+    from core import select_paths, window_graph
+    head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    on_b1 = _git(octopus_repo, 'rev-parse', 'b1')
+    graph = build_commit_graph(octopus_repo, head)
+    # Слияние берет b1.txt без изменений из второго родителя - оно не выбирается
+    assert select_paths(octopus_repo, graph, ['b1.txt']) == {on_b1}
+    assert select_paths(octopus_repo, graph, ['b1.txt'], first_parent=True) == {on_b1, head}
+    assert select_paths(octopus_repo, graph, ['missing/dir']) == set()
+    changed = select_paths(octopus_repo, graph, ['test.txt'], backend='subprocess')
+    assert changed == select_paths(octopus_repo, graph, ['./test.txt/'])
+    assert len(changed) == 31
+
+    # Ребра переписываются на ближайших выбранных предков
+    window = window_graph(graph, changed)
+    assert set(window) == changed
+    tip = _git(octopus_repo, 'rev-parse', 'HEAD~1')
+    assert window[tip].parents == [_git(octopus_repo, 'rev-parse', 'HEAD~2')]
+    assert sum(len(node.parents) for node in window.values()) == 30
+    assert window[tip].message == graph[tip].message
+
+    # Ребра за пределами окна отбрасываются
+    window = window_graph(build_commit_graph(octopus_repo, head, max_depth=1))
+    assert all(parent in window for node in window.values() for parent in node.parents)
+    assert window[head].parents == graph[head].parents
+    assert all(not window[sha].parents for sha in window if sha != head)
+
+def test_collapse_linear_chains(octopus_repo):
+    from core import SummaryNode, collapse_linear_chains
+    head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    graph = build_commit_graph(octopus_repo, head)
+    simplified = collapse_linear_chains(graph)
+    # Остаются слияние, точки ветвления, корень и одиночные коммиты веток
+    branch_points = {_git(octopus_repo, 'rev-parse', f'{branch}~1') for branch in ('b1', 'b2')}
+    root = _git(octopus_repo, 'rev-list', '--max-parents=0', 'HEAD')
+    summaries = [node for node in simplified.values() if isinstance(node, SummaryNode)]
+    assert sorted(len(node.commits) for node in summaries) == [3, 5, 20]
+    assert {head, root} | branch_points <= set(simplified) and len(simplified) == 9
+    assert sum(len(node.commits) for node in summaries) + len(simplified) - len(summaries) == len(graph)
+    # Все ребра ведут к узлам упрощенного графа
+    assert all(parent in simplified for node in simplified.values() for parent in node.parents)
+
+    dot_content = generate_dot(simplified, ('sha', 'commit_date'))
+    long_run = max(summaries, key=lambda node: len(node.commits))
+    assert f'{long_run.commits[-1][:7]}..{long_run.commits[0][:7]}\\n20 commits' in dot_content
+    assert 'style="filled,dashed"' in dot_content
+    assert len(collapse_linear_chains(graph, min_length=21)) == len(graph)
+
+    # Начальная точка в середине цепочки остается отдельным узлом
+    middle = _git(octopus_repo, 'rev-parse', 'HEAD~3')
+    graph = build_commit_graph(octopus_repo, [head, middle])
+    simplified = collapse_linear_chains(graph, [head, middle])
+    assert middle in simplified and not isinstance(simplified[middle], SummaryNode)
+    assert all(middle not in node.commits for node in simplified.values() if isinstance(node, SummaryNode))
+    assert sorted(len(node.commits) for node in simplified.values()
+                  if isinstance(node, SummaryNode)) == [2, 2, 3, 20]
+
+def test_main_with_window(octopus_repo, tmp_path):
+    head = _git(octopus_repo, 'rev-parse', 'HEAD')
+    config_path = tmp_path / 'config.xml'
+    config_path.write_text(f'''<config>
+        <graphviz_path>/usr/bin/dot</graphviz_path>
+        <repo_path>{octopus_repo}</repo_path>
+        <output_path>{tmp_path / 'graph.png'}</output_path>
+        <refs>HEAD</refs>
+        <max_depth>10</max_depth>
+        <first_parent>true</first_parent>
+        <cache_path>{tmp_path / 'cache.sqlite'}</cache_path>
+    </config>''')
+    from core import main, parse_config
+    config = parse_config(str(config_path))
+    assert config['max_depth'] == 10 and config['first_parent'] and not config['simplify']
+    with patch('core.generate_graph_image'), patch('builtins.print'):
+        main(str(config_path), simplify=True)
+    dot_content = (tmp_path / 'graph.dot').read_text()
+    # Голова, 9 линейных коммитов одним узлом и граничный коммит
+    assert dot_content.count('[label=') == 3
+    assert '9 commits' in dot_content
+    assert f'"{head}"' in dot_content and dot_content.count(' -> ') == 2
+
+def test_parse_commit_bytes():
+    from core import GitObject, scan_commit_headers
+    from dates import parse_tz
+    data = (b'tree ' + b'1' * 40 + b'\n'
+            b'parent ' + b'2' * 40 + b'\n'
+            b'parent ' + b'3' * 40 + b'\n'
+            b'author J\xc3\xb6rg <j@example.com> 1700000000 -0130\n'
+            b'committer C <c@example.com> 1700000100 +0000\n'
+            b'gpgsig -----BEGIN PGP SIGNATURE-----\n'
+            b' \n'
+            b' parent ' + b'4' * 40 + b'\n'
+            b' -----END PGP SIGNATURE-----\n'
+            b'\n'
+            b'Subject\n\nauthor Not A Header <x@y> 1 +0100\n\xff\n')
+    tree, parents, author, author_time, author_tz, commit_time, body = scan_commit_headers(data)
+    assert (tree, parents) == ('1' * 40, ['2' * 40, '3' * 40])
+    assert (author, author_time, author_tz, commit_time) == ('Jörg <j@example.com>'.encode(), 1700000000, -90, 1700000100)
+    assert data[body:].startswith(b'Subject\n')
+
+    node = parse_commit(GitObject('a' * 40, 'commit', data))
+    assert node.author == 'Jörg <j@example.com>' and node.tree == '1' * 40
+    # Сообщение и дата разбираются при первом обращении
+    assert isinstance(node._message, bytes) and node._date is None
+    assert node.message == 'Subject\n\nauthor Not A Header <x@y> 1 +0100\n�'
+    assert node.date == '2023-11-14 20:43:20 -0130'
+    assert parse_tz(b'+0530') == parse_tz('+0530') == 330
+    # Коммит без сообщения
+    empty = parse_commit(GitObject('b' * 40, 'commit', b'tree ' + b'1' * 40 + b'\n'))
+    assert empty.parents == [] and empty.message == '' and empty.date == ''
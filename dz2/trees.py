@@ -0,0 +1,104 @@
+"""
+Reading of Git tree objects and lookup of paths in them.
+
+Used to decide whether a commit changes anything under a path prefix: the
+entry at the prefix is compared with the one in the parent commit's tree,
+which needs only the trees along the prefix, not a full diff.
+"""
+
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+# read_tree(sha1) -> raw content of a tree object
+TreeReaderFunc = Callable[[str], bytes]
+
+HASH_LEN = 20
+
+# Mode of subtree entries
+TREE_MODE = '40000'
+
+
+def parse_tree(content: bytes) -> Iterator[Tuple[str, str, str]]:
+    """
+    Parses a raw tree object ("<mode> <name>\\0<20-byte SHA1>" entries).
+
+    Args:
+        content: Raw tree content.
+
+    Yields:
+        (mode, name, hex SHA1) for each entry.
+    """
+    pos = 0
+    end = len(content)
+    while pos < end:
+        space = content.index(b' ', pos)
+        nul = content.index(b'\0', space)
+        yield (content[pos:space].decode('ascii'),
+               content[space + 1:nul].decode('utf-8', errors='surrogateescape'),
+               content[nul + 1:nul + 1 + HASH_LEN].hex())
+        pos = nul + 1 + HASH_LEN
+
+
+def split_path(path: str) -> Tuple[str, ...]:
+    """Splits a path prefix into components ("src/lib/" -> ("src", "lib"))."""
+    return tuple(part for part in path.split('/') if part and part != '.')
+
+
+class TreeReader:
+    """
+    Looks up paths in trees, remembering the results.
+
+    Unchanged subtrees keep their SHA1 between commits, so a walk over many
+    commits parses each distinct tree along a prefix only once.
+    """
+
+    def __init__(self, read_tree: TreeReaderFunc):
+        """
+        Args:
+            read_tree: Function returning the raw content of a tree.
+        """
+        self.read_tree = read_tree
+        self._lookups: Dict[Tuple[str, str], Optional[Tuple[str, str]]] = {}
+
+    def entry(self, tree_sha1: str, name: str) -> Optional[Tuple[str, str]]:
+        """
+        Finds one entry of a tree.
+
+        Args:
+            tree_sha1: SHA1 of the tree.
+            name: Entry name.
+
+        Returns:
+            (mode, SHA1) of the entry, or None if the tree has no such entry.
+        """
+        key = (tree_sha1, name)
+        if key not in self._lookups:
+            found = None
+            for mode, entry_name, sha1 in parse_tree(self.read_tree(tree_sha1)):
+                if entry_name == name:
+                    found = mode, sha1
+                    break
+            self._lookups[key] = found
+        return self._lookups[key]
+
+    def lookup(self, tree_sha1: str, path: Tuple[str, ...]) -> Optional[str]:
+        """
+        Resolves a path inside a tree.
+
+        Args:
+            tree_sha1: SHA1 of the root tree.
+            path: Path components (see split_path); empty for the root itself.
+
+        Returns:
+            SHA1 of the blob or tree at the path, or None if it does not exist.
+        """
+        sha1 = tree_sha1
+        mode = TREE_MODE
+        for name in path:
+            if mode != TREE_MODE:
+                # A file in the middle of the path
+                return None
+            found = self.entry(sha1, name)
+            if found is None:
+                return None
+            mode, sha1 = found
+        return sha1